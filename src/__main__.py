@@ -2,20 +2,54 @@
 import multiprocessing
 import sys
 import threading
-
-from herald import algorithms, board, evaluation, move_ordering, pruning, quiescence
-from herald.board import Board
-from herald.configuration import Config
+import time
+from dataclasses import replace
+from typing import Any
+
+from herald import (
+    algorithms,
+    bitboard,
+    board,
+    evaluation,
+    iterative_deepening,
+    move_ordering,
+    pruning,
+    pv_table,
+    quiescence,
+    worker,
+)
+from herald import transposition_table as tt
+from herald.configuration import Config, set_hash_size
 from herald.constants import COLOR, VALUE_MAX
 from herald.data_structures import to_uci
-from herald.iterative_deepening import itdep
 from herald.pruning import see
+from herald.search_context import SearchContext
 from herald.time_management import target_movetime
 
 CURRENT_BOARD = board.from_fen("startpos")
 CURRENT_PROCESS = None
-CURRENT_QUEUE = None
-LAST_SEARCH = None
+# the search processes, the main worker first and its lazy SMP helpers
+WORKERS: list[worker.Worker] = []
+
+BACKENDS = {
+    "mailbox": board,
+    "bitboard": bitboard,
+}
+
+# positions searched by the bench command, from the opening to the endgame
+BENCH_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n2n2/3p4/3P4/2NB1N2/PP3PPP/R1BQ1RK1 w - - 0 10",
+    "2rq1rk1/pb1nbppp/1p2pn2/2pp4/2PP4/1P2PN2/PB1NBPPP/2RQ1RK1 b - - 0 11",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "6k1/5p2/6p1/8/7p/8/6PP/6K1 b - - 0 1",
+    "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 1",
+]
+
+# depth the bench positions are searched to when the command does not give one
+BENCH_DEPTH: int = 4
 
 CONFIG = Config(
     alg_fn=algorithms.alphabeta,
@@ -25,7 +59,12 @@ CONFIG = Config(
     use_transposition_table=True,
     use_hash_move=True,
     use_killer_moves=True,
-    use_late_move_reduction=False,
+    use_staged_move_generation=True,
+    use_late_move_reduction=True,
+    use_history_heuristic=True,
+    use_null_move_pruning=True,
+    use_futility_pruning=True,
+    use_reverse_futility_pruning=True,
     use_saved_search=True,
     quiescence_fn=quiescence.quiescence,
 )
@@ -33,10 +72,27 @@ CONFIG = Config(
 
 def stop_calculating() -> None:
     global CURRENT_PROCESS
-    global CURRENT_QUEUE
     if CURRENT_PROCESS is not None:
         CURRENT_PROCESS.terminate()
-    CURRENT_QUEUE = None
+    for w in WORKERS:
+        worker.stop(w)
+
+
+def start_workers() -> None:
+    """(Re)start the search processes, with a table sized for the current options."""
+    global WORKERS
+    for w in WORKERS:
+        worker.shutdown(w)
+    set_hash_size(
+        CONFIG,
+        CONFIG.hash_size,
+    )
+    WORKERS = worker.start_pool(CONFIG)
+    threading.Thread(
+        target=print_worker_output,
+        args=(WORKERS,),
+        daemon=True,
+    ).start()
 
 
 def uci_parser(
@@ -44,8 +100,6 @@ def uci_parser(
 ) -> list[str]:  # noqa: C901
     global CURRENT_BOARD
     global CURRENT_PROCESS
-    global CURRENT_QUEUE
-    global LAST_SEARCH
     tokens = line.strip().split()
 
     if not tokens:
@@ -57,18 +111,29 @@ def uci_parser(
             f"Black king is in check: {board.king_is_in_check(CURRENT_BOARD, COLOR.BLACK)}",
         ]
 
-    if tokens[0] == "lastsearch":
-        if LAST_SEARCH is not None:
-            return [f"LAST SEARCH: {to_uci(LAST_SEARCH.pv)}"]
-        return ["LAST SEARCH: None"]
+    # the main worker holds the state of the search and prints the answer itself
+    if tokens[0] in ("caches", "lastsearch"):
+        worker.send(
+            WORKERS[0],
+            tokens[0],
+        )
+        return []
+
+    if tokens[0] == "clearsearch":
+        for w in WORKERS:
+            worker.send(
+                w,
+                "clearsearch",
+            )
+        return []
 
     if tokens[0] == "see":
         return [f"SEE: {see(CURRENT_BOARD, int(tokens[1]), 0)}"]
 
     if tokens[0] == "eval":
         curr_eval = evaluation.eval_fast(
-            CURRENT_BOARD.squares,
-            evaluation.remaining_material(CURRENT_BOARD.squares),
+            CURRENT_BOARD.piece_lists,
+            evaluation.remaining_material(CURRENT_BOARD.piece_lists),
         )
         return [f"board: {curr_eval}"]
 
@@ -97,29 +162,28 @@ def uci_parser(
             node = quiescence.quiescence(
                 CONFIG,
                 new_board,
-                [move],
                 -VALUE_MAX,
                 VALUE_MAX,
                 True,
             )
-            print([node.value] + [to_uci(m) for m in node.pv])
+            # in debug, the quiescence search leaves its moves in the pv table
+            pv = [move] + pv_table.line(
+                CONFIG.context.pv_table,
+                CONFIG.context.pv_lengths,
+                0,
+            )
+            print([node.value] + [to_uci(m) for m in pv])
 
     if tokens[0] == "lines":
-        moves = (move for move in board.legal_moves(CURRENT_BOARD))
-        for move in moves:
-            new_board = board.push(
-                CURRENT_BOARD,
-                move,
-                fast=False,
-            )
-            for node in algorithms.alphabeta(
-                config=CONFIG,
-                b=new_board,
-                depth=int(tokens[1]),
-                pv=[move],
-            ):
-                continue
-            print([node.value] + [to_uci(m) for m in node.pv])
+        # the children of the root are searched tokens[1] plies deep,
+        # over the root splitting pool of the main worker if it has one
+        worker.send(
+            WORKERS[0],
+            "lines",
+            CURRENT_BOARD,
+            int(tokens[1]) + 1,
+        )
+        return []
 
     if tokens[0] == "quiescence":
         if CURRENT_PROCESS is not None:
@@ -130,7 +194,6 @@ def uci_parser(
             args=(
                 CONFIG,
                 CURRENT_BOARD,
-                [],
                 -VALUE_MAX,
                 VALUE_MAX,
                 True,
@@ -180,20 +243,22 @@ def uci_parser(
     if tokens[0] == "perft":
         total = 0
         to_display = []
+        backend = BACKENDS[CONFIG.board_backend]
+        root = backend.from_fen(board.to_fen(CURRENT_BOARD))
 
         def execute(
-            b: Board,
+            b: Any,
             depth: int,
         ) -> int:
             if depth == 0:
                 return 1
 
             if depth == 1:
-                return len(list(board.legal_moves(b)))
+                return len(list(backend.legal_moves(b)))
 
             nodes = 0
-            for move in board.legal_moves(b):
-                curr_board = board.push(
+            for move in backend.legal_moves(b):
+                curr_board = backend.push(
                     b,
                     move,
                 )
@@ -204,9 +269,9 @@ def uci_parser(
 
             return nodes
 
-        for move in board.legal_moves(CURRENT_BOARD):
-            b = board.push(
-                CURRENT_BOARD,
+        for move in backend.legal_moves(root):
+            b = backend.push(
+                root,
                 move,
             )
             nodes = execute(
@@ -218,26 +283,67 @@ def uci_parser(
         to_display.append(f"Nodes: {total}")
         return to_display
 
+    if tokens[0] == "bench":
+        # the positions are searched to a fixed depth with a table of their own,
+        # the nodes per second tell the speed of the search
+        depth = int(tokens[1]) if len(tokens) > 1 else BENCH_DEPTH
+        total = 0
+        elapsed = 0
+        for fen in BENCH_FENS:
+            config = replace(
+                CONFIG,
+                transposition_table=tt.new(CONFIG.hash_size * 3 / 4),
+                context=SearchContext(),
+            )
+            start = time.time_ns()
+            iterative_deepening.itdep(
+                board.from_fen(fen),
+                config,
+                max_depth=depth,
+                print_uci=False,
+                output=lambda _: None,
+            )
+            elapsed += time.time_ns() - start
+            total += config.context.nodes
+        return [
+            f"Nodes: {total}",
+            f"Time: {elapsed // 1_000_000} ms",
+            f"NPS: {total * 1_000_000_000 // max(1, elapsed)}",
+        ]
+
     if len(tokens) == 1 and tokens[0] == "uci":
         return [
             f"{CONFIG.name} {CONFIG.version} by {CONFIG.author}",
             f"id name {CONFIG.name}",
             f"id author {CONFIG.author}",
-            # fake some options
             "option name Hash type spin default 16 min 1 max 33554432",
+            f"option name Threads type spin default 1 min 1 max {multiprocessing.cpu_count()}",
+            f"option name RootSplit type spin default 0 min 0 max {multiprocessing.cpu_count()}",
+            # fake some options
             "option name Move Overhead type spin default 10 min 0 max 5000",
-            "option name Threads type spin default 1 min 1 max 1",
             "uciok",
         ]
 
-    if tokens[0] == "clearsearch":
-        LAST_SEARCH = None
+    if len(tokens) > 4 and tokens[0] == "setoption" and tokens[3] == "value":
+        if tokens[2] == "Hash":
+            CONFIG.hash_size = int(tokens[4])
+        if tokens[2] == "Threads":
+            CONFIG.threads = int(tokens[4])
+        if tokens[2] == "RootSplit":
+            CONFIG.root_split_processes = int(tokens[4])
+        # the table and the workers are rebuilt for the new sizes
+        if tokens[2] in ("Hash", "Threads", "RootSplit"):
+            start_workers()
+        return []
 
     if tokens[0] == "stop":
         stop_calculating()
 
     if tokens[0] == "quit":
         stop_calculating()
+        for w in WORKERS:
+            worker.shutdown(w)
+        tt.release(CONFIG.transposition_table)
         sys.exit()
 
     if tokens[0] == "play":
@@ -252,6 +358,11 @@ def uci_parser(
         )
 
     if tokens[0] == "ucinewgame":
+        for w in WORKERS:
+            worker.send(
+                w,
+                "ucinewgame",
+            )
         CURRENT_BOARD = board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
         return []
 
@@ -312,67 +423,52 @@ def uci_parser(
         if tokens[1] == "depth":
             depth = int(tokens[2])
 
-        if CURRENT_PROCESS is not None:
-            CURRENT_PROCESS.terminate()
-
-        CURRENT_QUEUE = multiprocessing.Queue()
-        curr_thread = threading.Thread(target=wait_for_current_queue)
-        curr_thread.start()
+        # the worker searches either for a movetime (in deciseconds) or to a fixed depth
         if depth == 0:
-            process = multiprocessing.Process(
-                target=itdep,
-                args=(
-                    CURRENT_QUEUE,
-                    CURRENT_BOARD,
-                    CONFIG,
-                ),
-                kwargs={
-                    "movetime": target_movetime(
-                        CURRENT_BOARD,
-                        movetime,
-                        wtime,
-                        btime,
-                        winc,
-                        binc,
-                    ),
-                    "last_search": LAST_SEARCH,
-                },
-                daemon=False,
+            movetime = target_movetime(
+                CURRENT_BOARD,
+                movetime,
+                wtime,
+                btime,
+                winc,
+                binc,
             )
+            depth = 10
         else:
-            process = multiprocessing.Process(
-                target=itdep,
-                args=(
-                    CURRENT_QUEUE,
-                    CURRENT_BOARD,
-                    CONFIG,
-                ),
-                kwargs={
-                    "max_depth": depth,
-                    "last_search": LAST_SEARCH,
-                },
-                daemon=False,
+            movetime = 0
+
+        for w in WORKERS:
+            worker.send(
+                w,
+                "go",
+                CURRENT_BOARD,
+                movetime,
+                depth,
             )
-        process.start()
-        CURRENT_PROCESS = process
     return []
 
 
-def wait_for_current_queue() -> None:
-    global CURRENT_QUEUE
-    global LAST_SEARCH
-    while CURRENT_QUEUE is not None:
+def print_worker_output(
+    workers: list[worker.Worker],
+) -> None:
+    while True:
         try:
-            last_search = CURRENT_QUEUE.get(timeout=1)
-            if last_search is not None and last_search.end:
-                LAST_SEARCH = last_search
-            break
-        except Exception:
-            pass
+            line = workers[0].connection.recv()
+        except EOFError:
+            return
+        print(
+            line,
+            flush=True,
+        )
+        # the helpers are done once the main worker has played
+        if line.startswith("bestmove"):
+            for helper in workers[1:]:
+                worker.stop(helper)
 
 
 if __name__ == "__main__":
     if len(sys.argv) == 1:
+        start_workers()
         while True:
             line = input()
             for line in uci_parser(line):
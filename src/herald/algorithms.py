@@ -1,19 +1,31 @@
-"""Recursive search algorithms."""
+"""Recursive search algorithms.
+
+The search is a negamax: the scores are seen from the side to move, a child's score
+is the opposite of its parent's. The rest of the engine (evaluation, transposition table,
+quiescence search, nodes) sees the scores from white, they are converted at the boundaries.
+"""
 
 from typing import Callable, Iterable, Optional
 
-from . import board, evaluation
-from .board import Board
+from . import board, evaluation, history, move_ordering, pruning, pv_table, search_context
+from . import transposition_table as tt
+from .board import AnyBoard, Board, MutableBoard
 from .configuration import Config
 from .constants import COLOR, COLOR_DIRECTION, VALUE_MAX
-from .data_structures import Move, Node
+from .data_structures import (
+    Move,
+    Node,
+    captured_piece,
+    is_capture,
+    is_king_capture,
+    is_promotion,
+)
 
 Alg_fn = Callable[
     [
         Config,
         Board,
         int,
-        list[Move],
         bool,
         int | None,
         int | None,
@@ -21,147 +33,396 @@ Alg_fn = Callable[
     Node,
 ]
 
+# called with the node of the root each time its best move changes
+Report_fn = Callable[
+    [Node],
+    None,
+]
+
 
 # alphabeta pruning (fail-soft)
 # with optional move ordering and transposition table
-def alphabeta(  # noqa: C901
+def alphabeta(
     *,
     config: Config,
-    b: Board,
+    b: AnyBoard,
     depth: int,
-    pv: list[Move],
     gen_legal_moves: bool = False,
     alpha: int = -VALUE_MAX,
     beta: int = VALUE_MAX,
     max_depth: int = 0,
     children: int = 0,
-    killer_moves: set[Move] | None = None,
-) -> Iterable[Node]:
-    # detect repetitions
-    if depth != max_depth and b in b.hash_history:
-        yield Node(
-            depth=depth,
-            value=0,
-            pv=pv,
-            lower=alpha,
-            upper=beta,
-            children=children,
+    report: Optional[Report_fn] = None,
+) -> Node:
+    """Search the root, the window and the value of the node are seen from white.
+
+    The intermediate results of the root are given to report, if any.
+    The children of the node are the ones given plus the nodes searched.
+    """
+    # the search plays the moves in place on a mutable copy of the board
+    if isinstance(
+        b,
+        Board,
+    ):
+        b = board.to_mutable(b)
+
+    color = COLOR_DIRECTION[b.turn]
+    nodes = config.context.nodes
+    ply = len(b.undo_stack)
+
+    def report_root(
+        value: int,
+    ) -> None:
+        assert report is not None
+        report(
+            Node(
+                value=color * value,
+                depth=depth,
+                pv=pv_table.root_line(
+                    config.context.pv_table,
+                    config.context.pv_lengths,
+                    ply,
+                ),
+                lower=alpha,
+                upper=beta,
+                children=children + config.context.nodes - nodes,
+            )
         )
-        return
 
-    if config.use_transposition_table and len(pv) > 0:
-        # check if we find a hit in the transposition table
-        node = config.transposition_table.get(
-            b,
-            depth,
+    value = negamax(
+        config=config,
+        b=b,
+        depth=depth,
+        alpha=alpha if b.turn == COLOR.WHITE else -beta,
+        beta=beta if b.turn == COLOR.WHITE else -alpha,
+        gen_legal_moves=gen_legal_moves,
+        max_depth=max_depth,
+        report=report_root if report is not None and max_depth != 0 else None,
+    )
+    return Node(
+        value=color * value,
+        depth=depth,
+        pv=pv_table.root_line(
+            config.context.pv_table,
+            config.context.pv_lengths,
+            ply,
+        ),
+        lower=alpha,
+        upper=beta,
+        children=children + config.context.nodes - nodes,
+    )
+
+
+def white_window(
+    b: AnyBoard,
+    alpha: int,
+    beta: int,
+) -> tuple[int, int]:
+    """The window of the side to move, seen from white."""
+    if b.turn == COLOR.WHITE:
+        return alpha, beta
+    return -beta, -alpha
+
+
+def negamax(  # noqa: C901
+    *,
+    config: Config,
+    b: MutableBoard,
+    depth: int,
+    alpha: int,
+    beta: int,
+    gen_legal_moves: bool = False,
+    max_depth: int = 0,
+    null_move: bool = True,
+    report: Optional[Callable[[int], None]] = None,
+    internal: bool = False,
+) -> int:
+    """Score of the position for the side to move (fail-soft).
+
+    Each time the best move changes, report is called with its score.
+    An internal search (the shallower search of internal iterative deepening)
+    leaves the killer moves, the history and the cutoff counts of its ply to the node.
+    """
+    # raise SearchStopped if the search has to stop
+    search_context.count_node(config.context)
+
+    color = COLOR_DIRECTION[b.turn]
+
+    # the plies are counted from the root of the search, null moves included
+    ply = len(b.undo_stack)
+    pv_table.clear(
+        config.context.pv_lengths,
+        ply,
+    )
+
+    # detect repetitions
+    if depth != max_depth and b.zobrist in b.hash_history:
+        return 0
+
+    hash_move: Optional[Move] = None
+
+    if config.use_transposition_table:
+        entry = tt.probe(
+            config.transposition_table,
+            b.zobrist,
         )
-        if (
-            isinstance(
-                node,
-                Node,
-            )
-            and node.depth >= depth
-        ):
-            # first we make sure that the retrieved node
-            # is in our alpha-beta range
-            if alpha < node.lower and node.upper < beta:
-                # if this is a cut-node
-                if node.value >= node.upper:
+        if entry is not None:
+            (
+                tt_move,
+                tt_value,
+                tt_depth,
+                tt_bound,
+            ) = entry
+            if config.use_hash_move and tt_move:
+                hash_move = tt_move
+
+            # check if we find a hit in the transposition table
+            # the results of deeper searches are at least as good as the one of this node
+            if ply > 0 and tt_depth >= depth:
+                # the bounds of the table are seen from white
+                tt_score = color * tt_value
+                if tt_bound == tt.BOUND_EXACT:
+                    return tt_score
+                if (tt_bound == tt.BOUND_LOWER) == (b.turn == COLOR.WHITE):
                     alpha = max(
                         alpha,
-                        node.value,
+                        tt_score,
                     )
-
-                # if this is an all-node
-                if node.value <= node.lower:
+                else:
                     beta = min(
                         beta,
-                        node.value,
+                        tt_score,
                     )
-
-                # if this is an exact node
-                if node.lower < node.value < node.upper:
-                    yield node
-                    return
+                if alpha >= beta:
+                    return tt_score
 
     # if we are on a terminal node, return the evaluation
     if depth <= 0:
-        value: int = 0
         if config.quiescence_search:
+            # in debug, the quiescence search writes its moves in the row of the ply
             node = config.quiescence_fn(
                 config,
                 b,
-                pv,
-                alpha,
-                beta,
+                *white_window(
+                    b,
+                    alpha,
+                    beta,
+                ),
             )
-
             # type ignore because mypy doesn't see the qs fn
-            children += node.children  # type: ignore
-            value = node.value  # type: ignore
-            if __debug__:
-                # display quiescent nodes
-                pv = node.pv  # type: ignore
-        else:
-            value = evaluation.eval_fast(
-                b.squares,
-                b.remaining_material,
+            return color * node.value  # type: ignore
+        return color * evaluation.eval_board(b)
+
+    # the moves of a node in check are neither pruned nor reduced
+    in_check = board.king_is_in_check(
+        b,
+        b.turn,
+    )
+
+    # the pruning of the shallow nodes compares the static evaluation to the window
+    # (the evaluation cache makes it cheap to compute again)
+    futile = False
+    if (
+        (config.use_futility_pruning and depth <= pruning.FUTILITY_DEPTH)
+        or (config.use_reverse_futility_pruning and depth <= pruning.REVERSE_FUTILITY_DEPTH)
+    ) and (ply > 0 and not in_check):
+        static_eval = evaluation.eval_board(b)
+        window = white_window(
+            b,
+            alpha,
+            beta,
+        )
+
+        # Reverse futility pruning
+        # the opponent cannot bring back an evaluation this far beyond the window
+        if (
+            config.use_reverse_futility_pruning
+            and depth <= pruning.REVERSE_FUTILITY_DEPTH
+            and pruning.is_reverse_futile(
+                b,
+                static_eval,
+                depth,
+                *window,
+                config.reverse_futility_margin,
             )
+        ):
+            return color * static_eval
+
+        # Futility pruning
+        # the quiet moves cannot bring an evaluation this far below the window
+        futile = (
+            config.use_futility_pruning
+            and depth <= pruning.FUTILITY_DEPTH
+            and pruning.is_futile(
+                b,
+                static_eval,
+                depth,
+                *window,
+                config.futility_margin,
+            )
+        )
+
+    # Null move pruning
+    # if the position still fails high when the side to move passes its turn,
+    # any real move would too (unless in zugzwang)
+    # https://www.chessprogramming.org/Null_Move_Pruning
+    if (
+        config.use_null_move_pruning
+        and null_move
+        and ply > 0
+        and depth > pruning.NULL_MOVE_REDUCTION
+        and beta < VALUE_MAX
+        and pruning.can_null_move(b)
+    ):
+        # only beta matters, the search uses a null window on it
+        board.make_null_move(b)
+        score = -negamax(
+            config=config,
+            b=b,
+            depth=depth - 1 - pruning.NULL_MOVE_REDUCTION,
+            alpha=-beta,
+            beta=-beta + 1,
+            max_depth=max_depth,
+            # two null moves in a row would only search the same position shallower
+            null_move=False,
+        )
+        board.unmake_null_move(b)
 
-        yield Node(
-            value=value,
-            depth=0,
-            pv=pv,
-            lower=alpha,
-            upper=beta,
-            children=children,
+        # in zugzwang-prone positions, the cutoff is confirmed by a search of the node itself,
+        # one ply shallower and without a null move (verified null move pruning)
+        if score >= beta and pruning.needs_null_move_verification(b):
+            score = negamax(
+                config=config,
+                b=b,
+                depth=depth - 1,
+                alpha=beta - 1,
+                beta=beta,
+                gen_legal_moves=gen_legal_moves,
+                max_depth=max_depth,
+                null_move=False,
+            )
+
+        # the value of a search that passed a turn is only a bound
+        if score >= beta:
+            return beta
+
+    # Internal iterative deepening (IID)
+    # without a hash move, a shallower search of the node finds the move to try first
+    # https://www.chessprogramming.org/Internal_Iterative_Deepening
+    if (
+        config.use_internal_iterative_deepening
+        and config.use_transposition_table
+        and config.use_hash_move
+        and hash_move is None
+        and ply > 0
+        and depth >= pruning.INTERNAL_ITERATIVE_DEEPENING_DEPTH
+    ):
+        negamax(
+            config=config,
+            b=b,
+            depth=depth - pruning.INTERNAL_ITERATIVE_DEEPENING_REDUCTION,
+            alpha=alpha,
+            beta=beta,
+            gen_legal_moves=gen_legal_moves,
+            max_depth=max_depth,
+            null_move=null_move,
+            internal=True,
+        )
+        entry = tt.probe(
+            config.transposition_table,
+            b.zobrist,
+        )
+        if entry is not None and entry[0]:
+            hash_move = entry[0]
+        # the line of the shallower search is not the one of the node
+        pv_table.clear(
+            config.context.pv_lengths,
+            ply,
         )
-        return
 
-    best = None
+    # Internal iterative reduction (IIR)
+    # a node without a hash move is likely to be ordered poorly, it is searched shallower
+    if (
+        config.use_internal_iterative_reduction
+        and hash_move is None
+        and ply > 0
+        and depth >= pruning.INTERNAL_ITERATIVE_REDUCTION_DEPTH
+    ):
+        depth -= 1
+
+    best: Optional[int] = None
     best_move = None
 
-    moves: Iterable[Move] = []
-    if gen_legal_moves:
-        moves = board.legal_moves(b)
-    else:
-        moves = board.pseudo_legal_moves(b)
+    # the window the moves are searched with tells the bound of the result
+    search_alpha = alpha
+    search_beta = beta
 
-    moves = config.move_ordering_fn(
-        b,
-        moves,
+    # moves known to be legal (the hash move and the killer moves are not)
+    legal_moves: set[Move] = set()
+
+    # the killer moves of the ply are the quiet moves that cut off in the sibling nodes
+    killer_moves = (
+        history.killer_moves(
+            config.context.killers,
+            ply,
+        )
+        if config.use_killer_moves
+        else ()
     )
 
+    # the move that led here, for the countermove heuristic
+    previous_move = board.last_move(b)
+
     def order_moves() -> Iterable[Move]:
-        yielded = set()
-        hash_move: Optional[Move] = config.hash_move_tt.get(
+        moves: Iterable[Move] = []
+        if gen_legal_moves:
+            moves = board.legal_moves(b)
+            legal_moves.update(moves)
+        else:
+            moves = board.pseudo_legal_moves(b)
+
+        moves = config.move_ordering_fn(
             b,
-            None,
+            moves,
         )
-        if hash_move is not None:
+        if config.use_history_heuristic:
+            moves = move_ordering.history_ordering(
+                b,
+                moves,
+                config.context,
+                previous_move,
+            )
+        # the lazy SMP helpers search the root moves in orders of their own,
+        # so that they do not repeat the search of the main worker
+        if ply == 0 and config.helper:
+            moves = move_ordering.rotate(
+                moves,
+                config.helper,
+            )
+
+        yielded = set()
+        # the hash move could come from another position sharing the key
+        if hash_move is not None and board.is_pseudo_legal_move(
+            b,
+            hash_move,
+        ):
             yielded.add(hash_move)
             yield hash_move
         killer_moves_yielded = False
         for move in moves:
             if move in yielded:
                 continue
-            if move.is_capture and move.captured_piece > 2:
+            if is_capture(move) and captured_piece(move) > 2:
                 yielded.add(move)
                 yield move
                 continue
-            if config.use_killer_moves and killer_moves is not None and not killer_moves_yielded:
-                for km in config.move_ordering_fn(
-                    b,
-                    (
-                        km
-                        for km in killer_moves
-                        if board.is_pseudo_legal_move(
-                            b,
-                            km,
-                        )
-                    ),
-                ):
-                    if km not in yielded:
+            if not killer_moves_yielded:
+                # killer moves come from sibling nodes, they might not be possible here
+                for km in killer_moves:
+                    if km not in yielded and board.is_pseudo_legal_move(
+                        b,
+                        km,
+                    ):
                         yielded.add(km)
                         yield km
                 killer_moves_yielded = True
@@ -170,133 +431,178 @@ def alphabeta(  # noqa: C901
             yielded.add(move)
             yield move
 
-    # create the list of the killer moves that will be found in the children nodes
-    next_killer_moves: set[Move] = set()
+    ordered_moves: Iterable[Move]
+    if config.use_staged_move_generation and not gen_legal_moves:
+        # nothing is generated before the hash move has been searched
+        ordered_moves = move_ordering.staged_moves(
+            b,
+            hash_move,
+            killer_moves,
+            config.context if config.use_history_heuristic else None,
+            previous_move,
+        )
+    else:
+        ordered_moves = order_moves()
 
     moves_searched: int = 0
 
-    for move in order_moves():
-        moves_searched += 1
-
-        curr_pv = pv.copy()
-        curr_pv.append(move)
-
+    for move in ordered_moves:
         # return immediately if this is a king capture
-        if move.is_king_capture:
-            yield Node(
-                value=VALUE_MAX * b.turn,
-                depth=depth,
-                pv=curr_pv,
-                lower=alpha,
-                upper=beta,
-                children=children,
+        if is_king_capture(move):
+            pv_table.clear(
+                config.context.pv_lengths,
+                ply + 1,
+            )
+            pv_table.update(
+                config.context.pv_table,
+                config.context.pv_lengths,
+                ply,
+                move,
             )
-            return
+            return VALUE_MAX
 
-        nb = board.push(
+        # Principal variation search (PVS)
+        # once a best move is known, the next ones are searched with a null window
+        # that only tells whether they are better
+        # https://www.chessprogramming.org/Principal_Variation_Search
+        child_beta = beta
+        if config.use_principal_variation_search and best is not None:
+            child_beta = alpha + 1
+
+        board.make_move(
             b,
             move,
         )
 
         # if the king is in check after we move
         # then it's a bad move (we will lose the game)
-        if board.king_is_in_check(
-            nb,
-            nb.invturn,
+        if move not in legal_moves and board.king_is_in_check(
+            b,
+            b.invturn,
+        ):
+            board.unmake_move(b)
+            continue
+
+        # the futile moves are the quiet ones, which neither capture, promote nor check
+        # (one move is searched anyway for the node to have a value)
+        if (
+            futile
+            and best is not None
+            and not is_capture(move)
+            and not is_promotion(move)
+            and not board.king_is_in_check(
+                b,
+                b.turn,
+            )
         ):
+            board.unmake_move(b)
             continue
 
+        # the moves that are illegal or pruned are not counted
+        moves_searched += 1
         new_depth = depth - 1
 
         # Late move reduction (LMR)
-        if config.use_late_move_reduction and not move.is_capture:
-            if moves_searched > 3 + depth * 3:
-                new_depth = depth - 1
-            if moves_searched > 4 + depth * 6:
-                new_depth = depth - 2
-            if moves_searched > 4 + depth * 8:
-                new_depth = depth - 3
-
-        for node in alphabeta(
+        # the quiet moves that come late in the ordering are searched less deeply
+        # https://www.chessprogramming.org/Late_Move_Reductions
+        reduction = 0
+        if (
+            config.use_late_move_reduction
+            and ply > 0
+            and depth >= pruning.LATE_MOVE_REDUCTION_DEPTH
+            and moves_searched > pruning.LATE_MOVE_REDUCTION_MOVES
+            and not in_check
+            and not is_capture(move)
+            and not is_promotion(move)
+            and move != hash_move
+            and move not in killer_moves
+            and not board.king_is_in_check(
+                b,
+                b.turn,
+            )
+        ):
+            reduction = pruning.late_move_reduction(
+                depth,
+                moves_searched,
+            )
+
+        score = -negamax(
             config=config,
-            b=nb,
-            depth=new_depth,
-            pv=curr_pv,
-            gen_legal_moves=False,
-            alpha=alpha,
-            beta=beta,
+            b=b,
+            depth=new_depth - reduction,
+            alpha=-child_beta,
+            beta=-alpha,
             max_depth=max_depth,
-            children=children,
-            killer_moves=next_killer_moves,
-        ):
-            continue
+        )
 
-        children = node.children
-
-        has_changed: bool = False
-        if b.turn == COLOR.WHITE:
-            if best is None or node.value > best.value:
-                has_changed = True
-                best_move = move
-                best = Node(
-                    value=node.value,
-                    depth=depth,
-                    pv=node.pv,
-                    lower=alpha,
-                    upper=beta,
-                    children=children,
-                )
-            alpha = max(
-                alpha,
-                node.value,
+        # the reduced move may be better than the best one: search it at full depth
+        if reduction > 0 and score > alpha:
+            score = -negamax(
+                config=config,
+                b=b,
+                depth=new_depth,
+                alpha=-child_beta,
+                beta=-alpha,
+                max_depth=max_depth,
             )
-            if node.value >= beta:
-                if config.use_killer_moves and killer_moves is not None:
-                    killer_moves.add(move)
-                break
-        else:
-            if best is None or node.value < best.value:
-                has_changed = True
-                best_move = move
-                best = Node(
-                    value=node.value,
-                    depth=depth,
-                    pv=node.pv,
-                    lower=alpha,
-                    upper=beta,
-                    children=children,
-                )
-            beta = min(
-                beta,
-                node.value,
+
+        # the move is better than the best one but does not cut off:
+        # search it again with the full window to get its value
+        if child_beta != beta and alpha < score < beta:
+            score = -negamax(
+                config=config,
+                b=b,
+                depth=new_depth,
+                alpha=-beta,
+                beta=-alpha,
+                max_depth=max_depth,
             )
-            if node.value <= alpha:
-                if config.use_killer_moves and killer_moves is not None:
-                    killer_moves.add(move)
-                break
 
-        # print our intermediary result
-        if max_depth != 0 and best is not None and depth == max_depth and has_changed:
-            yield best
+        board.unmake_move(b)
 
-    if config.use_transposition_table:
-        # Save the resulting best node in the transposition table
-        if best is not None and best.depth > 0:
-            config.transposition_table[b] = best
-        if config.use_hash_move:
-            if best_move is not None:
-                config.hash_move_tt[b] = best_move
-
-    if best is not None:
-        node = Node(
-            depth=best.depth,
-            value=best.value,
-            pv=best.pv,
-            lower=alpha,
-            upper=beta,
-            children=children,
+        first_move = best is None
+        if best is None or score > best:
+            best = score
+            best_move = move
+            pv_table.update(
+                config.context.pv_table,
+                config.context.pv_lengths,
+                ply,
+                move,
+            )
+            # print our intermediary result
+            if report is not None and score < beta:
+                report(score)
+        alpha = max(
+            alpha,
+            score,
         )
-    else:
+
+        if score >= beta and internal:
+            break
+
+        if score >= beta:
+            if config.use_killer_moves and not is_capture(move):
+                history.add_killer(
+                    config.context.killers,
+                    ply,
+                    move,
+                )
+            if config.use_history_heuristic and not is_capture(move) and not is_promotion(move):
+                history.add_cutoff(
+                    config.context.history,
+                    config.context.countermoves,
+                    b.turn,
+                    move,
+                    previous_move,
+                    depth,
+                )
+            config.context.cutoffs += 1
+            if first_move:
+                config.context.first_move_cutoffs += 1
+            break
+
+    if best is None:
         # no "best" found
         # should happen only in case of stalemate/checkmate
         if board.is_square_attacked(
@@ -304,22 +610,24 @@ def alphabeta(  # noqa: C901
             b.king_squares[b.turn],
             b.invturn,
         ):
-            node = Node(
-                depth=depth,
-                value=VALUE_MAX * COLOR_DIRECTION[b.turn] * -1,
-                pv=pv,
-                lower=alpha,
-                upper=beta,
-                children=children,
-            )
+            return -VALUE_MAX
+        return 0
+
+    # Save the resulting best score in the transposition table, seen from white
+    if config.use_transposition_table:
+        if best <= search_alpha:
+            bound = tt.BOUND_UPPER if b.turn == COLOR.WHITE else tt.BOUND_LOWER
+        elif best >= search_beta:
+            bound = tt.BOUND_LOWER if b.turn == COLOR.WHITE else tt.BOUND_UPPER
         else:
-            node = Node(
-                depth=depth,
-                value=0,
-                pv=pv,
-                lower=alpha,
-                upper=beta,
-                children=children,
-            )
+            bound = tt.BOUND_EXACT
+        tt.store(
+            config.transposition_table,
+            b.zobrist,
+            best_move if config.use_hash_move else None,
+            color * best,
+            depth,
+            bound,
+        )
 
-    yield node
+    return best
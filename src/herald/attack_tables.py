@@ -0,0 +1,71 @@
+"""Precomputed attack tables for the 10x12 mailbox.
+
+https://www.chessprogramming.org/Mailbox
+Every table is indexed by mailbox square and built once at import.
+The squares they list are always on the board, in the order of the displacements,
+so move generation and attack detection never need to test for the border.
+"""
+
+KNIGHT_DEPLS = (21, 12, -8, -19, -21, -12, 8, 19)
+KING_DEPLS = (11, -11, 9, -9, 1, -1, 10, -10)
+BISHOP_DIRECTIONS = (11, -11, 9, -9)
+ROOK_DIRECTIONS = (10, -10, 1, -1)
+QUEEN_DIRECTIONS = BISHOP_DIRECTIONS + ROOK_DIRECTIONS
+
+
+def _on_board(
+    square: int,
+) -> bool:
+    return 1 < square // 10 < 10 and 0 < square % 10 < 9
+
+
+def _targets(
+    depls: tuple[int, ...],
+) -> tuple[tuple[int, ...], ...]:
+    return tuple(
+        tuple(square + depl for depl in depls if _on_board(square + depl))
+        if _on_board(square)
+        else ()
+        for square in range(120)
+    )
+
+
+def _rays(
+    directions: tuple[int, ...],
+) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    rays = []
+    for square in range(120):
+        square_rays = []
+        if _on_board(square):
+            for direction in directions:
+                ray = []
+                end = square + direction
+                while _on_board(end):
+                    ray.append(end)
+                    end += direction
+                # empty rays are dropped, there is nothing to walk
+                if ray:
+                    square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+KNIGHT_TARGETS = _targets(KNIGHT_DEPLS)
+KING_TARGETS = _targets(KING_DEPLS)
+
+# indexed by [COLOR][square]
+# squares attacked by a pawn of COLOR standing on the square
+PAWN_TARGETS = (
+    _targets((-9, -11)),
+    _targets((9, 11)),
+)
+# squares where a pawn of COLOR would attack the square
+PAWN_SOURCES = (
+    _targets((9, 11)),
+    _targets((-9, -11)),
+)
+
+# rays going away from the square, stopping at the edge of the board
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+QUEEN_RAYS = _rays(QUEEN_DIRECTIONS)
@@ -0,0 +1,747 @@
+"""Bitboard backend.
+
+https://www.chessprogramming.org/Bitboards
+Each piece type of each color is stored in a python int used as a 64-bit bitboard
+(bit 0 is a1, bit 63 is h8).
+The moves produced use the mailbox square numbering,
+so they are the same move ints as the ones produced by the board module
+and both backends can be compared move for move (with perft for example).
+"""
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from . import board, evaluation, zobrist
+from .board import CASTLING_ROOK_MOVES, Board
+from .constants import CASTLE, COLOR, COLOR_DIRECTION, PIECE
+from .data_structures import Move, encode_move, is_castle, move_en_passant, move_end, move_start
+
+# mailbox square -> bit index (-1 outside of the board)
+TO_BIT: tuple[int, ...] = tuple(
+    (9 - square // 10) * 8 + square % 10 - 1
+    if 1 < square // 10 < 10 and 0 < square % 10 < 9
+    else -1
+    for square in range(120)
+)
+
+# bit index -> mailbox square
+TO_MAILBOX: tuple[int, ...] = tuple((9 - bit // 8) * 10 + bit % 8 + 1 for bit in range(64))
+
+
+def _leaper_attacks(
+    offsets: tuple[int, ...],
+) -> tuple[int, ...]:
+    attacks = []
+    for bit in range(64):
+        bb = 0
+        for offset in offsets:
+            target = TO_BIT[TO_MAILBOX[bit] + offset]
+            if target != -1:
+                bb |= 1 << target
+        attacks.append(bb)
+    return tuple(attacks)
+
+
+KNIGHT_ATTACKS = _leaper_attacks((21, 12, -8, -19, -21, -12, 8, 19))
+KING_ATTACKS = _leaper_attacks((11, -11, 9, -9, 1, -1, 10, -10))
+# squares attacked by a pawn of the given color
+PAWN_ATTACKS = (
+    _leaper_attacks((-9, -11)),
+    _leaper_attacks((9, 11)),
+)
+
+# mailbox offset of each direction
+# and whether following it increases the bit index
+DIRECTIONS: tuple[tuple[int, bool], ...] = (
+    (-10, True),
+    (10, False),
+    (1, True),
+    (-1, False),
+    (-9, True),
+    (-11, True),
+    (9, False),
+    (11, False),
+)
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+
+
+def _rays() -> tuple[tuple[int, ...], ...]:
+    rays = []
+    for offset, _ in DIRECTIONS:
+        direction_rays = []
+        for bit in range(64):
+            bb = 0
+            square = TO_MAILBOX[bit] + offset
+            while TO_BIT[square] != -1:
+                bb |= 1 << TO_BIT[square]
+                square += offset
+            direction_rays.append(bb)
+        rays.append(tuple(direction_rays))
+    return tuple(rays)
+
+
+# indexed by [direction][bit], the squares reached from bit on an empty board
+RAYS = _rays()
+
+
+def _relevant_occupancy(
+    directions: tuple[int, ...],
+) -> tuple[int, ...]:
+    """Return the squares whose occupancy changes the attacks of a slider.
+
+    The last square of a ray is always attacked, whatever is on it.
+    """
+    masks = []
+    for bit in range(64):
+        mask = 0
+        for direction in directions:
+            ray = RAYS[direction][bit]
+            if ray:
+                (offset, increasing) = DIRECTIONS[direction]
+                last = ray.bit_length() - 1 if increasing else (ray & -ray).bit_length() - 1
+                mask |= ray ^ (1 << last)
+        masks.append(mask)
+    return tuple(masks)
+
+
+ROOK_OCCUPANCY = _relevant_occupancy(ROOK_DIRECTIONS)
+BISHOP_OCCUPANCY = _relevant_occupancy(BISHOP_DIRECTIONS)
+
+# sliding attacks indexed by [bit][relevant occupancy]
+# they are filled on first use instead of enumerating every occupancy at import
+ROOK_ATTACKS: tuple[dict[int, int], ...] = tuple({} for _ in range(64))
+BISHOP_ATTACKS: tuple[dict[int, int], ...] = tuple({} for _ in range(64))
+
+RANK_2 = 0xFF << 8
+RANK_7 = 0xFF << 48
+
+
+def _slider_attacks(
+    bit: int,
+    occupancy: int,
+    directions: tuple[int, ...],
+) -> int:
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][bit]
+        blockers = ray & occupancy
+        if blockers:
+            # the ray stops at the first blocker
+            if DIRECTIONS[direction][1]:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[direction][first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(
+    bit: int,
+    occupancy: int,
+) -> int:
+    occupancy &= ROOK_OCCUPANCY[bit]
+    attacks = ROOK_ATTACKS[bit].get(occupancy)
+    if attacks is None:
+        attacks = _slider_attacks(
+            bit,
+            occupancy,
+            ROOK_DIRECTIONS,
+        )
+        ROOK_ATTACKS[bit][occupancy] = attacks
+    return attacks
+
+
+def bishop_attacks(
+    bit: int,
+    occupancy: int,
+) -> int:
+    occupancy &= BISHOP_OCCUPANCY[bit]
+    attacks = BISHOP_ATTACKS[bit].get(occupancy)
+    if attacks is None:
+        attacks = _slider_attacks(
+            bit,
+            occupancy,
+            BISHOP_DIRECTIONS,
+        )
+        BISHOP_ATTACKS[bit][occupancy] = attacks
+    return attacks
+
+
+@dataclass(frozen=True)
+class BitBoard:
+    # bitboard of each piece, indexed by PIECE + 6 * COLOR (index 0 is unused)
+    pieces: tuple[
+        int,
+        ...,
+    ]
+    # bitboard of all the pieces of each color
+    colors: tuple[
+        int,
+        int,
+    ]
+    turn: COLOR
+    # tuple reprensenting castling rights (index 2 * COLOR + CASTLE)
+    castling_rights: tuple[
+        int,
+        ...,
+    ]
+    # mailbox square, like Board.en_passant
+    en_passant: int
+    half_move: int
+    full_move: int
+    invturn: COLOR
+    remaining_material: int
+    hash_history: set[int]
+    # same key as the one of the equivalent Board
+    zobrist: int
+
+    def __hash__(
+        self,
+    ) -> int:
+        return self.zobrist
+
+
+def from_board(
+    b: Board,
+) -> BitBoard:
+    pieces = [0] * 13
+    colors = [0, 0]
+    for bit in range(64):
+        piece = b.squares[TO_MAILBOX[bit]]
+        if piece != PIECE.EMPTY:
+            pieces[piece] |= 1 << bit
+            colors[(piece - 1) // 6] |= 1 << bit
+    return BitBoard(
+        tuple(pieces),
+        (
+            colors[0],
+            colors[1],
+        ),
+        b.turn,
+        b.castling_rights,
+        b.en_passant,
+        b.half_move,
+        b.full_move,
+        b.invturn,
+        b.remaining_material,
+        b.hash_history,
+        b.zobrist,
+    )
+
+
+def to_board(
+    b: BitBoard,
+) -> Board:
+    squares = list(board.from_fen("8/8/8/8/8/8/8/8 w - - 0 1").squares)
+    king_squares = [0, 0]
+    for piece in range(1, 13):
+        for bit in _bits(b.pieces[piece]):
+            squares[TO_MAILBOX[bit]] = piece
+            if piece in (PIECE.KING, PIECE.KING + 6):
+                king_squares[(piece - 1) // 6] = TO_MAILBOX[bit]
+    return Board(
+        tuple(squares),
+        b.turn,
+        b.castling_rights,
+        b.en_passant,
+        b.half_move,
+        b.full_move,
+        (
+            king_squares[0],
+            king_squares[1],
+        ),
+        b.invturn,
+        b.remaining_material,
+        b.hash_history,
+        b.zobrist,
+        board.build_piece_lists(squares),
+    )
+
+
+def from_fen(
+    fen: str,
+) -> BitBoard:
+    return from_board(board.from_fen(fen))
+
+
+def to_fen(
+    b: BitBoard,
+) -> str:
+    return board.to_fen(to_board(b))
+
+
+def _bits(
+    bb: int,
+) -> Iterable[int]:
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def _piece_type_at(
+    b: BitBoard,
+    mask: int,
+    color: COLOR,
+) -> PIECE:
+    for piece in (
+        PIECE.PAWN,
+        PIECE.KNIGHT,
+        PIECE.BISHOP,
+        PIECE.ROOK,
+        PIECE.QUEEN,
+        PIECE.KING,
+    ):
+        if b.pieces[piece + 6 * color] & mask:
+            return piece
+    return PIECE.EMPTY
+
+
+def push(
+    b: BitBoard,
+    move: Move,
+    fast: bool = True,
+) -> BitBoard:
+    pieces = list(b.pieces)
+    colors = list(b.colors)
+    castling_rights = list(b.castling_rights)
+    turn = b.turn
+    invturn = b.invturn
+    remaining_material = b.remaining_material
+    half_move = b.half_move + 1
+    key = b.zobrist
+
+    start = move_start(move)
+    end = move_end(move)
+    en_passant = move_en_passant(move)
+    start_mask = 1 << TO_BIT[start]
+    end_mask = 1 << TO_BIT[end]
+    piece_type = _piece_type_at(
+        b,
+        start_mask,
+        turn,
+    )
+    assert piece_type != PIECE.EMPTY, "Moving piece cannot be empty"
+    piece = piece_type + 6 * turn
+
+    # capture
+    if colors[invturn] & end_mask:
+        captured = (
+            _piece_type_at(
+                b,
+                end_mask,
+                invturn,
+            )
+            + 6 * invturn
+        )
+        pieces[captured] ^= end_mask
+        colors[invturn] ^= end_mask
+        key ^= zobrist.PIECES[captured][end]
+        remaining_material -= evaluation.PIECE_VALUE[captured - 6 * invturn]
+        half_move = 0
+
+    # do the move
+    pieces[piece] ^= start_mask | end_mask
+    colors[turn] ^= start_mask | end_mask
+    key ^= zobrist.PIECES[piece][start] ^ zobrist.PIECES[piece][end]
+
+    if piece_type == PIECE.PAWN:
+        half_move = 0
+
+        # special removal for "en passant" moves
+        if end == b.en_passant:
+            target = end + (10 * COLOR_DIRECTION[turn])
+            target_mask = 1 << TO_BIT[target]
+            pieces[PIECE.PAWN + 6 * invturn] ^= target_mask
+            colors[invturn] ^= target_mask
+            key ^= zobrist.PIECES[PIECE.PAWN + 6 * invturn][target]
+            remaining_material -= evaluation.PIECE_VALUE[PIECE.PAWN]
+
+        # promotion
+        if end // 10 == (2 if turn == COLOR.WHITE else 9):
+            pieces[piece] ^= end_mask
+            pieces[PIECE.QUEEN + 6 * turn] |= end_mask
+            key ^= zobrist.PIECES[piece][end]
+            key ^= zobrist.PIECES[PIECE.QUEEN + 6 * turn][end]
+            remaining_material += (
+                evaluation.PIECE_VALUE[PIECE.QUEEN] - evaluation.PIECE_VALUE[PIECE.PAWN]
+            )
+
+    if is_castle(move):
+        (
+            rook_start,
+            rook_end,
+        ) = CASTLING_ROOK_MOVES[end]
+        rook = PIECE.ROOK + 6 * turn
+        rook_mask = (1 << TO_BIT[rook_start]) | (1 << TO_BIT[rook_end])
+        pieces[rook] ^= rook_mask
+        colors[turn] ^= rook_mask
+        key ^= zobrist.PIECES[rook][rook_start] ^ zobrist.PIECES[rook][rook_end]
+
+    # remove castling rights
+    if piece_type == PIECE.KING:
+        castling_rights[2 * turn + CASTLE.KING_SIDE] = 0
+        castling_rights[2 * turn + CASTLE.QUEEN_SIDE] = 0
+    if end == 98 or start == 98:
+        castling_rights[2 * COLOR.WHITE + CASTLE.KING_SIDE] = 0
+    if end == 91 or start == 91:
+        castling_rights[2 * COLOR.WHITE + CASTLE.QUEEN_SIDE] = 0
+    if end == 28 or start == 28:
+        castling_rights[2 * COLOR.BLACK + CASTLE.KING_SIDE] = 0
+    if end == 21 or start == 21:
+        castling_rights[2 * COLOR.BLACK + CASTLE.QUEEN_SIDE] = 0
+    for i in range(4):
+        if castling_rights[i] != b.castling_rights[i]:
+            key ^= zobrist.CASTLING[i]
+
+    if b.en_passant != -1:
+        key ^= zobrist.EN_PASSANT[b.en_passant]
+    if en_passant != -1:
+        key ^= zobrist.EN_PASSANT[en_passant]
+
+    if fast:
+        hash_history = b.hash_history
+    else:
+        hash_history = b.hash_history.copy()
+        hash_history.add(b.zobrist)
+
+    return BitBoard(
+        tuple(pieces),
+        (
+            colors[0],
+            colors[1],
+        ),
+        invturn,
+        tuple(castling_rights),
+        en_passant,
+        half_move,
+        b.full_move + 1 if turn == COLOR.BLACK else b.full_move,
+        turn,
+        remaining_material,
+        hash_history,
+        key ^ zobrist.TURN,
+    )
+
+
+def is_square_attacked(
+    b: BitBoard,
+    square: int,
+    color: COLOR,
+) -> bool:
+    """Detect if square (mailbox) on b is attacked by color."""
+    bit = TO_BIT[square]
+    pieces = b.pieces
+    offset = 6 * color
+    if KNIGHT_ATTACKS[bit] & pieces[PIECE.KNIGHT + offset]:
+        return True
+    if PAWN_ATTACKS[1 - color][bit] & pieces[PIECE.PAWN + offset]:
+        return True
+    if KING_ATTACKS[bit] & pieces[PIECE.KING + offset]:
+        return True
+    occupancy = b.colors[0] | b.colors[1]
+    queens = pieces[PIECE.QUEEN + offset]
+    if rook_attacks(bit, occupancy) & (pieces[PIECE.ROOK + offset] | queens):
+        return True
+    if bishop_attacks(bit, occupancy) & (pieces[PIECE.BISHOP + offset] | queens):
+        return True
+    return False
+
+
+def king_is_in_check(
+    b: BitBoard,
+    color: COLOR,
+) -> bool:
+    king = b.pieces[PIECE.KING + 6 * color]
+    if not king:
+        return False
+    return is_square_attacked(
+        b,
+        TO_MAILBOX[king.bit_length() - 1],
+        COLOR.WHITE if color == COLOR.BLACK else COLOR.BLACK,
+    )
+
+
+def _moves_to(
+    b: BitBoard,
+    start: int,
+    targets: int,
+    piece: PIECE,
+) -> Iterable[Move]:
+    enemies = b.colors[b.invturn]
+    while targets:
+        lsb = targets & -targets
+        targets ^= lsb
+        end = TO_MAILBOX[lsb.bit_length() - 1]
+        if lsb & enemies:
+            captured = _piece_type_at(
+                b,
+                lsb,
+                b.invturn,
+            )
+            yield encode_move(
+                start=start,
+                end=end,
+                moving_piece=piece,
+                captured_piece=captured,
+                is_capture=True,
+                is_castle=False,
+                en_passant=-1,
+            )
+        else:
+            yield encode_move(
+                start=start,
+                end=end,
+                moving_piece=piece,
+                captured_piece=PIECE.EMPTY,
+                is_capture=False,
+                is_castle=False,
+                en_passant=-1,
+            )
+
+
+def _pawn_moves(
+    b: BitBoard,
+) -> Iterable[Move]:
+    turn = b.turn
+    pawns = b.pieces[PIECE.PAWN + 6 * turn]
+    empty = ~(b.colors[0] | b.colors[1])
+    # a pawn moves 8 bits up for white and 8 bits down for black
+    shift = 8 if turn == COLOR.WHITE else -8
+    double_rank = RANK_2 if turn == COLOR.WHITE else RANK_7
+
+    for bit in _bits(pawns):
+        start = TO_MAILBOX[bit]
+        single = bit + shift
+        if (1 << single) & empty:
+            yield encode_move(
+                start=start,
+                end=TO_MAILBOX[single],
+                moving_piece=PIECE.PAWN,
+                captured_piece=PIECE.EMPTY,
+                is_capture=False,
+                is_castle=False,
+                en_passant=-1,
+            )
+            double = single + shift
+            if (1 << bit) & double_rank and (1 << double) & empty:
+                yield encode_move(
+                    start=start,
+                    end=TO_MAILBOX[double],
+                    moving_piece=PIECE.PAWN,
+                    captured_piece=PIECE.EMPTY,
+                    is_capture=False,
+                    is_castle=False,
+                    en_passant=TO_MAILBOX[single],
+                )
+        yield from _moves_to(
+            b,
+            start,
+            PAWN_ATTACKS[turn][bit] & b.colors[b.invturn],
+            PIECE.PAWN,
+        )
+        if b.en_passant != -1 and PAWN_ATTACKS[turn][bit] & (1 << TO_BIT[b.en_passant]):
+            yield encode_move(
+                start=start,
+                end=b.en_passant,
+                moving_piece=PIECE.PAWN,
+                captured_piece=PIECE.PAWN,
+                is_capture=True,
+                is_castle=False,
+                en_passant=-1,
+            )
+
+
+def _castling_moves(
+    b: BitBoard,
+) -> Iterable[Move]:
+    turn = b.turn
+    occupancy = b.colors[0] | b.colors[1]
+    rooks = b.pieces[PIECE.ROOK + 6 * turn]
+    king_start = 95 if turn == COLOR.WHITE else 25
+    if not b.pieces[PIECE.KING + 6 * turn] & (1 << TO_BIT[king_start]):
+        return
+    for side, king_end, between in (
+        (CASTLE.KING_SIDE, king_start + 2, (1, 2)),
+        (CASTLE.QUEEN_SIDE, king_start - 2, (-1, -2, -3)),
+    ):
+        if b.castling_rights[2 * turn + side] != 1:
+            continue
+        (
+            rook_start,
+            _,
+        ) = CASTLING_ROOK_MOVES[king_end]
+        if not rooks & (1 << TO_BIT[rook_start]):
+            continue
+        if any(occupancy & (1 << TO_BIT[king_start + depl]) for depl in between):
+            continue
+        if king_is_in_check(
+            b,
+            turn,
+        ):
+            return
+        yield encode_move(
+            start=king_start,
+            end=king_end,
+            moving_piece=PIECE.KING,
+            captured_piece=PIECE.EMPTY,
+            is_capture=False,
+            is_castle=True,
+            en_passant=-1,
+        )
+
+
+def pseudo_legal_moves(
+    b: BitBoard,
+) -> Iterable[Move]:
+    offset = 6 * b.turn
+    pieces = b.pieces
+    own = b.colors[b.turn]
+    occupancy = b.colors[0] | b.colors[1]
+
+    yield from _pawn_moves(b)
+    for bit in _bits(pieces[PIECE.KNIGHT + offset]):
+        yield from _moves_to(
+            b,
+            TO_MAILBOX[bit],
+            KNIGHT_ATTACKS[bit] & ~own,
+            PIECE.KNIGHT,
+        )
+    for bit in _bits(pieces[PIECE.BISHOP + offset]):
+        yield from _moves_to(
+            b,
+            TO_MAILBOX[bit],
+            bishop_attacks(bit, occupancy) & ~own,
+            PIECE.BISHOP,
+        )
+    for bit in _bits(pieces[PIECE.ROOK + offset]):
+        yield from _moves_to(
+            b,
+            TO_MAILBOX[bit],
+            rook_attacks(bit, occupancy) & ~own,
+            PIECE.ROOK,
+        )
+    for bit in _bits(pieces[PIECE.QUEEN + offset]):
+        yield from _moves_to(
+            b,
+            TO_MAILBOX[bit],
+            (rook_attacks(bit, occupancy) | bishop_attacks(bit, occupancy)) & ~own,
+            PIECE.QUEEN,
+        )
+    for bit in _bits(pieces[PIECE.KING + offset]):
+        yield from _moves_to(
+            b,
+            TO_MAILBOX[bit],
+            KING_ATTACKS[bit] & ~own,
+            PIECE.KING,
+        )
+    yield from _castling_moves(b)
+
+
+def is_legal_move(
+    b: BitBoard,
+    move: Move,
+) -> bool:
+    # a castling move is not acceptable if the transition square is attacked
+    # (the king not being in check is verified when generating it)
+    if is_castle(move) and is_square_attacked(
+        b,
+        (move_start(move) + move_end(move)) // 2,
+        b.invturn,
+    ):
+        return False
+
+    return not king_is_in_check(
+        push(
+            b,
+            move,
+        ),
+        b.turn,
+    )
+
+
+def legal_moves(
+    b: BitBoard,
+) -> list[Move]:
+    if not b.pieces[PIECE.KING + 6 * b.turn]:
+        return []
+    return [
+        move
+        for move in pseudo_legal_moves(b)
+        if is_legal_move(
+            b,
+            move,
+        )
+    ]
+
+
+# Special function to create moves that target a square
+# Useful for the SEE function
+# is LVA (least valuable attacker) by implementation
+def capture_moves(
+    b: BitBoard,
+    target: int,
+) -> Iterable[Move]:
+    bit = TO_BIT[target]
+    offset = 6 * b.turn
+    pieces = b.pieces
+    occupancy = b.colors[0] | b.colors[1]
+    captured = _piece_type_at(
+        b,
+        1 << bit,
+        b.invturn if b.colors[b.invturn] & (1 << bit) else b.turn,
+    )
+    rook_targets = rook_attacks(bit, occupancy)
+    bishop_targets = bishop_attacks(bit, occupancy)
+
+    for piece, attackers in (
+        (PIECE.PAWN, PAWN_ATTACKS[b.invturn][bit]),
+        (PIECE.KNIGHT, KNIGHT_ATTACKS[bit]),
+        (PIECE.BISHOP, bishop_targets),
+        (PIECE.ROOK, rook_targets),
+        (PIECE.QUEEN, rook_targets | bishop_targets),
+        (PIECE.KING, KING_ATTACKS[bit]),
+    ):
+        for start in _bits(attackers & pieces[piece + offset]):
+            yield encode_move(
+                start=TO_MAILBOX[start],
+                end=target,
+                moving_piece=piece,
+                captured_piece=captured,
+                is_capture=True,
+                is_castle=False,
+                en_passant=-1,
+            )
+
+
+def tactical_moves(
+    b: BitBoard,
+) -> Iterable[Move]:
+    """Generate capture moves in MVV-LVA order, then en passant captures."""
+    offset = 6 * b.invturn
+    for piece in (
+        PIECE.QUEEN,
+        PIECE.ROOK,
+        PIECE.BISHOP,
+        PIECE.KNIGHT,
+        PIECE.PAWN,
+    ):
+        for bit in _bits(b.pieces[piece + offset]):
+            yield from capture_moves(
+                b,
+                TO_MAILBOX[bit],
+            )
+
+    if b.en_passant != -1:
+        bit = TO_BIT[b.en_passant]
+        for start in _bits(PAWN_ATTACKS[b.invturn][bit] & b.pieces[PIECE.PAWN + 6 * b.turn]):
+            yield encode_move(
+                start=TO_MAILBOX[start],
+                end=b.en_passant,
+                moving_piece=PIECE.PAWN,
+                captured_piece=PIECE.PAWN,
+                is_capture=True,
+                is_castle=False,
+                en_passant=-1,
+            )
@@ -1,8 +1,17 @@
-from dataclasses import dataclass
-from functools import cache
-from typing import Iterable
-
-from . import evaluation
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Sequence
+
+from . import caches, evaluation, zobrist
+from .attack_tables import (
+    BISHOP_RAYS,
+    KING_TARGETS,
+    KNIGHT_TARGETS,
+    PAWN_SOURCES,
+    PAWN_TARGETS,
+    QUEEN_RAYS,
+    ROOK_RAYS,
+)
 from .constants import (
     ASCII_REP,
     CASTLE,
@@ -12,9 +21,21 @@ from .constants import (
     IS_PIECE,
     IS_PVALUE,
     PIECE,
-    get_color,
+    PIECE_COLOR,
+)
+from .data_structures import (
+    Move,
+    captured_piece,
+    encode_move,
+    is_capture,
+    is_castle,
+    move_en_passant,
+    move_end,
+    move_start,
+    moving_piece,
+    to_normal_notation,
+    to_square_notation,
 )
-from .data_structures import Move, to_normal_notation, to_square_notation
 
 
 @dataclass(frozen=True)
@@ -42,18 +63,69 @@ class Board:
     ]
     invturn: COLOR
     remaining_material: int
+    # zobrist keys of the positions played before this one
     hash_history: set[int]
+    # zobrist key of the position, updated incrementally by push()
+    zobrist: int
+    # sorted squares of each piece, indexed by PIECE + 6 * COLOR
+    # https://www.chessprogramming.org/Piece-Lists
+    piece_lists: tuple[
+        tuple[int, ...],
+        ...,
+    ]
 
     def __hash__(
         self,
     ) -> int:
-        return hash(
-            (
-                self.squares,
-                self.turn,
-                self.castling_rights,
-            )
-        )
+        return self.zobrist
+
+
+@dataclass
+class MutableBoard:
+    """Same fields as Board, modified in place by make_move() and unmake_move().
+
+    The search uses it to avoid copying the board for every move it tries.
+    """
+
+    squares: list[int]
+    turn: COLOR
+    castling_rights: list[int]
+    en_passant: int
+    half_move: int
+    full_move: int
+    king_squares: list[int]
+    invturn: COLOR
+    remaining_material: int
+    hash_history: set[int]
+    zobrist: int
+    piece_lists: list[list[int]]
+    # what is needed to revert each move played with make_move()
+    undo_stack: list[tuple[Any, ...]] = field(default_factory=list)
+
+
+# read-only functions accept both kinds of boards
+AnyBoard = Board | MutableBoard
+
+# rook start and end squares, indexed by the end square of the castling king
+CASTLING_ROOK_MOVES: dict[
+    int,
+    tuple[int, int],
+] = {
+    97: (98, 96),
+    93: (91, 94),
+    27: (28, 26),
+    23: (21, 24),
+}
+
+
+def build_piece_lists(
+    squares: Sequence[int],
+) -> tuple[tuple[int, ...], ...]:
+    piece_lists: list[list[int]] = [[] for _ in range(13)]
+    for square in range(21, 99):
+        if squares[square] not in (PIECE.EMPTY, PIECE.INVALID):
+            piece_lists[squares[square]].append(square)
+    return tuple(tuple(squares) for squares in piece_lists)
 
 
 def to_fen(
@@ -125,7 +197,7 @@ def from_uci(
     start = to_square_notation(uci[:2])
     end = to_square_notation(uci[2:])
     is_capture = IS_PIECE[b.squares[end]] != PIECE.EMPTY or end == b.en_passant
-    return Move(
+    return encode_move(
         start=start,
         end=end,
         moving_piece=IS_PIECE[b.squares[start]],
@@ -225,229 +297,461 @@ def from_fen(
         ks[1],
     )
 
+    color = COLOR.WHITE if turn == "w" else COLOR.BLACK
+    ep = to_square_notation(en_passant) if en_passant != "-" else -1
+
+    piece_lists = build_piece_lists(squares)
+
     b = Board(
         tuple(squares),
-        COLOR.WHITE if turn == "w" else COLOR.BLACK,
+        color,
         cr,
-        (to_square_notation(en_passant) if en_passant != "-" else -1),
+        ep,
         int(half_move),
         int(full_move),
         king_squares,
         COLOR.WHITE if turn == "b" else COLOR.BLACK,
-        evaluation.remaining_material(tuple(squares)),
+        evaluation.remaining_material(piece_lists),
         set(),
+        zobrist.compute_hash(
+            tuple(squares),
+            color,
+            cr,
+            ep,
+        ),
+        piece_lists,
     )
 
     return b
 
 
+def to_mutable(
+    b: Board,
+) -> "MutableBoard":
+    return MutableBoard(
+        list(b.squares),
+        b.turn,
+        list(b.castling_rights),
+        b.en_passant,
+        b.half_move,
+        b.full_move,
+        list(b.king_squares),
+        b.invturn,
+        b.remaining_material,
+        b.hash_history,
+        b.zobrist,
+        [list(squares) for squares in b.piece_lists],
+    )
+
+
+def to_immutable(
+    b: "MutableBoard",
+) -> Board:
+    return Board(
+        tuple(b.squares),
+        b.turn,
+        tuple(b.castling_rights),
+        b.en_passant,
+        b.half_move,
+        b.full_move,
+        tuple(b.king_squares),
+        b.invturn,
+        b.remaining_material,
+        b.hash_history,
+        b.zobrist,
+        tuple(tuple(squares) for squares in b.piece_lists),
+    )
+
+
 def push(
     b: Board,
     move: Move,
     fast: bool = True,
 ) -> Board:
-    squares = list(b.squares)
-    en_passant = -1
-    castling_rights = list(b.castling_rights)
-    half_move = b.half_move + 1
-    king_squares = list(b.king_squares)
-    full_move = b.full_move + 1 if b.turn == COLOR.BLACK else b.full_move
-    remaining_material = b.remaining_material
+    start = move_start(move)
+    assert b.squares[start] != PIECE.EMPTY, "Moving piece cannot be empty"
+    assert IS_PIECE[b.squares[start]] != PIECE.INVALID, "Moving piece cannot be invalid"
+
+    mb = to_mutable(b)
+    make_move(
+        mb,
+        move,
+    )
 
     if not fast:
-        hash_history = b.hash_history.copy()
-        hash_history.add(hash(b))
-    else:
-        hash_history = b.hash_history
+        mb.hash_history = b.hash_history.copy()
+        mb.hash_history.add(b.zobrist)
+
+    # check that border squares are still invalid
+    assert not any(
+        filter(
+            lambda x: x != PIECE.INVALID,
+            mb.squares[:20],
+        )
+    )
+    assert not any(
+        filter(
+            lambda x: x != PIECE.INVALID,
+            mb.squares[100:],
+        )
+    )
+    assert not any(
+        filter(
+            lambda x: x != PIECE.INVALID,
+            [v for k, v in enumerate(mb.squares) if k % 10 == 0],
+        )
+    )
+    assert not any(
+        filter(
+            lambda x: x != PIECE.INVALID,
+            [v for k, v in enumerate(mb.squares) if k % 10 == 9],
+        )
+    )
 
-    assert b.squares[move.start] != PIECE.EMPTY, "Moving piece cannot be empty"
-    assert IS_PIECE[b.squares[move.start]] != PIECE.INVALID, "Moving piece cannot be invalid"
+    return to_immutable(mb)
 
-    piece_start = b.squares[move.start]
 
-    if (
-        move.is_capture
-        and move.captured_piece != PIECE.INVALID
-        and move.captured_piece != PIECE.EMPTY
-    ):
-        remaining_material -= evaluation.PIECE_VALUE[move.captured_piece]
+def make_move(
+    b: "MutableBoard",
+    move: Move,
+) -> None:
+    """Play move on b in place. It can be reverted with unmake_move()."""
+    start = move_start(move)
+    end = move_end(move)
+    en_passant = move_en_passant(move)
+    squares = b.squares
+    castling_rights = b.castling_rights
+    piece_lists = b.piece_lists
+    piece_start = squares[start]
+    key = b.zobrist
+    old_castling_rights = (
+        castling_rights[0],
+        castling_rights[1],
+        castling_rights[2],
+        castling_rights[3],
+    )
 
-    if move.is_capture or IS_PIECE[piece_start] == PIECE.PAWN:
+    b.undo_stack.append(
+        (
+            move,
+            piece_start,
+            squares[end],
+            old_castling_rights,
+            b.en_passant,
+            b.half_move,
+            b.remaining_material,
+            key,
+        )
+    )
+
+    b.half_move += 1
+    if b.turn == COLOR.BLACK:
+        b.full_move += 1
+
+    if is_capture(move) and captured_piece(move) != PIECE.EMPTY:
+        b.remaining_material -= evaluation.PIECE_VALUE[captured_piece(move)]
+
+    if is_capture(move) or IS_PIECE[piece_start] == PIECE.PAWN:
         # reset half_move count when condition is met
-        half_move = 0
+        b.half_move = 0
 
     # do the move
-    squares[move.start] = PIECE.EMPTY
-    squares[move.end] = piece_start
+    key ^= zobrist.PIECES[piece_start][start]
+    key ^= zobrist.PIECES[squares[end]][end]
+    if squares[end] != PIECE.EMPTY:
+        piece_lists[squares[end]].remove(end)
+    piece_lists[piece_start].remove(start)
+    insort(piece_lists[piece_start], end)
+    squares[start] = PIECE.EMPTY
+    squares[end] = piece_start
 
     # change the king square
     if IS_PIECE[piece_start] == PIECE.KING:
-        king_squares[b.turn] = move.end
+        b.king_squares[b.turn] = end
 
     # special removal for "en passant" moves
-    if move.end == b.en_passant and IS_PIECE[piece_start] == PIECE.PAWN:
-        target = move.end + (10 * COLOR_DIRECTION[b.turn])
+    if end == b.en_passant and IS_PIECE[piece_start] == PIECE.PAWN:
+        target = end + (10 * COLOR_DIRECTION[b.turn])
+        key ^= zobrist.PIECES[squares[target]][target]
+        piece_lists[squares[target]].remove(target)
         squares[target] = PIECE.EMPTY
 
     # declare en_passant square for the current board
-    if move.en_passant != -1:
-        en_passant = move.en_passant
-    else:
-        en_passant = -1
+    if b.en_passant != -1:
+        key ^= zobrist.EN_PASSANT[b.en_passant]
+    b.en_passant = en_passant
+    if en_passant != -1:
+        key ^= zobrist.EN_PASSANT[en_passant]
 
     # promotion
-    if IS_PIECE[piece_start] == PIECE.PAWN and move.end // 10 == (
+    if IS_PIECE[piece_start] == PIECE.PAWN and end // 10 == (
         2 if b.turn == COLOR.WHITE else 9
     ):
-        squares[move.end] = IS_PVALUE[
+        squares[end] = IS_PVALUE[
             (
                 b.turn,
                 PIECE.QUEEN,
             )
         ]
+        piece_lists[piece_start].remove(end)
+        insort(piece_lists[squares[end]], end)
+        b.remaining_material += (
+            evaluation.PIECE_VALUE[PIECE.QUEEN] - evaluation.PIECE_VALUE[PIECE.PAWN]
+        )
+    key ^= zobrist.PIECES[squares[end]][end]
 
     # some hardcode for castling move of the rook
-    if move.is_castle:
+    if is_castle(move):
         castling_rights[2 * b.turn + CASTLE.KING_SIDE] = 0
         castling_rights[2 * b.turn + CASTLE.QUEEN_SIDE] = 0
-        if move.end == 97:
-            squares[98] = PIECE.EMPTY
-            squares[95] = PIECE.EMPTY
-            squares[96] = IS_PVALUE[
-                (
-                    COLOR.WHITE,
-                    PIECE.ROOK,
-                )
-            ]
-        if move.end == 93:
-            squares[91] = PIECE.EMPTY
-            squares[95] = PIECE.EMPTY
-            squares[94] = IS_PVALUE[
-                (
-                    COLOR.WHITE,
-                    PIECE.ROOK,
-                )
-            ]
-        if move.end == 27:
-            squares[28] = PIECE.EMPTY
-            squares[25] = PIECE.EMPTY
-            squares[26] = IS_PVALUE[
-                (
-                    COLOR.BLACK,
-                    PIECE.ROOK,
-                )
-            ]
-        if move.end == 23:
-            squares[21] = PIECE.EMPTY
-            squares[25] = PIECE.EMPTY
-            squares[24] = IS_PVALUE[
-                (
-                    COLOR.BLACK,
-                    PIECE.ROOK,
-                )
-            ]
+        (
+            rook_start,
+            rook_end,
+        ) = CASTLING_ROOK_MOVES[end]
+        key ^= zobrist.PIECES[squares[rook_start]][rook_start]
+        key ^= zobrist.PIECES[squares[rook_start]][rook_end]
+        piece_lists[squares[rook_start]].remove(rook_start)
+        insort(piece_lists[squares[rook_start]], rook_end)
+        squares[rook_end] = squares[rook_start]
+        squares[rook_start] = PIECE.EMPTY
     else:
         # remove castling rights
         if IS_PIECE[piece_start] == PIECE.KING:
             castling_rights[2 * b.turn + CASTLE.KING_SIDE] = 0
             castling_rights[2 * b.turn + CASTLE.QUEEN_SIDE] = 0
         else:
-            if move.end == 98 or move.start == 98:
+            if end == 98 or start == 98:
                 castling_rights[2 * COLOR.WHITE + CASTLE.KING_SIDE] = 0
-            if move.end == 91 or move.start == 91:
+            if end == 91 or start == 91:
                 castling_rights[2 * COLOR.WHITE + CASTLE.QUEEN_SIDE] = 0
-            if move.end == 28 or move.start == 28:
+            if end == 28 or start == 28:
                 castling_rights[2 * COLOR.BLACK + CASTLE.KING_SIDE] = 0
-            if move.end == 21 or move.start == 21:
+            if end == 21 or start == 21:
                 castling_rights[2 * COLOR.BLACK + CASTLE.QUEEN_SIDE] = 0
 
-    # check that border squares are still invalid
-    assert not any(
-        filter(
-            lambda x: x != PIECE.INVALID,
-            squares[:20],
-        )
+    # update the key with the castling rights that were lost
+    for i in range(4):
+        if castling_rights[i] != old_castling_rights[i]:
+            key ^= zobrist.CASTLING[i]
+
+    b.zobrist = key ^ zobrist.TURN
+    (
+        b.turn,
+        b.invturn,
+    ) = (
+        b.invturn,
+        b.turn,
     )
-    assert not any(
-        filter(
-            lambda x: x != PIECE.INVALID,
-            squares[100:],
-        )
+
+
+def unmake_move(
+    b: "MutableBoard",
+) -> None:
+    """Revert the last move played on b with make_move()."""
+    (
+        move,
+        piece_start,
+        piece_end,
+        castling_rights,
+        b.en_passant,
+        b.half_move,
+        b.remaining_material,
+        b.zobrist,
+    ) = b.undo_stack.pop()
+
+    (
+        b.turn,
+        b.invturn,
+    ) = (
+        b.invturn,
+        b.turn,
     )
-    assert not any(
-        filter(
-            lambda x: x != PIECE.INVALID,
-            [v for k, v in enumerate(squares) if k % 10 == 0],
+    if b.turn == COLOR.BLACK:
+        b.full_move -= 1
+
+    start = move_start(move)
+    end = move_end(move)
+    squares = b.squares
+    piece_lists = b.piece_lists
+
+    if is_castle(move):
+        (
+            rook_start,
+            rook_end,
+        ) = CASTLING_ROOK_MOVES[end]
+        piece_lists[squares[rook_end]].remove(rook_end)
+        insort(piece_lists[squares[rook_end]], rook_start)
+        squares[rook_start] = squares[rook_end]
+        squares[rook_end] = PIECE.EMPTY
+
+    # the piece on the end square is not the moving one after a promotion
+    piece_lists[squares[end]].remove(end)
+    insort(piece_lists[piece_start], start)
+    if piece_end != PIECE.EMPTY:
+        insort(piece_lists[piece_end], end)
+    squares[start] = piece_start
+    squares[end] = piece_end
+
+    if IS_PIECE[piece_start] == PIECE.KING:
+        b.king_squares[b.turn] = start
+
+    # put back the pawn taken "en passant"
+    if end == b.en_passant and IS_PIECE[piece_start] == PIECE.PAWN:
+        target = end + (10 * COLOR_DIRECTION[b.turn])
+        squares[target] = IS_PVALUE[
+            (
+                b.invturn,
+                PIECE.PAWN,
+            )
+        ]
+        insort(piece_lists[squares[target]], target)
+
+    b.castling_rights[:] = castling_rights
+
+
+def last_move(
+    b: "MutableBoard",
+) -> Move:
+    """The move that led to b in the search, 0 at the root or after a null move."""
+    if not b.undo_stack:
+        return 0
+    return b.undo_stack[-1][0]
+
+
+def make_null_move(
+    b: "MutableBoard",
+) -> None:
+    """Pass the turn on b in place (null move). It can be reverted with unmake_null_move().
+
+    https://www.chessprogramming.org/Null_Move
+    """
+    b.undo_stack.append(
+        (
+            0,
+            b.en_passant,
+            b.half_move,
+            b.zobrist,
         )
     )
-    assert not any(
-        filter(
-            lambda x: x != PIECE.INVALID,
-            [v for k, v in enumerate(squares) if k % 10 == 9],
-        )
+    key = b.zobrist
+    # the en passant capture is only possible right after the pawn push
+    if b.en_passant != -1:
+        key ^= zobrist.EN_PASSANT[b.en_passant]
+        b.en_passant = -1
+    b.half_move += 1
+    if b.turn == COLOR.BLACK:
+        b.full_move += 1
+    b.zobrist = key ^ zobrist.TURN
+    (
+        b.turn,
+        b.invturn,
+    ) = (
+        b.invturn,
+        b.turn,
     )
 
-    return Board(
-        tuple(squares),
-        COLOR(INV_COLOR[b.turn]),
-        tuple(castling_rights),
-        en_passant,
-        half_move,
-        full_move,
-        tuple(king_squares),
-        COLOR(INV_COLOR[b.invturn]),
-        remaining_material,
-        hash_history=hash_history,
+
+def unmake_null_move(
+    b: "MutableBoard",
+) -> None:
+    """Revert the null move played on b with make_null_move()."""
+    (
+        _,
+        b.en_passant,
+        b.half_move,
+        b.zobrist,
+    ) = b.undo_stack.pop()
+    (
+        b.turn,
+        b.invturn,
+    ) = (
+        b.invturn,
+        b.turn,
     )
+    if b.turn == COLOR.BLACK:
+        b.full_move -= 1
 
 
 def king_square(
-    b: Board,
+    b: AnyBoard,
     color: COLOR,
 ) -> int | None:
-    try:
-        return int(b.squares.index(PIECE.KING + 6 * color))
-    except Exception:
-        return None
+    kings = b.piece_lists[PIECE.KING + 6 * color]
+    return kings[0] if kings else None
 
 
 def number_of(
-    b: Board,
+    b: AnyBoard,
     piece: PIECE,
     color: COLOR,
 ) -> int:
-    try:
-        return int(b.squares.count(piece + 6 * color))
-    except Exception:
-        return 0
+    return len(b.piece_lists[piece + 6 * color])
 
 
 # Some fast verifications to check if a move is pseudo legal
 def is_pseudo_legal_move(
-    b: Board,
+    b: AnyBoard,
     move: Move,
 ) -> bool:
-    if move.start < 21 or move.start > 98:
+    """Verify that a move that was not generated here (hash move, killer move) is possible."""
+    start = move_start(move)
+    end = move_end(move)
+    if start < 21 or start > 98:
         return False
-    if move.end < 21 or move.end > 98:
+    if end < 21 or end > 98:
         return False
-    if IS_PIECE[b.squares[move.start]] != move.moving_piece:
+    piece = b.squares[start]
+    if PIECE_COLOR[piece] != b.turn or IS_PIECE[piece] != moving_piece(move):
         return False
-    if move.is_capture:
-        if b.squares[move.end] == PIECE.EMPTY and move.end != b.en_passant:
-            return False
-        if move.captured_piece != (
-            IS_PIECE[b.squares[move.end]] if move.end != b.en_passant else PIECE.PAWN
+    if is_capture(move):
+        if moving_piece(move) == PIECE.PAWN and end == b.en_passant:
+            if captured_piece(move) != PIECE.PAWN:
+                return False
+        elif (
+            PIECE_COLOR[b.squares[end]] != b.invturn
+            or captured_piece(move) != IS_PIECE[b.squares[end]]
         ):
             return False
-    if not move.is_capture:
-        if b.squares[move.end] != PIECE.EMPTY:
+    if not is_capture(move):
+        if b.squares[end] != PIECE.EMPTY:
             return False
+
+    # the path of sliders, pawn pushes and castling moves has to be clear
+    if is_castle(move):
+        side = CASTLE.KING_SIDE if end > start else CASTLE.QUEEN_SIDE
+        rook_start = CASTLING_ROOK_MOVES[end][0]
+        return (
+            b.castling_rights[2 * b.turn + side] == 1
+            and b.squares[rook_start] == PIECE.ROOK + 6 * b.turn
+            and all(
+                b.squares[square] == PIECE.EMPTY
+                for square in range(min(start, rook_start) + 1, max(start, rook_start))
+            )
+            and not king_is_in_check(
+                b,
+                b.turn,
+            )
+        )
+    if IS_PIECE[piece] in (PIECE.BISHOP, PIECE.ROOK, PIECE.QUEEN):
+        for ray in QUEEN_RAYS[start]:
+            if end in ray:
+                return all(b.squares[square] == PIECE.EMPTY for square in ray[: ray.index(end)])
+        return False
+    if IS_PIECE[piece] == PIECE.PAWN:
+        if is_capture(move):
+            return end in PAWN_TARGETS[b.turn][start]
+        step = -10 * COLOR_DIRECTION[b.turn]
+        if end == start + 2 * step:
+            return (
+                start // 10 == (8 if b.turn == COLOR.WHITE else 3)
+                and b.squares[start + step] == PIECE.EMPTY
+            )
+        return end == start + step
     return True
 
 
 def is_legal_move(
-    b: Board,
+    b: AnyBoard,
     move: Move,
 ) -> bool:
     if not is_pseudo_legal_move(
@@ -467,26 +771,6 @@ def is_legal_move(
     ):
         return False
 
-    b2 = push(
-        b,
-        move,
-    )
-
-    # the king should not be in check after the move
-    ks = king_square(
-        b2,
-        b2.invturn,
-    )
-    if ks is None:
-        return False
-
-    if is_square_attacked(
-        b2.squares,
-        ks,
-        b2.turn,
-    ):
-        return False
-
     ks = king_square(
         b,
         b.turn,
@@ -495,7 +779,7 @@ def is_legal_move(
         return False
 
     # a castling move is only acceptable if the king is not in check
-    if move.is_castle and is_square_attacked(
+    if is_castle(move) and is_square_attacked(
         b.squares,
         ks,
         b.invturn,
@@ -503,26 +787,109 @@ def is_legal_move(
         return False
 
     # a castling move is not acceptable if some transition squares are attacked
-    if move.is_castle:
-        if move.end > move.start and is_square_attacked(
+    if is_castle(move):
+        start = move_start(move)
+        if move_end(move) > start and is_square_attacked(
             b.squares,
-            move.start + 1,
+            start + 1,
             b.invturn,
         ):
             return False
-        if move.end < move.start and is_square_attacked(
+        if move_end(move) < start and is_square_attacked(
             b.squares,
-            move.start - 1,
+            start - 1,
             b.invturn,
         ):
             return False
 
-    return True
+    mb = b if isinstance(b, MutableBoard) else to_mutable(b)
+    make_move(
+        mb,
+        move,
+    )
+
+    # the king should not be in check after the move
+    ks = king_square(
+        mb,
+        mb.invturn,
+    )
+    is_legal = ks is not None and not is_square_attacked(
+        mb.squares,
+        ks,
+        mb.turn,
+    )
+    unmake_move(mb)
+    return is_legal
+
+
+def checks_and_pins(
+    b: AnyBoard,
+) -> tuple[int, set[int], set[int], dict[int, tuple[int, ...]]]:
+    """Find what restricts the moves of the player to move.
+
+    Returns the number of checkers, the squares a non-king piece can move to
+    in order to stop a single check (capturing the checker or blocking it),
+    the squares the king cannot flee to because they are behind it on the line
+    of a checking slider, and the line each absolutely pinned piece must stay on.
+    https://www.chessprogramming.org/Pin
+    """
+    squares = b.squares
+    ks = b.king_squares[b.turn]
+    offset = 6 * b.invturn
+    checkers = 0
+    evasions: set[int] = set()
+    behind_king: set[int] = set()
+    pins: dict[int, tuple[int, ...]] = {}
+
+    for start in KNIGHT_TARGETS[ks]:
+        if squares[start] == PIECE.KNIGHT + offset:
+            checkers += 1
+            evasions.add(start)
+    for start in PAWN_SOURCES[b.invturn][ks]:
+        if squares[start] == PIECE.PAWN + offset:
+            checkers += 1
+            evasions.add(start)
+
+    for rays, slider in (
+        (ROOK_RAYS[ks], PIECE.ROOK + offset),
+        (BISHOP_RAYS[ks], PIECE.BISHOP + offset),
+    ):
+        for ray in rays:
+            pinned = -1
+            for i, square in enumerate(ray):
+                piece = squares[square]
+                if piece == PIECE.EMPTY:
+                    continue
+                if PIECE_COLOR[piece] == b.turn:
+                    if pinned != -1:
+                        break
+                    pinned = square
+                    continue
+                if piece == slider or piece == PIECE.QUEEN + offset:
+                    if pinned == -1:
+                        checkers += 1
+                        evasions.update(ray[: i + 1])
+                        behind_king.add(2 * ks - ray[0])
+                    else:
+                        pins[pinned] = ray[: i + 1]
+                break
+
+    return (
+        checkers,
+        evasions,
+        behind_king,
+        pins,
+    )
 
 
 def legal_moves(
-    b: Board,
+    b: AnyBoard,
 ) -> list[Move]:
+    """Generate the strictly legal moves of the position.
+
+    The checkers and the pinned pieces are computed once,
+    so no move has to be played to know if it leaves the king in check.
+    """
     moves = []
 
     if (
@@ -535,113 +902,120 @@ def legal_moves(
     ):
         return []
 
+    ks = b.king_squares[b.turn]
+    (
+        checkers,
+        evasions,
+        behind_king,
+        pins,
+    ) = checks_and_pins(b)
+
     for move in pseudo_legal_moves(b):
-        if not is_legal_move(
-            b,
-            move,
-        ):
+        start = move_start(move)
+        end = move_end(move)
+
+        if start == ks:
+            if is_castle(move):
+                # castling out of check is already excluded by the generator
+                if is_square_attacked(
+                    b.squares,
+                    (start + end) // 2,
+                    b.invturn,
+                ) or is_square_attacked(
+                    b.squares,
+                    end,
+                    b.invturn,
+                ):
+                    continue
+            elif end in behind_king or is_square_attacked(
+                b.squares,
+                end,
+                b.invturn,
+            ):
+                continue
+            moves.append(move)
+            continue
+
+        # only the king can move out of a double check
+        if checkers > 1:
+            continue
+
+        # en passant captures can uncover the king along the rank of both pawns,
+        # they are rare enough to be verified by playing them
+        if end == b.en_passant and moving_piece(move) == PIECE.PAWN:
+            if is_legal_move(
+                b,
+                move,
+            ):
+                moves.append(move)
+            continue
+
+        if checkers == 1 and end not in evasions:
+            continue
+        if start in pins and end not in pins[start]:
             continue
         moves.append(move)
     return moves
 
 
-@cache
 def is_square_attacked(
-    squares: tuple[
-        int,
-        ...,
-    ],
+    squares: Sequence[int],
     square: int,
     color: COLOR,
 ) -> bool:
     """Detect if square on b is attacked by color."""
-    for depl in (
-        21,
-        12,
-        -8,
-        -19,
-        -21,
-        -12,
-        8,
-        19,
-    ):
-        if squares[square + depl] == PIECE.KNIGHT + 6 * color:
+    offset = 6 * color
+
+    knight = PIECE.KNIGHT + offset
+    for start in KNIGHT_TARGETS[square]:
+        if squares[start] == knight:
             return True
 
-    for direction in (
-        1,
-        -1,
-        10,
-        -10,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            end = square + x * direction
-            if (
-                squares[end] == PIECE.ROOK + 6 * color
-                or squares[end] == PIECE.QUEEN + 6 * color
-                or (x == 1 and squares[end] == PIECE.KING + 6 * color)
-            ):
+    king = PIECE.KING + offset
+    for start in KING_TARGETS[square]:
+        if squares[start] == king:
+            return True
+
+    rook = PIECE.ROOK + offset
+    queen = PIECE.QUEEN + offset
+    for ray in ROOK_RAYS[square]:
+        for start in ray:
+            piece = squares[start]
+            if piece == PIECE.EMPTY:
+                continue
+            if piece == rook or piece == queen:
                 return True
-            if squares[end] != PIECE.EMPTY:
-                break
+            break
 
-    for direction in (
-        11,
-        -11,
-        9,
-        -9,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            end = square + x * direction
-            if (
-                squares[end] == PIECE.BISHOP + 6 * color
-                or squares[end] == PIECE.QUEEN + 6 * color
-                or (x == 1 and squares[end] == PIECE.KING + 6 * color)
-            ):
+    bishop = PIECE.BISHOP + offset
+    for ray in BISHOP_RAYS[square]:
+        for start in ray:
+            piece = squares[start]
+            if piece == PIECE.EMPTY:
+                continue
+            if piece == bishop or piece == queen:
                 return True
-            if squares[end] != PIECE.EMPTY:
-                break
+            break
 
-    for depl in (
-        (
-            9,
-            11,
-        )
-        if color == COLOR.WHITE
-        else (
-            -9,
-            -11,
-        )
-    ):
-        if squares[square + depl] == PIECE.PAWN + 6 * color:
+    pawn = PIECE.PAWN + offset
+    for start in PAWN_SOURCES[color][square]:
+        if squares[start] == pawn:
             return True
     return False
 
 
 def will_check_the_king(
-    b: Board,
+    b: AnyBoard,
     move: Move,
 ) -> bool:
     ks = b.king_squares[b.invturn]
+    start = move_start(move)
+    end = move_end(move)
+    piece = moving_piece(move)
 
     # if we pass the rapid check as a knight, we can avoid the rest
-    if move.moving_piece == PIECE.KNIGHT:
-        if move.end not in (
-            21 + ks,
-            12 + ks,
-            -8 + ks,
-            -19 + ks,
-            -21 + ks,
-            -12 + ks,
-            8 + ks,
-            19 + ks,
-        ):
+    if piece == PIECE.KNIGHT:
+        if end not in KNIGHT_TARGETS[ks]:
             return False
         return True
 
@@ -650,123 +1024,117 @@ def will_check_the_king(
     if (
         (
             # check if piece could not be hiding another
-            move.start // 10 != ks // 10
-            and move.start % 10 != ks % 10
-            and (move.start - ks) % 11 != 0
-            and (move.start - ks) % 9 != 0
+            start // 10 != ks // 10
+            and start % 10 != ks % 10
+            and (start - ks) % 11 != 0
+            and (start - ks) % 9 != 0
         )
         and (
             # check if piece is ROOK-like
             # and does not end in the same line or column
-            move.moving_piece
+            piece
             in {
                 PIECE.ROOK,
                 PIECE.QUEEN,
             }
-            and move.end // 10 != ks // 10
-            and move.end % 10 != ks % 10
+            and end // 10 != ks // 10
+            and end % 10 != ks % 10
         )
         and (
             # check if piece is BISHOP-like
             # and does not end in the same diagonal
-            move.moving_piece
+            piece
             in {
                 PIECE.BISHOP,
                 PIECE.QUEEN,
             }
-            and (move.end - ks) % 11 != 0
-            and (move.end - ks) % 9 != 0
+            and (end - ks) % 11 != 0
+            and (end - ks) % 9 != 0
         )
     ):
         return False
 
-    b2 = push(
-        b,
+    mb = b if isinstance(b, MutableBoard) else to_mutable(b)
+    make_move(
+        mb,
         move,
     )
-    if is_square_attacked(
-        b2.squares,
+    is_check = is_square_attacked(
+        mb.squares,
         ks,
-        b2.invturn,
-    ):
-        return True
-    return False
+        mb.invturn,
+    )
+    unmake_move(mb)
+    return is_check
+
+
+# results of king_is_in_check, keyed by zobrist key and color
+# sized by Config.check_cache_size at the start of each search
+CHECK_CACHE: caches.Cache = caches.new(caches.DEFAULT_SIZE)
 
 
 def king_is_in_check(
-    b: Board,
+    b: AnyBoard,
     color: COLOR,
 ) -> bool:
-    if is_square_attacked(
-        b.squares,
-        b.king_squares[color],
-        INV_COLOR[color],
-    ):
-        return True
-    return False
+    key = b.zobrist * 2 + color
+    is_check = caches.get(
+        CHECK_CACHE,
+        key,
+    )
+    if is_check is None:
+        is_check = is_square_attacked(
+            b.squares,
+            b.king_squares[color],
+            INV_COLOR[color],
+        )
+        caches.put(
+            CHECK_CACHE,
+            key,
+            is_check,
+        )
+    return is_check
 
 
 def _knight_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
-    for depl in (
-        21,
-        12,
-        -8,
-        -19,
-        -21,
-        -12,
-        8,
-        19,
-    ):
-        end = start + depl
-        is_capture = bool(b.squares[end])
-        is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
-        if b.squares[end] != PIECE.INVALID and get_color(b.squares[end]) != b.turn:
-            yield Move(
+    for end in KNIGHT_TARGETS[start]:
+        piece = b.squares[end]
+        if PIECE_COLOR[piece] != b.turn:
+            yield encode_move(
                 start=start,
                 end=end,
                 moving_piece=PIECE.KNIGHT,
-                captured_piece=IS_PIECE[b.squares[end]],
-                is_capture=is_capture,
+                captured_piece=IS_PIECE[piece],
+                is_capture=piece != PIECE.EMPTY,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
 
 def _rook_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
-    for direction in (
-        10,
-        -10,
-        1,
-        -1,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            end = start + x * direction
-            is_capture = bool(b.squares[end])
-            is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
+    for ray in ROOK_RAYS[start]:
+        for end in ray:
+            piece = b.squares[end]
 
             # castling moves are processed here
             # because we are already checking if the path is clear that way
             if (
                 b.castling_rights[2 * b.turn + CASTLE.KING_SIDE] == 1
                 and start == (28 if b.turn == COLOR.BLACK else 98)
-                and IS_PIECE[b.squares[end]] == PIECE.KING
-                and get_color(b.squares[end]) == b.turn
+                and IS_PIECE[piece] == PIECE.KING
+                and PIECE_COLOR[piece] == b.turn
                 and not king_is_in_check(
                     b,
                     b.turn,
                 )
             ):
-                yield Move(
+                yield encode_move(
                     start=(95 if b.turn == COLOR.WHITE else 25),
                     end=(97 if b.turn == COLOR.WHITE else 27),
                     moving_piece=PIECE.KING,
@@ -774,19 +1142,18 @@ def _rook_moves(
                     is_capture=False,
                     is_castle=True,
                     en_passant=-1,
-                    is_king_capture=False,
                 )
             if (
                 b.castling_rights[2 * b.turn + CASTLE.QUEEN_SIDE] == 1
                 and start == (21 if b.turn == COLOR.BLACK else 91)
-                and IS_PIECE[b.squares[end]] == PIECE.KING
-                and get_color(b.squares[end]) == b.turn
+                and IS_PIECE[piece] == PIECE.KING
+                and PIECE_COLOR[piece] == b.turn
                 and not king_is_in_check(
                     b,
                     b.turn,
                 )
             ):
-                yield Move(
+                yield encode_move(
                     start=(95 if b.turn == COLOR.WHITE else 25),
                     end=(93 if b.turn == COLOR.WHITE else 23),
                     moving_piece=PIECE.KING,
@@ -794,124 +1161,84 @@ def _rook_moves(
                     is_capture=False,
                     is_castle=True,
                     en_passant=-1,
-                    is_king_capture=False,
                 )
 
-            if b.squares[end] != PIECE.INVALID and get_color(b.squares[end]) != b.turn:
-                yield Move(
+            if PIECE_COLOR[piece] != b.turn:
+                yield encode_move(
                     start=start,
                     end=end,
                     moving_piece=PIECE.ROOK,
-                    captured_piece=IS_PIECE[b.squares[end]],
-                    is_capture=is_capture,
+                    captured_piece=IS_PIECE[piece],
+                    is_capture=piece != PIECE.EMPTY,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[end] != PIECE.EMPTY or is_capture:
+            if piece != PIECE.EMPTY:
                 break
 
 
 def _bishop_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
-    for direction in (
-        11,
-        -11,
-        9,
-        -9,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            end = start + x * direction
-            is_capture = bool(b.squares[end])
-            is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
-            if b.squares[end] != PIECE.INVALID and get_color(b.squares[end]) != b.turn:
-                yield Move(
+    for ray in BISHOP_RAYS[start]:
+        for end in ray:
+            piece = b.squares[end]
+            if PIECE_COLOR[piece] != b.turn:
+                yield encode_move(
                     start=start,
                     end=end,
                     moving_piece=PIECE.BISHOP,
-                    captured_piece=IS_PIECE[b.squares[end]],
-                    is_capture=is_capture,
+                    captured_piece=IS_PIECE[piece],
+                    is_capture=piece != PIECE.EMPTY,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[end] != PIECE.EMPTY or is_capture:
+            if piece != PIECE.EMPTY:
                 break
 
 
 def _queen_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
-    for direction in (
-        11,
-        -11,
-        9,
-        -9,
-        10,
-        -10,
-        1,
-        -1,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            end = start + x * direction
-            is_capture = bool(b.squares[end])
-            is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
-            if b.squares[end] != PIECE.INVALID and get_color(b.squares[end]) != b.turn:
-                yield Move(
+    for ray in QUEEN_RAYS[start]:
+        for end in ray:
+            piece = b.squares[end]
+            if PIECE_COLOR[piece] != b.turn:
+                yield encode_move(
                     start=start,
                     end=end,
                     moving_piece=PIECE.QUEEN,
-                    captured_piece=IS_PIECE[b.squares[end]],
-                    is_capture=is_capture,
+                    captured_piece=IS_PIECE[piece],
+                    is_capture=piece != PIECE.EMPTY,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[end] != PIECE.EMPTY or is_capture:
+            if piece != PIECE.EMPTY:
                 break
 
 
 def _king_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
-    for depl in (
-        11,
-        -11,
-        9,
-        -9,
-        1,
-        -1,
-        10,
-        -10,
-    ):
-        end = start + depl
-        is_capture = bool(b.squares[end])
-        is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
-        if b.squares[end] != PIECE.INVALID and get_color(b.squares[end]) != b.turn:
-            yield Move(
+    for end in KING_TARGETS[start]:
+        piece = b.squares[end]
+        if PIECE_COLOR[piece] != b.turn:
+            yield encode_move(
                 start=start,
                 end=end,
                 moving_piece=PIECE.KING,
-                captured_piece=IS_PIECE[b.squares[end]],
-                is_capture=is_capture,
+                captured_piece=IS_PIECE[piece],
+                is_capture=piece != PIECE.EMPTY,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
 
 def _pawn_moves(
-    b: Board,
+    b: AnyBoard,
     start: int,
 ) -> Iterable[Move]:
     if b.turn == COLOR.BLACK:
@@ -940,7 +1267,7 @@ def _pawn_moves(
                 en_passant = start + depls[0]
             else:
                 en_passant = -1
-            yield Move(
+            yield encode_move(
                 start=start,
                 end=end,
                 moving_piece=PIECE.PAWN,
@@ -948,27 +1275,21 @@ def _pawn_moves(
                 is_capture=False,
                 is_castle=False,
                 en_passant=en_passant,
-                is_king_capture=False,
             )
         else:
             # do not allow 2 squares move if there's a piece in the way
             break
-    for depl in (9, 11) if b.turn == COLOR.BLACK else (-9, -11):
-        end = start + depl
-        if (
-            b.squares[end] not in (PIECE.EMPTY, PIECE.INVALID)
-            and get_color(b.squares[end]) != b.turn
-        ) or end == b.en_passant:
-            is_king_capture = IS_PIECE[b.squares[end]] == PIECE.KING
-            yield Move(
+    for end in PAWN_TARGETS[b.turn][start]:
+        piece = b.squares[end]
+        if (piece != PIECE.EMPTY and PIECE_COLOR[piece] != b.turn) or end == b.en_passant:
+            yield encode_move(
                 start=start,
                 end=end,
                 moving_piece=PIECE.PAWN,
-                captured_piece=IS_PIECE[b.squares[end]] if end != b.en_passant else PIECE.PAWN,
+                captured_piece=IS_PIECE[piece] if end != b.en_passant else PIECE.PAWN,
                 is_capture=True,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
 
@@ -976,225 +1297,166 @@ def _pawn_moves(
 # Useful for the SEE function
 # is LVA (least valuable attacker) by implementation
 def capture_moves(
-    b: Board,
+    b: AnyBoard,
     target: int,
 ) -> Iterable[Move]:
-    is_king_capture = IS_PIECE[b.squares[target]] == PIECE.KING
+    captured = IS_PIECE[b.squares[target]]
+    offset = 6 * b.turn
+    pawn = PIECE.PAWN + offset
+    knight = PIECE.KNIGHT + offset
+    bishop = PIECE.BISHOP + offset
+    rook = PIECE.ROOK + offset
+    queen = PIECE.QUEEN + offset
+    king = PIECE.KING + offset
 
     # PAWN
-    for depl in (
-        (
-            9,
-            11,
-        )
-        if b.turn == COLOR.WHITE
-        else (
-            -9,
-            -11,
-        )
-    ):
-        start = target + depl
-        if IS_PIECE[b.squares[start]] == PIECE.PAWN and get_color(b.squares[start]) == b.turn:
-            yield Move(
+    for start in PAWN_SOURCES[b.turn][target]:
+        if b.squares[start] == pawn:
+            yield encode_move(
                 start=start,
                 end=target,
                 moving_piece=PIECE.PAWN,
-                captured_piece=IS_PIECE[b.squares[target]],
+                captured_piece=captured,
                 is_capture=True,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
     # KNIGHT
-    for depl in (
-        21,
-        12,
-        -8,
-        -19,
-        -21,
-        -12,
-        8,
-        19,
-    ):
-        start = target + depl
-        if IS_PIECE[b.squares[start]] == PIECE.KNIGHT and get_color(b.squares[start]) == b.turn:
-            yield Move(
+    for start in KNIGHT_TARGETS[target]:
+        if b.squares[start] == knight:
+            yield encode_move(
                 start=start,
                 end=target,
                 moving_piece=PIECE.KNIGHT,
-                captured_piece=IS_PIECE[b.squares[target]],
+                captured_piece=captured,
                 is_capture=True,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
     # BISHOP
-    for direction in (
-        11,
-        -11,
-        9,
-        -9,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            start = target + x * direction
-
-            if (
-                IS_PIECE[b.squares[start]] == PIECE.BISHOP
-                and get_color(b.squares[start]) == b.turn
-            ):
-                yield Move(
+    for ray in BISHOP_RAYS[target]:
+        for start in ray:
+            if b.squares[start] == PIECE.EMPTY:
+                continue
+            if b.squares[start] == bishop:
+                yield encode_move(
                     start=start,
                     end=target,
-                    moving_piece=IS_PIECE[b.squares[start]],
-                    captured_piece=IS_PIECE[b.squares[target]],
+                    moving_piece=PIECE.BISHOP,
+                    captured_piece=captured,
                     is_capture=True,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[start] != PIECE.EMPTY:
-                break
+            break
 
     # ROOK
-    for direction in (
-        1,
-        -1,
-        10,
-        -10,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            start = target + x * direction
-
-            if IS_PIECE[b.squares[start]] == PIECE.ROOK and get_color(b.squares[start]) == b.turn:
-                yield Move(
+    for ray in ROOK_RAYS[target]:
+        for start in ray:
+            if b.squares[start] == PIECE.EMPTY:
+                continue
+            if b.squares[start] == rook:
+                yield encode_move(
                     start=start,
                     end=target,
-                    moving_piece=IS_PIECE[b.squares[start]],
-                    captured_piece=IS_PIECE[b.squares[target]],
+                    moving_piece=PIECE.ROOK,
+                    captured_piece=captured,
                     is_capture=True,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[start] != PIECE.EMPTY:
-                break
+            break
 
     # QUEEN
-    for direction in (
-        11,
-        -11,
-        9,
-        -9,
-        10,
-        -10,
-        1,
-        -1,
-    ):
-        for x in range(
-            1,
-            8,
-        ):
-            start = target + x * direction
-
-            if IS_PIECE[b.squares[start]] == PIECE.QUEEN and get_color(b.squares[start]) == b.turn:
-                yield Move(
+    for ray in QUEEN_RAYS[target]:
+        for start in ray:
+            if b.squares[start] == PIECE.EMPTY:
+                continue
+            if b.squares[start] == queen:
+                yield encode_move(
                     start=start,
                     end=target,
                     moving_piece=PIECE.QUEEN,
-                    captured_piece=IS_PIECE[b.squares[target]],
+                    captured_piece=captured,
                     is_capture=True,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=is_king_capture,
                 )
-            if b.squares[start] != PIECE.EMPTY:
-                break
+            break
 
     # KING
-    for depl in (
-        11,
-        -11,
-        9,
-        -9,
-        1,
-        -1,
-        10,
-        -10,
-    ):
-        start = target + depl
-        if IS_PIECE[b.squares[start]] == PIECE.KING and get_color(b.squares[start]) == b.turn:
-            yield Move(
+    for start in KING_TARGETS[target]:
+        if b.squares[start] == king:
+            yield encode_move(
                 start=start,
                 end=target,
                 moving_piece=PIECE.KING,
-                captured_piece=IS_PIECE[b.squares[target]],
+                captured_piece=captured,
                 is_capture=True,
                 is_castle=False,
                 en_passant=-1,
-                is_king_capture=is_king_capture,
             )
 
 
 def pseudo_legal_moves(
-    b: Board,
+    b: AnyBoard,
 ) -> Iterable[Move]:
-    for i in range(8):
-        for j in range(8):
-            start = (2 + j) * 10 + (i + 1)
-            piece = b.squares[start]
-            if get_color(piece) != b.turn:
-                continue
-            piece_type = IS_PIECE[piece]
-            if piece_type == PIECE.PAWN:
-                yield from _pawn_moves(
-                    b,
-                    start,
-                )
-                continue
-            if piece_type == PIECE.KNIGHT:
-                yield from _knight_moves(
-                    b,
-                    start,
-                )
-                continue
-            if piece_type == PIECE.BISHOP:
-                yield from _bishop_moves(
-                    b,
-                    start,
-                )
-                continue
-            if piece_type == PIECE.ROOK:
-                yield from _rook_moves(
-                    b,
-                    start,
-                )
-                continue
-            if piece_type == PIECE.QUEEN:
-                yield from _queen_moves(
-                    b,
-                    start,
-                )
-                continue
-            if piece_type == PIECE.KING:
-                yield from _king_moves(
-                    b,
-                    start,
-                )
-                continue
+    offset = 6 * b.turn
+    for start in b.piece_lists[PIECE.PAWN + offset]:
+        yield from _pawn_moves(
+            b,
+            start,
+        )
+    for start in b.piece_lists[PIECE.KNIGHT + offset]:
+        yield from _knight_moves(
+            b,
+            start,
+        )
+    for start in b.piece_lists[PIECE.BISHOP + offset]:
+        yield from _bishop_moves(
+            b,
+            start,
+        )
+    for start in b.piece_lists[PIECE.ROOK + offset]:
+        yield from _rook_moves(
+            b,
+            start,
+        )
+    for start in b.piece_lists[PIECE.QUEEN + offset]:
+        yield from _queen_moves(
+            b,
+            start,
+        )
+    for start in b.piece_lists[PIECE.KING + offset]:
+        yield from _king_moves(
+            b,
+            start,
+        )
+
+
+def promotion_moves(
+    b: AnyBoard,
+) -> Iterable[Move]:
+    """Generate the promotions that do not capture (the pawns always promote to a queen)."""
+    if b.turn == COLOR.WHITE:
+        rank, depl = 3, -10
+    else:
+        rank, depl = 8, 10
+    for start in b.piece_lists[PIECE.PAWN + 6 * b.turn]:
+        if start // 10 == rank and b.squares[start + depl] == PIECE.EMPTY:
+            yield encode_move(
+                start=start,
+                end=start + depl,
+                moving_piece=PIECE.PAWN,
+            )
 
 
 # Should return capture moves in MVV-LVA order
 # Should end with check moves (and promotions ?)
 def tactical_moves(
-    b: Board,
+    b: AnyBoard,
 ) -> Iterable[Move]:
     """Generate only tactical moves.
 
@@ -1202,89 +1464,37 @@ def tactical_moves(
     These capture moves should be generated in a manner
     that respects MVV-LVA (so that we don't have to do some move ordering later).
 
-    First we need to have the position of ennemy pieces.
-    We don't store the position of the enemy queens since their captures are
-    evaluated immediately (this saves a list generation
+    The piece lists give us the position of the enemy pieces by type.
     """
-    piece_pawn = []
-    piece_knight = []
-    piece_bishop = []
-    piece_rook = []
-
-    for i in range(8):
-        for j in range(8):
-            square = (2 + j) * 10 + (i + 1)
-            piece = b.squares[square]
-            color = get_color(piece)
-            if color != b.invturn:
-                continue
-            if IS_PIECE[piece] == PIECE.PAWN:
-                piece_pawn.append(square)
-                continue
-            if IS_PIECE[piece] == PIECE.KNIGHT:
-                piece_knight.append(square)
-                continue
-            if IS_PIECE[piece] == PIECE.BISHOP:
-                piece_bishop.append(square)
-                continue
-            if IS_PIECE[piece] == PIECE.ROOK:
-                piece_rook.append(square)
-                continue
-            if IS_PIECE[piece] == PIECE.QUEEN:
-                yield from capture_moves(
-                    b,
-                    square,
-                )
-                continue
-
     # We assume that we cannot take the enemy king.
-    # The captures against the enemy queens were already yielded.
-    # So we start by yielding captures against the enemy rooks, and then bishop...
-    for square in piece_rook:
-        yield from capture_moves(
-            b,
-            square,
-        )
-    for square in piece_bishop:
-        yield from capture_moves(
-            b,
-            square,
-        )
-    for square in piece_knight:
-        yield from capture_moves(
-            b,
-            square,
-        )
-    for square in piece_pawn:
-        yield from capture_moves(
-            b,
-            square,
-        )
+    # So we start by yielding captures against the enemy queens, and then rooks...
+    offset = 6 * b.invturn
+    for piece in (
+        PIECE.QUEEN,
+        PIECE.ROOK,
+        PIECE.BISHOP,
+        PIECE.KNIGHT,
+        PIECE.PAWN,
+    ):
+        for square in b.piece_lists[piece + offset]:
+            yield from capture_moves(
+                b,
+                square,
+            )
 
     # handle en passant
     if b.en_passant != -1:
-        for depl in (
-            (
-                9,
-                11,
-            )
-            if b.turn == COLOR.WHITE
-            else (
-                -9,
-                -11,
-            )
-        ):
-            start = b.en_passant + depl
-            if IS_PIECE[b.squares[start]] == PIECE.PAWN and get_color(b.squares[start]) == b.turn:
-                yield Move(
+        pawn = PIECE.PAWN + 6 * b.turn
+        for start in PAWN_SOURCES[b.turn][b.en_passant]:
+            if b.squares[start] == pawn:
+                yield encode_move(
                     start=start,
                     end=b.en_passant,
                     moving_piece=PIECE.PAWN,
-                    captured_piece=IS_PIECE[b.squares[b.en_passant]],
+                    captured_piece=PIECE.PAWN,
                     is_capture=True,
                     is_castle=False,
                     en_passant=-1,
-                    is_king_capture=False,
                 )
 
     # Once all capture moves are generated, we can try checks.
@@ -1294,7 +1504,7 @@ def tactical_moves(
     #     for j in range(8):
     #         start = (2 + j) * 10 + (i + 1)
     #         piece = b.squares[start]
-    #         if get_color(piece) != b.turn:
+    #         if PIECE_COLOR[piece] != b.turn:
     #             continue
     #         piece_type = IS_PIECE[piece]
     #         # if piece_type == PIECE.PAWN:
@@ -0,0 +1,108 @@
+"""Fixed capacity caches keyed by zobrist keys.
+
+The caches are direct mapped: the low bits of the key select the only slot the key can live in.
+The full key is stored along the value to detect collisions,
+and a new key always replaces the previous occupant of its slot (always-replace eviction).
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+# rough size in bytes of one slot (key, value and the two list pointers)
+ENTRY_SIZE: int = 80
+
+# number of slots of a cache when nothing else is configured
+DEFAULT_SIZE: int = 1 << 14
+
+# key of the empty slots, zobrist keys are never negative
+EMPTY_KEY: int = -1
+
+
+@dataclass
+class Cache:
+    keys: list[int]
+    values: list[Any]
+    mask: int
+    hits: int = 0
+    misses: int = 0
+    size: int = 0
+    evictions: int = 0
+
+
+def capacity(
+    megabytes: float,
+) -> int:
+    """Largest power of two number of slots fitting in the given memory."""
+    slots = max(1, int(megabytes * 1024 * 1024) // ENTRY_SIZE)
+    return 1 << (slots.bit_length() - 1)
+
+
+def new(
+    size: int,
+) -> Cache:
+    # the capacity is rounded down to a power of two to index with a mask
+    slots = 1 << (max(1, size).bit_length() - 1)
+    return Cache(
+        keys=[EMPTY_KEY] * slots,
+        values=[None] * slots,
+        mask=slots - 1,
+    )
+
+
+def get(
+    cache: Cache,
+    key: int,
+) -> Any:
+    index = key & cache.mask
+    if cache.keys[index] == key:
+        cache.hits += 1
+        return cache.values[index]
+    cache.misses += 1
+    return None
+
+
+def put(
+    cache: Cache,
+    key: int,
+    value: Any,
+) -> None:
+    index = key & cache.mask
+    previous = cache.keys[index]
+    if previous == EMPTY_KEY:
+        cache.size += 1
+    elif previous != key:
+        cache.evictions += 1
+    cache.keys[index] = key
+    cache.values[index] = value
+
+
+def clear(
+    cache: Cache,
+) -> None:
+    slots = cache.mask + 1
+    cache.keys = [EMPTY_KEY] * slots
+    cache.values = [None] * slots
+    cache.hits = 0
+    cache.misses = 0
+    cache.size = 0
+    cache.evictions = 0
+
+
+def resize(
+    cache: Cache,
+    size: int,
+) -> None:
+    """Give the cache a new capacity, dropping its content if it changes."""
+    slots = 1 << (max(1, size).bit_length() - 1)
+    if slots != cache.mask + 1:
+        cache.mask = slots - 1
+        clear(cache)
+
+
+def stats(
+    cache: Cache,
+) -> str:
+    return (
+        f"hits {cache.hits} misses {cache.misses} "
+        f"size {cache.size}/{cache.mask + 1} evictions {cache.evictions}"
+    )
@@ -1,8 +1,9 @@
 from dataclasses import dataclass, field
 from typing import Any
 
-from .board import Board
-from .data_structures import Move, Node
+from . import caches
+from . import transposition_table as tt
+from .search_context import SearchContext
 
 
 @dataclass
@@ -13,14 +14,12 @@ class Config:
     version: str = "0.20.12"
     name: str = "Herald"
     author: str = "nrobinaubertin"
-    transposition_table: dict[
-        Board,
-        Node,
-    ] = field(default_factory=dict)
-    hash_move_tt: dict[
-        Board,
-        Move,
-    ] = field(default_factory=dict)
+    # scores and best moves of the positions searched, keyed by the zobrist key of the board
+    transposition_table: tt.TranspositionTable = field(
+        default_factory=lambda: tt.new(tt.DEFAULT_SIZE)
+    )
+    # state of the running search (stop flag, clock, node count)
+    context: SearchContext = field(default_factory=SearchContext)
     opening_book: dict[
         str,
         str,
@@ -28,7 +27,68 @@ class Config:
     use_transposition_table: bool = False
     use_hash_move: bool = False
     use_killer_moves: bool = False
+    # generate the moves of the search stage by stage (see move_ordering.staged_moves)
+    use_staged_move_generation: bool = False
     use_late_move_reduction: bool = False
+    # sort the quiet moves by the beta cutoffs they made, the countermove of the previous move
+    # first (see history)
+    use_history_heuristic: bool = False
+    # search the moves after the first one with a null window (see algorithms.alphabeta)
+    use_principal_variation_search: bool = False
+    # cut the nodes where passing the turn still fails high (see algorithms.alphabeta)
+    use_null_move_pruning: bool = False
+    # skip the quiet moves of the frontier nodes whose static evaluation is too far below
+    # the window, by futility_margin centipawns per ply of remaining depth
+    use_futility_pruning: bool = False
+    futility_margin: int = 165
+    # cut the shallow nodes whose static evaluation is too far beyond the window,
+    # by reverse_futility_margin centipawns per ply of remaining depth
+    use_reverse_futility_pruning: bool = False
+    reverse_futility_margin: int = 120
+    # search the nodes without a hash move shallower first, to get one from the table
+    # (see algorithms.negamax), it costs nodes on the bench: iterative deepening already
+    # leaves a hash move in almost every node deep enough for it
+    use_internal_iterative_deepening: bool = False
+    # search the nodes without a hash move one ply shallower (see algorithms.negamax)
+    use_internal_iterative_reduction: bool = False
     use_saved_search: bool = False
     quiescence_search: bool = False
     quiescence_depth: int = 0
+    # megabytes of the UCI Hash option (see set_hash_size)
+    hash_size: int = 16
+    # number of slots of the evaluation and check caches
+    eval_cache_size: int = caches.DEFAULT_SIZE
+    check_cache_size: int = caches.DEFAULT_SIZE
+    # number of processes of the lazy SMP search (UCI Threads option)
+    threads: int = 1
+    # number of the lazy SMP helper searching with this config, 0 for the main worker
+    # (the helpers try the root moves in orders of their own, see move_ordering.rotate)
+    helper: int = 0
+    # number of processes the root moves are split over (UCI RootSplit option, see root_split),
+    # 0 to search them one after the other
+    root_split_processes: int = 0
+    # board representation used by perft: "mailbox" (board) or "bitboard" (bitboard)
+    board_backend: str = "mailbox"
+
+
+def set_hash_size(
+    config: Config,
+    megabytes: int,
+) -> None:
+    """Share the megabytes of the UCI Hash option between the table and the caches."""
+    config.hash_size = megabytes
+    # the evaluation and check caches get an eighth of the hash each
+    # and the transposition table the rest
+    config.eval_cache_size = caches.capacity(megabytes / 8)
+    config.check_cache_size = caches.capacity(megabytes / 8)
+    tt.release(config.transposition_table)
+    if config.threads > 1 or config.root_split_processes > 0:
+        # the processes of a parallel search share the table, it has to exist before they fork
+        config.transposition_table = tt.new(
+            megabytes * 3 / 4,
+            shared=True,
+        )
+    else:
+        # a single worker allocates its own table once forked (see worker.run),
+        # this process only keeps a table of one bucket
+        config.transposition_table = tt.new(0)
@@ -1,5 +1,4 @@
 from enum import IntEnum
-from functools import cache
 
 
 class CASTLE(IntEnum):
@@ -128,13 +127,27 @@ ASCII_REP: dict[
 
 VALUE_MAX: int = 12_000
 
+# plies of the per-ply tables of the search (killer moves, principal variation)
+MAX_PLY: int = 128
+
+
+# color of the piece standing on a square
+PIECE_COLOR = {
+    piece: (
+        COLOR.WHITE
+        if 0 < piece < 7
+        else COLOR.BLACK
+        if 6 < piece < 13
+        else COLOR.UNKNOWN
+    )
+    for piece in IS_PIECE
+}
+
 
-@cache
 def get_color(
     square: int,
 ) -> COLOR:
-    if 0 < square < 7:
-        return COLOR.WHITE
-    if 6 < square < 13:
-        return COLOR.BLACK
-    return COLOR.UNKNOWN
+    return PIECE_COLOR.get(
+        square,
+        COLOR.UNKNOWN,
+    )
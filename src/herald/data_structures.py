@@ -1,26 +1,99 @@
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Iterable, Sequence
 
 from .constants import PIECE, VALUE_MAX
 
 
-@dataclass(frozen=True)
-class Move:
-    start: int
-    end: int
-    moving_piece: PIECE = PIECE.INVALID
-    captured_piece: PIECE = PIECE.INVALID
-    is_capture: bool = False
-    is_castle: bool = False
-    en_passant: int = -1
-    is_king_capture: bool = False
+# A move is an int packing, from the least significant bits:
+# start square (7 bits), end square (7 bits), moving piece (3 bits),
+# captured piece (3 bits), capture flag, castle flag
+# and the en passant square it creates (7 bits, 0 if there is none).
+# Squares are mailbox indexes, pieces are colorless PIECE values.
+Move = int
+
+MOVE_END_SHIFT = 7
+MOVE_MOVING_PIECE_SHIFT = 14
+MOVE_CAPTURED_PIECE_SHIFT = 17
+MOVE_CAPTURE_FLAG = 1 << 20
+MOVE_CASTLE_FLAG = 1 << 21
+MOVE_EN_PASSANT_SHIFT = 22
+
+
+def encode_move(
+    start: int,
+    end: int,
+    moving_piece: int,
+    captured_piece: int = PIECE.EMPTY,
+    is_capture: bool = False,
+    is_castle: bool = False,
+    en_passant: int = -1,
+) -> Move:
+    return (
+        start
+        | end << MOVE_END_SHIFT
+        | moving_piece << MOVE_MOVING_PIECE_SHIFT
+        | captured_piece << MOVE_CAPTURED_PIECE_SHIFT
+        | (MOVE_CAPTURE_FLAG if is_capture else 0)
+        | (MOVE_CASTLE_FLAG if is_castle else 0)
+        | (en_passant << MOVE_EN_PASSANT_SHIFT if en_passant != -1 else 0)
+    )
+
+
+def move_start(
+    move: Move,
+) -> int:
+    return move & 0x7F
+
+
+def move_end(
+    move: Move,
+) -> int:
+    return move >> MOVE_END_SHIFT & 0x7F
+
+
+def moving_piece(
+    move: Move,
+) -> int:
+    return move >> MOVE_MOVING_PIECE_SHIFT & 0x7
+
+
+def captured_piece(
+    move: Move,
+) -> int:
+    return move >> MOVE_CAPTURED_PIECE_SHIFT & 0x7
+
+
+def is_capture(
+    move: Move,
+) -> bool:
+    return bool(move & MOVE_CAPTURE_FLAG)
+
+
+def is_castle(
+    move: Move,
+) -> bool:
+    return bool(move & MOVE_CASTLE_FLAG)
+
+
+def is_king_capture(
+    move: Move,
+) -> bool:
+    return move >> MOVE_CAPTURED_PIECE_SHIFT & 0x7 == PIECE.KING
+
+
+def move_en_passant(
+    move: Move,
+) -> int:
+    """Return the en passant square created by the move, -1 if there is none."""
+    return (move >> MOVE_EN_PASSANT_SHIFT) or -1
 
 
 @dataclass(frozen=True)
 class Node:
     value: int
     depth: int
-    pv: list[Move]
+    # the principal variation, only given at the root (see pv_table)
+    pv: Sequence[Move] = ()
     upper: int = VALUE_MAX
     lower: int = -VALUE_MAX
     children: int = 1
@@ -82,8 +155,8 @@ def is_promotion(
     (
         row,
         _,
-    ) = decompose_square(move.end)
-    return move.moving_piece == PIECE.PAWN and (
+    ) = decompose_square(move_end(move))
+    return moving_piece(move) == PIECE.PAWN and (
         row
         in (
             8,
@@ -97,11 +170,11 @@ def to_uci(
 ) -> str:
     if isinstance(
         input_move,
-        Move,
+        int,
     ):
         return (
-            f"{to_normal_notation(input_move.start)}"
-            f"{to_normal_notation(input_move.end)}"
+            f"{to_normal_notation(move_start(input_move))}"
+            f"{to_normal_notation(move_end(input_move))}"
             f"{'q' if is_promotion(input_move) else ''}"
         )
 
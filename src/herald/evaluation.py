@@ -1,8 +1,13 @@
-from functools import cache
+from typing import TYPE_CHECKING, Sequence
 
-from .constants import COLOR, IS_PIECE, PIECE, get_color
+from . import caches
+from .constants import IS_PIECE, PIECE
 
-PIECE_VALUE = {
+if TYPE_CHECKING:
+    from .board import AnyBoard
+
+# keyed by int, pieces are read from the board as plain ints
+PIECE_VALUE: dict[int, int] = {
     PIECE.EMPTY: 0,
     PIECE.PAWN: 100,
     PIECE.KNIGHT: 280,
@@ -161,7 +166,7 @@ PIECE_SQUARE_TABLE = [
 PIECE_SQUARE_TABLE_MAILBOX = []
 for table in PIECE_SQUARE_TABLE:
     new_piece_table: dict[
-        PIECE,
+        int,
         list[int],
     ] = {}
     for piece in table:
@@ -179,23 +184,15 @@ for table in PIECE_SQUARE_TABLE:
     PIECE_SQUARE_TABLE_MAILBOX.append(new_piece_table)
 
 
-@cache
 def remaining_material(
-    squares: tuple[int],
+    piece_lists: Sequence[Sequence[int]],
 ) -> int:
     material = 0
-    for i in range(8):
-        for j in range(8):
-            square = (2 + j) * 10 + (i + 1)
-            piece = squares[square]
-            if piece == PIECE.EMPTY:
-                continue
-            assert 0 < IS_PIECE[piece] < 7
-            material += PIECE_VALUE[IS_PIECE[piece]]
+    for piece in range(1, 13):
+        material += len(piece_lists[piece]) * PIECE_VALUE[IS_PIECE[piece]]
     return material
 
 
-@cache
 def remaining_material_percent(
     remaining_material: int,
 ) -> float:
@@ -205,38 +202,50 @@ def remaining_material_percent(
     )
 
 
-@cache
 def eval_fast(
-    squares: tuple[int],
+    piece_lists: Sequence[Sequence[int]],
     remaining_material: int,
 ) -> int:
     evaluation = 0
+    percent = remaining_material_percent(remaining_material)
 
-    for i in range(8):
-        for j in range(8):
-            square = (2 + j) * 10 + (i + 1)
-            piece = squares[square]
-            if piece == PIECE.EMPTY:
-                continue
-            color = get_color(piece)
-
-            assert 0 < IS_PIECE[piece] < 7
-
-            if color == COLOR.WHITE:
-                evaluation += PIECE_VALUE[IS_PIECE[piece]]
-                evaluation += int(
-                    PIECE_SQUARE_TABLE_MAILBOX[0][IS_PIECE[piece]][square]
-                    * remaining_material_percent(remaining_material)
-                    + PIECE_SQUARE_TABLE_MAILBOX[1][IS_PIECE[piece]][square]
-                    * (1 - remaining_material_percent(remaining_material))
-                )
-            else:
-                invsquare = (9 - j) * 10 + (i + 1)
-                evaluation -= PIECE_VALUE[IS_PIECE[piece]]
-                evaluation -= int(
-                    PIECE_SQUARE_TABLE_MAILBOX[0][IS_PIECE[piece]][invsquare]
-                    * remaining_material_percent(remaining_material)
-                    + PIECE_SQUARE_TABLE_MAILBOX[1][IS_PIECE[piece]][invsquare]
-                    * (1 - remaining_material_percent(remaining_material))
-                )
+    for piece in range(1, 7):
+        for square in piece_lists[piece]:
+            evaluation += PIECE_VALUE[piece]
+            evaluation += int(
+                PIECE_SQUARE_TABLE_MAILBOX[0][piece][square] * percent
+                + PIECE_SQUARE_TABLE_MAILBOX[1][piece][square] * (1 - percent)
+            )
+        for square in piece_lists[piece + 6]:
+            invsquare = 110 - square + 2 * (square % 10)
+            evaluation -= PIECE_VALUE[piece]
+            evaluation -= int(
+                PIECE_SQUARE_TABLE_MAILBOX[0][piece][invsquare] * percent
+                + PIECE_SQUARE_TABLE_MAILBOX[1][piece][invsquare] * (1 - percent)
+            )
     return evaluation
+
+
+# evaluations of the positions already seen, keyed by zobrist key
+# sized by Config.eval_cache_size at the start of each search
+EVAL_CACHE: caches.Cache = caches.new(caches.DEFAULT_SIZE)
+
+
+def eval_board(
+    b: "AnyBoard",
+) -> int:
+    value = caches.get(
+        EVAL_CACHE,
+        b.zobrist,
+    )
+    if value is None:
+        value = eval_fast(
+            b.piece_lists,
+            b.remaining_material,
+        )
+        caches.put(
+            EVAL_CACHE,
+            b.zobrist,
+            value,
+        )
+    return value
@@ -0,0 +1,135 @@
+"""Killer moves, history heuristic and countermoves, to order the quiet moves.
+
+https://www.chessprogramming.org/Killer_Heuristic
+https://www.chessprogramming.org/History_Heuristic
+https://www.chessprogramming.org/Countermove_Heuristic
+The killer table keeps, for each ply, the last two quiet moves that made a beta cutoff:
+they are tried early in the sibling nodes, where they often cut off again.
+A quiet move that makes a beta cutoff gets a bonus of depth * depth in the butterfly table,
+indexed by the side, the start square and the end square of the move,
+and becomes the countermove of the move played just before it.
+The tables are flat arrays of the search context and live from one search to the next:
+the history is halved at each new search (and whenever an entry grows too big)
+so that the recent cutoffs weigh more.
+"""
+
+from array import array
+from typing import Iterable
+
+from .constants import COLOR, MAX_PLY
+from .data_structures import Move, move_end, move_start
+
+# squares of the 10x12 mailbox
+SQUARES: int = 120
+
+# the history grows until one of its entries reaches this value, then it is halved
+HISTORY_MAX: int = 1 << 20
+
+# killer moves kept for each ply
+KILLER_SLOTS: int = 2
+
+
+def new_killers() -> array:
+    """Killer table, indexed by (ply, slot), the most recent killer in the first slot."""
+    return array("l", [0]) * (MAX_PLY * KILLER_SLOTS)
+
+
+def add_killer(
+    killers: array,
+    ply: int,
+    move: Move,
+) -> None:
+    if ply >= MAX_PLY:
+        return
+    index = ply * KILLER_SLOTS
+    if killers[index] != move:
+        killers[index + 1] = killers[index]
+        killers[index] = move
+
+
+def killer_moves(
+    killers: array,
+    ply: int,
+) -> tuple[Move, ...]:
+    """The killer moves of the ply, the most recent first."""
+    if ply >= MAX_PLY:
+        return ()
+    index = ply * KILLER_SLOTS
+    return tuple(m for m in killers[index : index + KILLER_SLOTS] if m)
+
+
+def new_history() -> array:
+    """Butterfly table, indexed by (side, start square, end square)."""
+    return array("l", [0]) * (2 * SQUARES * SQUARES)
+
+
+def new_countermoves() -> array:
+    """Countermove table, indexed by (start square, end square) of the previous move."""
+    return array("l", [0]) * (SQUARES * SQUARES)
+
+
+def history_index(
+    turn: COLOR,
+    move: Move,
+) -> int:
+    return (turn * SQUARES + move_start(move)) * SQUARES + move_end(move)
+
+
+def add_cutoff(
+    history: array,
+    countermoves: array,
+    turn: COLOR,
+    move: Move,
+    previous_move: Move,
+    depth: int,
+) -> None:
+    """Record the quiet move that made a beta cutoff."""
+    index = history_index(
+        turn,
+        move,
+    )
+    history[index] += depth * depth
+    if history[index] >= HISTORY_MAX:
+        age(history)
+    if previous_move:
+        countermoves[move_start(previous_move) * SQUARES + move_end(previous_move)] = move
+
+
+def countermove(
+    countermoves: array,
+    previous_move: Move,
+) -> Move:
+    """The move that refuted previous_move last time, 0 if there is none."""
+    if not previous_move:
+        return 0
+    return countermoves[move_start(previous_move) * SQUARES + move_end(previous_move)]
+
+
+def age(
+    history: array,
+) -> None:
+    for index, value in enumerate(history):
+        if value:
+            history[index] = value >> 1
+
+
+def order_quiet_moves(
+    history: array,
+    countermoves: array,
+    turn: COLOR,
+    previous_move: Move,
+    moves: Iterable[Move],
+) -> list[Move]:
+    """Sort the quiet moves by history, the countermove of the previous move first."""
+    counter = countermove(
+        countermoves,
+        previous_move,
+    )
+    offset = turn * SQUARES * SQUARES
+    return sorted(
+        moves,
+        key=lambda move: (
+            move != counter,
+            -history[offset + move_start(move) * SQUARES + move_end(move)],
+        ),
+    )
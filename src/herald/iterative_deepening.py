@@ -1,8 +1,8 @@
-import multiprocessing
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
-from . import board
+from . import board, history, root_split, search_context
+from . import transposition_table as tt
 from .board import Board
 from .configuration import Config
 from .constants import COLOR_DIRECTION, VALUE_MAX
@@ -10,48 +10,39 @@ from .data_structures import to_uci
 from .search import Search, search
 
 
-# wrapper around the search function to allow for multiprocess time management
-def search_wrapper(
-    queue: Any,
-    b: Board,
-    depth: int,
-    config: Config,
-    last_search: Search,
-    children: int,
-    transposition_table: dict,
-    hash_move_tt: dict,
-) -> None:
-    search(
-        b=b,
-        depth=depth,
-        config=config,
-        last_search=last_search,
-        children=children,
-        transposition_table=transposition_table,
-        hash_move_tt=hash_move_tt,
-        queue=queue,
-    )
-    queue.close()
-
-
 def itdep(
-    queue: Any,
     b: Board,
     config: Config,
     movetime: int = 0,
     max_depth: int = 10,
     print_uci: bool = True,
     last_search: Search | None = None,
+    stop: Any = None,
+    output: Callable[[str], None] = print,
+    depth_offset: int = 0,
+    pool: root_split.Pool | None = None,
+    search_number: int = 1,
 ) -> Optional[Search]:
-    # clear transposition table at each new search
-    # there seems to be collision/memory issues that I don't have time to handle now
-    config.transposition_table.clear()
-    config.hash_move_tt.clear()
+    """Search the board deeper and deeper until the time, the depth or the stop flag says so.
+
+    The movetime is in deciseconds (see time_management.target_movetime).
+    The stop flag is a shared ctypes value that another process can set to end the search
+    (see search_context.SearchContext.stop), the best move of the interrupted iteration
+    is then played.
+    The lazy SMP helpers start their iterations depth_offset deeper than the main worker.
+    With a pool, the moves of the root are split over its processes.
+    """
+    # the transposition table is kept from one search to the next
+    # the entries of the previous searches are the first to be replaced
+    tt.new_generation(config.transposition_table)
+    # and so is the history, halved for the cutoffs of this search to weigh more
+    if config.use_history_heuristic:
+        history.age(config.context.history)
 
     if last_search is not None and config.use_saved_search:
         # try to find a useful subsearch in the last_search
         for move in last_search.pv:
-            if hash(last_search.board) == hash(b) or len(last_search.pv) < 2:
+            if last_search.board.zobrist == b.zobrist or len(last_search.pv) < 2:
                 break
             # compute next subsearch
             last_search = Search(
@@ -67,7 +58,7 @@ def itdep(
                 time=0,
             )
         # clear last_search if it can't be used
-        if hash(last_search.board) != hash(b):
+        if last_search.board.zobrist != b.zobrist:
             last_search = None
         else:
             last_search.end = False
@@ -77,9 +68,18 @@ def itdep(
         start_depth = len(last_search.pv) + 1
     else:
         start_depth = 1
-
+        last_search = None
+    start_depth += depth_offset
+
+    start_time = time.time_ns()
+    # the search checks the stop flag and the clock as it goes
+    search_context.start(
+        config.context,
+        stop=stop,
+        deadline=start_time + movetime * 100_000_000 if movetime > 0 else 0,
+        search=search_number,
+    )
     if movetime > 0:
-        start_time = time.time_ns()
         max_depth = max(
             1,
             min(
@@ -87,159 +87,58 @@ def itdep(
                 max_depth,
             ),
         )
-        for i in range(
-            start_depth,
-            max_depth + 1,
-        ):
-            # we create a queue to be able to stop the search when there's no time left
-            # pylint issue: https://github.com/PyCQA/pylint/issues/3488
-            # pylint: disable=unsubscriptable-object
-            subqueue: multiprocessing.Queue[
-                tuple[
-                    Search,
-                    Config,
-                ]
-                | None
-            ] = multiprocessing.Queue()
-            process = multiprocessing.Process(
-                target=search_wrapper,
-                args=(
-                    subqueue,
-                    b,
-                ),
-                kwargs={
-                    "depth": i,
-                    "config": config,
-                    "last_search": last_search,
-                    "children": 0 if last_search is None else last_search.nodes,
-                    "transposition_table": config.transposition_table,
-                    "hash_move_tt": config.hash_move_tt,
-                },
-                daemon=False,
-            )
-            process.start()
-
-            current_search: Search | None = None
-            while True:
-                # we sometime check if we got a move out of the queue
-                try:
-                    ret: tuple[
-                        Search,
-                        Config,
-                    ] | None = subqueue.get(
-                        True,
-                        0.1,
-                    )
-
-                    if ret is not None:
-                        (
-                            current_search,
-                            config,
-                        ) = ret
-
-                    # if there is no move available and no exception was raised
-                    if current_search is None:
-                        # This is not strictly UCI but helps for evaluation/versus.py
-                        if print_uci:
-                            print("bestmove nomove")
-                        return None
-
-                except Exception:
-                    current_search = None
-
-                if current_search is not None:
-                    last_search = current_search
-
-                # bail out if the search tells us to stop
-                assert isinstance(
-                    last_search,
-                    Search,
-                )
-                if last_search is not None and last_search.stop_search:
-                    if __debug__:
-                        print("stop_search")
-                    process.terminate()
-                    subqueue.close()
-                    queue.put(last_search)
-                    if print_uci:
-                        print(f"bestmove {to_uci(last_search.move)}")
-                    return last_search
 
-                # bail out if we have a mate
-                if (
-                    last_search is not None
-                    and COLOR_DIRECTION[b.turn] * last_search.score >= VALUE_MAX
-                ):
-                    if __debug__:
-                        print("mate")
-                    queue.put(last_search)
-                    if print_uci:
-                        print(f"bestmove {to_uci(last_search.move)}")
-                    return last_search
-
-                # calculate used time
-                used_time = int(
-                    max(
-                        1,
-                        (time.time_ns() - start_time) // 1e8,
-                    )
-                )
-
-                # bail out if we have no time anymore
-                if used_time + 1 >= movetime:
-                    if __debug__:
-                        print("no_time")
-                    process.terminate()
-                    subqueue.close()
-                    queue.put_nowait(last_search)
-                    if last_search is not None and print_uci:
-                        print(f"bestmove {to_uci(last_search.move)}")
-                        return last_search
-                    return None
-
-                if last_search is not None and last_search.end and last_search.depth >= i:
-                    if __debug__:
-                        print(f"end_search: {last_search.depth}")
-                    process.terminate()
-                    subqueue.close()
-                    break
-
-        queue.put(last_search)
-        if last_search is not None and print_uci:
-            print(f"bestmove {to_uci(last_search.move)}")
-            return last_search
-
-        return None
-
-    last_search = None
     for i in range(
         start_depth,
         max_depth + 1,
     ):
-        children = 0
-        if last_search is not None:
-            children = last_search.nodes
-        ret = search(b=b, depth=i, last_search=last_search, config=config, children=children)
-
-        if ret is not None:
-            (
-                current_search,
-                config,
-            ) = ret
+        current_search = search(
+            b=b,
+            depth=i,
+            config=config,
+            last_search=last_search,
+            children=0 if last_search is None else last_search.nodes,
+            output=output,
+            pool=pool,
+        )
 
         # if there is no move available
         if current_search is None:
             # This is not strictly UCI but helps for evaluation/versus.py
             if print_uci:
-                print("bestmove nomove")
+                output("bestmove nomove")
             return None
 
         last_search = current_search
-        if current_search.stop_search:
+
+        # bail out if the search tells us to stop
+        if last_search.stop_search:
+            if __debug__:
+                output("info string stop_search")
+            break
+
+        # bail out if we have a mate
+        if COLOR_DIRECTION[b.turn] * last_search.score >= VALUE_MAX:
+            if __debug__:
+                output("info string mate")
             break
 
+        # the search was interrupted by the stop flag or the clock
+        if config.context.stopped or search_context.stop_asked(config.context):
+            if __debug__:
+                output("info string stopped")
+            break
+
+        if movetime > 0:
+            # calculate used time
+            used_time = (time.time_ns() - start_time) // 1e8
+            # the next iteration takes longer than all the previous ones together,
+            # do not start it if it cannot end in time
+            if 2 * used_time + 1 >= movetime:
+                if __debug__:
+                    output("info string no_time")
+                break
+
     if last_search is not None and print_uci:
-        print(f"bestmove {to_uci(last_search.move)}")
-    if queue is not None:
-        queue.put(last_search)
+        output(f"bestmove {to_uci(last_search.move)}")
     return last_search
@@ -2,11 +2,11 @@
 
 from typing import Iterable
 
-from . import board, evaluation
+from . import board, evaluation, pv_table
 from .board import Board
 from .configuration import Config
 from .constants import COLOR, VALUE_MAX
-from .data_structures import Move, Node
+from .data_structures import Move, Node, is_king_capture
 
 
 # Simple minimax
@@ -14,22 +14,24 @@ def minimax(
     config: Config,
     b: Board,
     depth: int,
-    pv: list[Move],
     gen_legal_moves: bool = False,
     alpha: int = 0,
     beta: int = 0,
+    ply: int = 0,
 ) -> Node:
     assert depth >= 0, depth
 
+    # the principal variation is in the pv table, the root returns it
+    pv_table.clear(
+        config.context.pv_lengths,
+        ply,
+    )
+
     # if we are on a terminal node, return the evaluation
     if depth == 0:
         return Node(
-            value=evaluation.eval_fast(
-                b.squares,
-                b.remaining_material,
-            ),
+            value=evaluation.eval_board(b),
             depth=0,
-            pv=pv,
             children=1,
         )
 
@@ -52,15 +54,26 @@ def minimax(
             b,
             move,
         )
-        curr_pv = pv.copy()
-        curr_pv.append(move)
-
         # return immediately if this is a king capture
-        if move.is_king_capture:
+        if is_king_capture(move):
+            pv_table.clear(
+                config.context.pv_lengths,
+                ply + 1,
+            )
+            pv_table.update(
+                config.context.pv_table,
+                config.context.pv_lengths,
+                ply,
+                move,
+            )
             return Node(
                 value=VALUE_MAX * b.turn,
                 depth=depth,
-                pv=curr_pv,
+                pv=pv_table.root_line(
+                    config.context.pv_table,
+                    config.context.pv_lengths,
+                    ply,
+                ),
                 children=children,
             )
 
@@ -76,26 +89,36 @@ def minimax(
             config,
             curr_board,
             depth - 1,
-            curr_pv,
             False,
+            ply=ply + 1,
         )
 
         children += node.children
 
         if b.turn == COLOR.WHITE:
             if best is None or node.value > best.value:
+                pv_table.update(
+                    config.context.pv_table,
+                    config.context.pv_lengths,
+                    ply,
+                    move,
+                )
                 best = Node(
                     value=node.value,
                     depth=depth,
-                    pv=node.pv,
                     children=children,
                 )
         else:
             if best is None or node.value < best.value:
+                pv_table.update(
+                    config.context.pv_table,
+                    config.context.pv_lengths,
+                    ply,
+                    move,
+                )
                 best = Node(
                     value=node.value,
                     depth=depth,
-                    pv=node.pv,
                     children=children,
                 )
 
@@ -106,7 +129,11 @@ def minimax(
         return Node(
             value=best.value,
             depth=best.depth,
-            pv=best.pv,
+            pv=pv_table.root_line(
+                config.context.pv_table,
+                config.context.pv_lengths,
+                ply,
+            ),
             children=children,
         )
 
@@ -120,7 +147,6 @@ def minimax(
         return Node(
             depth=depth,
             value=VALUE_MAX * b.turn * -1,
-            pv=pv,
             lower=alpha,
             upper=beta,
             children=children,
@@ -128,7 +154,6 @@ def minimax(
     return Node(
         depth=depth,
         value=0,
-        pv=pv,
         lower=alpha,
         upper=beta,
         children=children,
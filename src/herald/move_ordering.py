@@ -1,10 +1,19 @@
 from random import shuffle
-from typing import Callable, Iterable, List
+from typing import Callable, Iterable, Iterator, List
 
-from . import pruning
+from . import board, history, pruning
 from .board import Board
 from .constants import PIECE
-from .data_structures import Move
+from .data_structures import (
+    Move,
+    captured_piece,
+    is_capture,
+    is_king_capture,
+    is_promotion,
+    move_end,
+    moving_piece,
+)
+from .search_context import SearchContext
 
 Move_ordering_fn = Callable[
     [
@@ -26,13 +35,13 @@ def capture_ordering(
 
     for m in moves:
         # promotions are highly valued
-        if m.moving_piece == PIECE.PAWN and (m.end < 30 or m.end > 90):
+        if moving_piece(m) == PIECE.PAWN and (move_end(m) < 30 or move_end(m) > 90):
             yield m
-        if not m.is_capture:
+        if not is_capture(m):
             continue
-        if m.is_king_capture:
+        if is_king_capture(m):
             yield m
-        if m.captured_piece > 3:
+        if captured_piece(m) > 3:
             yield m
         if mem1 is None:
             mem1 = m
@@ -46,7 +55,7 @@ def capture_ordering(
         if mem4 is None:
             mem4 = m
             continue
-        if m.captured_piece < mem1.captured_piece:
+        if captured_piece(m) < captured_piece(mem1):
             (
                 m,
                 mem1,
@@ -54,7 +63,7 @@ def capture_ordering(
                 mem1,
                 m,
             )
-        if m.captured_piece < mem2.captured_piece:
+        if captured_piece(m) < captured_piece(mem2):
             (
                 m,
                 mem2,
@@ -62,7 +71,7 @@ def capture_ordering(
                 mem2,
                 m,
             )
-        if m.captured_piece < mem3.captured_piece:
+        if captured_piece(m) < captured_piece(mem3):
             (
                 m,
                 mem3,
@@ -70,7 +79,7 @@ def capture_ordering(
                 mem3,
                 m,
             )
-        if m.captured_piece < mem4.captured_piece:
+        if captured_piece(m) < captured_piece(mem4):
             (
                 m,
                 mem4,
@@ -99,18 +108,18 @@ def fast_ordering(
 
     for m in moves:
         # promotions are highly valued
-        if m.moving_piece == PIECE.PAWN and (m.end < 30 or m.end > 90):
+        if moving_piece(m) == PIECE.PAWN and (move_end(m) < 30 or move_end(m) > 90):
             yield m
-        if m.is_king_capture:
+        if is_king_capture(m):
             yield m
-        if m.is_capture:
+        if is_capture(m):
             if pruning.is_bad_capture(
                 b,
                 m,
             ):
                 bad_captures.append(m)
                 continue
-            if m.captured_piece > 3:
+            if captured_piece(m) > 3:
                 yield m
                 continue
             captures.append(m)
@@ -120,6 +129,114 @@ def fast_ordering(
     yield from bad_captures
 
 
+def history_ordering(
+    b: board.AnyBoard,
+    moves: Iterable[Move],
+    context: SearchContext,
+    previous_move: Move,
+) -> List[Move]:
+    """Sort the quiet moves by history, in the places they hold among the ordered moves."""
+    moves = list(moves)
+    quiet = [i for i, m in enumerate(moves) if not is_capture(m) and not is_promotion(m)]
+    sorted_quiet = history.order_quiet_moves(
+        context.history,
+        context.countermoves,
+        b.turn,
+        previous_move,
+        (moves[i] for i in quiet),
+    )
+    for i, m in zip(quiet, sorted_quiet):
+        moves[i] = m
+    return moves
+
+
+def staged_moves(
+    b: board.AnyBoard,
+    hash_move: Move | None,
+    killer_moves: Iterable[Move],
+    context: SearchContext | None = None,
+    previous_move: Move = 0,
+) -> Iterable[Move]:
+    """Generate the moves lazily, stage by stage, in the order they should be tried.
+
+    The hash move comes first without generating anything,
+    then the good captures in MVV-LVA order and the promotions, the killer moves,
+    the quiet moves (sorted by the history of the search context if given)
+    and finally the bad captures.
+    A cutoff in an early stage saves the generation (and the SEE) of the next ones.
+    https://www.chessprogramming.org/Move_Generation#Staged_Move_Generation
+    """
+    yielded: set[Move] = set()
+
+    if hash_move is not None and board.is_pseudo_legal_move(
+        b,
+        hash_move,
+    ):
+        yielded.add(hash_move)
+        yield hash_move
+
+    bad_captures: list[Move] = []
+    for m in board.tactical_moves(b):
+        if m in yielded:
+            continue
+        if pruning.is_bad_capture(
+            b,
+            m,
+        ):
+            bad_captures.append(m)
+            continue
+        yielded.add(m)
+        yield m
+
+    # the promotions are highly valued (the ones that capture are among the captures)
+    for m in board.promotion_moves(b):
+        if m not in yielded:
+            yielded.add(m)
+            yield m
+
+    # killer moves come from sibling nodes, they might not be possible here
+    for m in killer_moves:
+        if m not in yielded and board.is_pseudo_legal_move(
+            b,
+            m,
+        ):
+            yielded.add(m)
+            yield m
+
+    # the captures were already generated, except the ones of the king
+    quiet_moves: Iterator[Move] = (
+        m
+        for m in board.pseudo_legal_moves(b)
+        if m not in yielded and (not is_capture(m) or is_king_capture(m))
+    )
+    if context is not None:
+        quiet_moves = iter(
+            history.order_quiet_moves(
+                context.history,
+                context.countermoves,
+                b.turn,
+                previous_move,
+                quiet_moves,
+            )
+        )
+    yield from quiet_moves
+
+    yield from bad_captures
+
+
+def rotate(
+    moves: Iterable[Move],
+    shift: int,
+) -> List[Move]:
+    """Keep the first move in place and rotate the next ones by shift."""
+    moves = list(moves)
+    if len(moves) > 2:
+        rest = moves[1:]
+        shift %= len(rest)
+        moves = moves[:1] + rest[shift:] + rest[:shift]
+    return moves
+
+
 def no_ordering(
     _: Board,
     moves: Iterable[Move],
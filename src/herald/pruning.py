@@ -1,32 +1,139 @@
-from . import board, evaluation
-from .board import Board
+from math import log
+
+from . import board
+from .board import AnyBoard, Board
 from .constants import COLOR, COLOR_DIRECTION, IS_PIECE, PIECE
-from .data_structures import Move
-from .evaluation import PIECE_VALUE
+from .data_structures import (
+    Move,
+    captured_piece,
+    is_capture,
+    move_end,
+    move_start,
+    moving_piece,
+)
+from .evaluation import PIECE_VALUE, remaining_material_percent
+
+# deepest remaining depth at which the futility of the quiet moves is tested (frontier nodes)
+FUTILITY_DEPTH: int = 2
+
+# deepest remaining depth at which the reverse futility pruning cuts a node
+REVERSE_FUTILITY_DEPTH: int = 3
+
+# the late moves are only reduced from this remaining depth
+LATE_MOVE_REDUCTION_DEPTH: int = 3
+
+# and after this number of moves searched at full depth
+LATE_MOVE_REDUCTION_MOVES: int = 3
+
+# reduction of the late moves, indexed by [depth][number of the move]
+# it grows with the logarithms of both (https://www.chessprogramming.org/Late_Move_Reductions)
+LATE_MOVE_REDUCTIONS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(
+        int(0.75 + log(depth) * log(index) / 2.25) if depth > 0 and index > 0 else 0
+        for index in range(64)
+    )
+    for depth in range(64)
+)
+
+# a node without a hash move is first searched this many plies shallower to find one,
+# from this remaining depth (internal iterative deepening)
+INTERNAL_ITERATIVE_DEEPENING_DEPTH: int = 4
+INTERNAL_ITERATIVE_DEEPENING_REDUCTION: int = 2
+
+# or it is searched one ply shallower, from this remaining depth (internal iterative reduction)
+INTERNAL_ITERATIVE_REDUCTION_DEPTH: int = 4
+
+# depth reduction of the search that follows a null move
+NULL_MOVE_REDUCTION: int = 2
+
+# share of the starting material (see evaluation.remaining_material_percent)
+# under which no null move is tried
+NULL_MOVE_MIN_MATERIAL: float = 0.2
+
+# share of the starting material under which a null move that fails high
+# has to be verified by a search without it (zugzwangs are common in endgames)
+NULL_MOVE_VERIFICATION_MATERIAL: float = 0.4
 
 
 def is_futile(
-    b: Board,
+    b: AnyBoard,
+    static_eval: int,
     depth: int,
     alpha: int,
     beta: int,
+    margin: int,
 ) -> bool:
-    static_eval: int = evaluation.eval_fast(b.squares)
+    """Tell if the quiet moves of the node cannot bring its static evaluation into the window.
 
-    def futility_margin(
-        depth: int,
-    ) -> int:
-        return 165 * depth
+    The margin is what a quiet move can gain for each ply of the remaining depth.
+    https://www.chessprogramming.org/Futility_Pruning
+    """
+    if b.turn == COLOR.WHITE:
+        return static_eval + margin * depth <= alpha
+    return static_eval - margin * depth >= beta
 
-    # colors are inverted since this is a board resulting from our tested move
-    if b.turn == COLOR.BLACK:
-        if static_eval + futility_margin(depth) <= alpha:
-            return True
-    else:
-        if static_eval - futility_margin(depth) >= beta:
-            return True
 
-    return False
+def is_reverse_futile(
+    b: AnyBoard,
+    static_eval: int,
+    depth: int,
+    alpha: int,
+    beta: int,
+    margin: int,
+) -> bool:
+    """Tell if the static evaluation of the node is so far beyond the window
+    that the opponent cannot bring it back (static null move pruning).
+
+    https://www.chessprogramming.org/Reverse_Futility_Pruning
+    """
+    if b.turn == COLOR.WHITE:
+        return static_eval - margin * depth >= beta
+    return static_eval + margin * depth <= alpha
+
+
+def late_move_reduction(
+    depth: int,
+    moves_searched: int,
+) -> int:
+    """Plies removed from the search of a late move, leaving at least one ply to search."""
+    return min(
+        LATE_MOVE_REDUCTIONS[min(depth, 63)][min(moves_searched, 63)],
+        depth - 2,
+    )
+
+
+def can_null_move(
+    b: AnyBoard,
+) -> bool:
+    """Tell if passing the turn gives a lower bound of the value of the position.
+
+    It does not in zugzwang, where every move makes the position worse:
+    this is likely when the side to move has only its king and pawns, or little material is left.
+    https://www.chessprogramming.org/Null_Move_Pruning
+    """
+    if remaining_material_percent(b.remaining_material) < NULL_MOVE_MIN_MATERIAL:
+        return False
+    if not any(
+        b.piece_lists[piece + 6 * b.turn]
+        for piece in (
+            PIECE.KNIGHT,
+            PIECE.BISHOP,
+            PIECE.ROOK,
+            PIECE.QUEEN,
+        )
+    ):
+        return False
+    # passing the turn is not legal when in check
+    return not board.king_is_in_check(
+        b,
+        b.turn,
+    )
+
+
+def needs_null_move_verification(
+    b: AnyBoard,
+) -> bool:
+    return remaining_material_percent(b.remaining_material) < NULL_MOVE_VERIFICATION_MATERIAL
 
 
 # see() returns a colorified score
@@ -34,10 +141,17 @@ def is_futile(
 # The value is not exact, it does not represent something else than being positive or negative
 # when the returned value is exactly 0, then it's *probably* better not to take
 def see(
-    b: Board,
+    b: AnyBoard,
     target: int,
     score: int,
 ) -> int:
+    # the captures are played in place on a mutable copy of the board
+    if isinstance(
+        b,
+        Board,
+    ):
+        b = board.to_mutable(b)
+
     # return score if it's already in our favor
     # this allows to go faster but see() doesn't return exact results
     if COLOR_DIRECTION[b.turn] * score > 0:
@@ -53,33 +167,29 @@ def see(
 
         # if we capture with a piece that has a lesser value the SEE can only be good
         # so we imagine the capturing piece being taken
-        current_score = score + value - PIECE_VALUE[move.moving_piece] * COLOR_DIRECTION[b.turn]
+        current_score = score + value - PIECE_VALUE[moving_piece(move)] * COLOR_DIRECTION[b.turn]
         if COLOR_DIRECTION[b.turn] * current_score > 0:
             return current_score
 
         # we apply a minmax to the tiny tree of captures to this target square
+        board.make_move(
+            b,
+            move,
+        )
+        next_score = see(
+            b,
+            target,
+            score + value,
+        )
+        board.unmake_move(b)
         if b.turn == COLOR.WHITE:
             return max(
                 score,
-                see(
-                    board.push(
-                        b,
-                        move,
-                    ),
-                    target,
-                    score + value,
-                ),
+                next_score,
             )
         return min(
             score,
-            see(
-                board.push(
-                    b,
-                    move,
-                ),
-                target,
-                score + value,
-            ),
+            next_score,
         )
 
     # if no valid move, return score
@@ -87,14 +197,14 @@ def see(
 
 
 def is_bad_capture(
-    b: Board,
+    b: AnyBoard,
     move: Move,
 ) -> bool:
     # a non-capture move is not a bad capture
-    if not move.is_capture:
+    if not is_capture(move):
         return False
 
-    if move.moving_piece == PIECE.PAWN or move.captured_piece in [
+    if moving_piece(move) == PIECE.PAWN or captured_piece(move) in [
         PIECE.KING,
         PIECE.QUEEN,
     ]:
@@ -102,8 +212,8 @@ def is_bad_capture(
 
     # captured piece is worth more than capturing piece
     if (
-        PIECE_VALUE[IS_PIECE[b.squares[move.end]]]
-        >= PIECE_VALUE[IS_PIECE[b.squares[move.start]]] - 50
+        PIECE_VALUE[IS_PIECE[b.squares[move_end(move)]]]
+        >= PIECE_VALUE[IS_PIECE[b.squares[move_start(move)]]] - 50
     ):
         return False
 
@@ -120,8 +230,8 @@ def is_bad_capture(
         )
     ):
         if (
-            IS_PIECE[b.squares[move.start + depl]] == PIECE.PAWN
-            and b.squares[move.start + depl] * COLOR_DIRECTION[b.turn] < 0
+            IS_PIECE[b.squares[move_start(move) + depl]] == PIECE.PAWN
+            and b.squares[move_start(move) + depl] * COLOR_DIRECTION[b.turn] < 0
         ):
             return True
 
@@ -129,7 +239,7 @@ def is_bad_capture(
     if (
         see(
             b,
-            move.end,
+            move_end(move),
             0,
         )
         * COLOR_DIRECTION[b.turn]
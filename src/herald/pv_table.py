@@ -0,0 +1,117 @@
+"""Triangular PV table, to get the principal variation without copying it at each node.
+
+https://www.chessprogramming.org/Triangular_PV-Table
+The table is a flat array of MAX_PLY rows of MAX_PLY moves, preallocated for the search.
+The row of a ply holds the best line found from the node at that ply, from its column ply
+to its length. A node empties its row when it starts; when a move becomes its best one,
+the row becomes that move followed by the row of the child it just searched.
+The line stops at the nodes that return without searching their moves
+(transposition table cutoff, pruning, ...): the transposition table can extend it.
+"""
+
+from array import array
+from typing import Sequence
+
+from . import board
+from . import transposition_table as tt
+from .board import Board
+from .constants import MAX_PLY
+from .data_structures import Move
+
+
+def new_table() -> array:
+    return array("l", [0]) * (MAX_PLY * MAX_PLY)
+
+
+def new_lengths() -> array:
+    """Where the row of each ply ends, all the rows empty."""
+    return array("l", range(MAX_PLY))
+
+
+def clear(
+    lengths: array,
+    ply: int,
+) -> None:
+    if ply < MAX_PLY:
+        lengths[ply] = ply
+
+
+def update(
+    table: array,
+    lengths: array,
+    ply: int,
+    move: Move,
+) -> None:
+    """Make move, followed by the line of the child, the line of the ply."""
+    if ply >= MAX_PLY - 1:
+        return
+    row = ply * MAX_PLY
+    child_row = row + MAX_PLY
+    end = lengths[ply + 1]
+    table[row + ply] = move
+    table[row + ply + 1 : row + end] = table[child_row + ply + 1 : child_row + end]
+    lengths[ply] = end
+
+
+def line(
+    table: array,
+    lengths: array,
+    ply: int,
+) -> list[Move]:
+    if ply >= MAX_PLY:
+        return []
+    row = ply * MAX_PLY
+    return table[row + ply : row + lengths[ply]].tolist()
+
+
+def root_line(
+    table: array,
+    lengths: array,
+    ply: int,
+) -> Sequence[Move]:
+    """The line of the root, nothing for the other nodes.
+
+    Only the root returns its principal variation, the other nodes leave theirs in the table.
+    """
+    if ply > 0:
+        return ()
+    return line(
+        table,
+        lengths,
+        ply,
+    )
+
+
+def extend(
+    transposition_table: tt.TranspositionTable,
+    b: Board,
+    pv: Sequence[Move],
+    length: int,
+) -> list[Move]:
+    """Follow the best moves of the transposition table after pv, up to length moves."""
+    pv = list(pv)
+    mb = board.to_mutable(b)
+    for move in pv:
+        board.make_move(
+            mb,
+            move,
+        )
+    seen = {mb.zobrist}
+    while len(pv) < length:
+        entry = tt.probe(
+            transposition_table,
+            mb.zobrist,
+        )
+        # the move could come from another position sharing the key
+        if entry is None or entry[0] not in board.legal_moves(mb):
+            break
+        board.make_move(
+            mb,
+            entry[0],
+        )
+        # the best moves of a repetition go round in circles
+        if mb.zobrist in seen:
+            break
+        seen.add(mb.zobrist)
+        pv.append(entry[0])
+    return pv
@@ -1,23 +1,28 @@
-from . import board, evaluation, pruning
-from .board import Board
+from . import board, evaluation, pruning, pv_table, search_context
+from .board import AnyBoard, Board, MutableBoard
 from .configuration import Config
 from .constants import COLOR, COLOR_DIRECTION, PIECE, VALUE_MAX
-from .data_structures import Move, Node
+from .data_structures import Node, is_capture
 
 
 def quiescence(
     config: Config,
-    b: Board,
-    pv: list[Move],
+    b: AnyBoard,
     alpha: int,
     beta: int,
     debug: bool = False,
 ) -> Node:
+    # the search plays the moves in place on a mutable copy of the board
+    if isinstance(
+        b,
+        Board,
+    ):
+        b = board.to_mutable(b)
+
     node = _search(
         config=config,
         b=b,
         depth=0,
-        pv=pv,
         alpha=alpha,
         beta=beta,
     )
@@ -25,7 +30,6 @@ def quiescence(
     return Node(
         value=node.value,
         depth=0,
-        pv=node.pv,
         lower=alpha,
         upper=beta,
         children=node.children,
@@ -35,24 +39,30 @@ def quiescence(
 def _search(
     *,
     config: Config,
-    b: Board,
+    b: MutableBoard,
     depth: int = 0,
-    pv: list[Move],
     alpha: int,
     beta: int,
 ) -> Node:
     assert depth >= 0, depth
 
+    # raise SearchStopped if the search has to stop
+    search_context.count_node(config.context)
+
+    # in debug, the pv table shows the quiescent moves of the principal variation
+    if __debug__:
+        ply = len(b.undo_stack)
+        pv_table.clear(
+            config.context.pv_lengths,
+            ply,
+        )
+
     # if we are on a terminal node, return the evaluation
     if depth >= config.quiescence_depth:
-        value = evaluation.eval_fast(
-            b.squares,
-            b.remaining_material,
-        )
+        value = evaluation.eval_board(b)
         return Node(
             value=value,
             depth=0,
-            pv=pv,
             lower=alpha,
             upper=beta,
             children=1,
@@ -70,10 +80,7 @@ def _search(
 
     if not we_are_in_check:
         # stand_pat evaluation to check if we stop QS
-        stand_pat: int = evaluation.eval_fast(
-            b.squares,
-            b.remaining_material,
-        )
+        stand_pat: int = evaluation.eval_board(b)
         # if depth == 0:
         #     print(stand_pat)
         if b.turn == COLOR.WHITE:
@@ -81,7 +88,6 @@ def _search(
                 return Node(
                     value=beta,
                     depth=0,
-                    pv=pv,
                     lower=alpha,
                     upper=beta,
                     children=1,
@@ -91,7 +97,6 @@ def _search(
                 return Node(
                     value=alpha,
                     depth=0,
-                    pv=pv,
                     lower=alpha,
                     upper=beta,
                     children=1,
@@ -105,7 +110,6 @@ def _search(
                 return Node(
                     value=alpha,
                     depth=0,
-                    pv=pv,
                     lower=alpha,
                     upper=beta,
                     children=1,
@@ -115,7 +119,6 @@ def _search(
                 return Node(
                     value=beta,
                     depth=0,
-                    pv=pv,
                     lower=alpha,
                     upper=beta,
                     children=1,
@@ -127,7 +130,6 @@ def _search(
         best = Node(
             value=stand_pat,
             depth=0,
-            pv=pv,
             lower=alpha,
             upper=beta,
             children=1,
@@ -143,7 +145,7 @@ def _search(
             # and if we found already something good
             # then we can skip the rest
             # (capture moves are generated first)
-            if not move.is_capture and best is not None:
+            if not is_capture(move) and best is not None:
                 break
 
             # skip bad capture moves
@@ -153,7 +155,7 @@ def _search(
             ):
                 continue
 
-        nb = board.push(
+        board.make_move(
             b,
             move,
         )
@@ -161,36 +163,38 @@ def _search(
         # if the king is in check after we move
         # then it's a bad move (we will lose the game)
         if board.king_is_in_check(
-            nb,
-            nb.invturn,
+            b,
+            b.invturn,
         ):
+            board.unmake_move(b)
             continue
 
-        if __debug__:
-            curr_pv = pv.copy()
-            curr_pv.append(move)
-        else:
-            curr_pv = pv
-
         node = _search(
             config=config,
-            b=nb,
+            b=b,
             depth=depth + 1,
-            pv=curr_pv,
             alpha=alpha,
             beta=beta,
         )
 
+        board.unmake_move(b)
+
         children += node.children
 
         if b.turn == COLOR.WHITE:
             if best is None or node.value > best.value:
                 # if depth == 0:
                 #     print(best, node)
+                if __debug__:
+                    pv_table.update(
+                        config.context.pv_table,
+                        config.context.pv_lengths,
+                        ply,
+                        move,
+                    )
                 best = Node(
                     value=node.value,
                     depth=0,
-                    pv=node.pv,
                     lower=alpha,
                     upper=beta,
                     children=children,
@@ -205,10 +209,16 @@ def _search(
             if best is None or node.value < best.value:
                 # if depth == 0:
                 #     print(best, node)
+                if __debug__:
+                    pv_table.update(
+                        config.context.pv_table,
+                        config.context.pv_lengths,
+                        ply,
+                        move,
+                    )
                 best = Node(
                     value=node.value,
                     depth=0,
-                    pv=node.pv,
                     lower=alpha,
                     upper=beta,
                     children=children,
@@ -224,7 +234,6 @@ def _search(
         node = Node(
             value=best.value,
             depth=0,
-            pv=best.pv,
             children=children,
         )
     else:
@@ -238,20 +247,15 @@ def _search(
             node = Node(
                 depth=depth,
                 value=VALUE_MAX * COLOR_DIRECTION[b.turn] * -1,
-                pv=pv,
                 lower=alpha,
                 upper=beta,
                 children=children,
             )
         else:
-            value = evaluation.eval_fast(
-                b.squares,
-                b.remaining_material,
-            )
+            value = evaluation.eval_board(b)
             return Node(
                 value=value,
                 depth=0,
-                pv=pv,
                 lower=alpha,
                 upper=beta,
                 children=children,
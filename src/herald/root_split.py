@@ -0,0 +1,320 @@
+"""Root splitting: the moves of the root are searched in parallel by a pool of processes.
+
+Each root move is a task of a concurrent.futures.ProcessPoolExecutor.
+The first move is searched alone to get a bound, then the others are sent
+with the best bound known when they start, as many at a time as the pool has processes:
+a move that starts late benefits from all the moves that ended before it.
+For analysis, every move can instead be searched with the full window to get its exact score.
+The processes of the pool are forked by the search process,
+so they inherit its config and share its transposition table if it is in shared memory.
+The age of the table changes at every search, it is sent with each move.
+"""
+
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Generator, Iterable
+
+from . import algorithms, board, pv_table, search_context
+from . import transposition_table as tt
+from .board import Board
+from .configuration import Config
+from .constants import COLOR
+from .data_structures import Move, Node
+
+# the processes of the pool are forked to inherit the config and the shared memory
+CONTEXT = multiprocessing.get_context("fork")
+
+# seconds between two looks at the stop flag and the clock while the pool searches
+POLL_INTERVAL: float = 0.01
+
+# set in the processes of the pool by init()
+CONFIG: Config
+ABORT: Any
+
+
+@dataclass
+class Pool:
+    executor: ProcessPoolExecutor
+    # shared ctypes byte, set to abandon the searches of the pool
+    abort: Any
+
+
+def new_pool(
+    config: Config,
+) -> Pool:
+    """Start a pool of config.root_split_processes processes.
+
+    Daemonic processes cannot have children, the pool has to be started by a non-daemonic one.
+    """
+    abort = CONTEXT.RawValue(
+        "b",
+        0,
+    )
+    return Pool(
+        executor=ProcessPoolExecutor(
+            max_workers=config.root_split_processes,
+            mp_context=CONTEXT,
+            initializer=init,
+            initargs=(
+                config,
+                abort,
+            ),
+        ),
+        abort=abort,
+    )
+
+
+def shutdown(
+    pool: Pool,
+) -> None:
+    pool.executor.shutdown(cancel_futures=True)
+
+
+def init(
+    config: Config,
+    abort: Any,
+) -> None:
+    global CONFIG
+    global ABORT
+    CONFIG = config
+    ABORT = abort
+
+
+def search_move(
+    config: Config,
+    b: Board,
+    move: Move,
+    depth: int,
+    alpha: int,
+    beta: int,
+) -> Node:
+    """Search the root move, return the node of its child with the principal variation."""
+    mb = board.to_mutable(b)
+    board.make_move(
+        mb,
+        move,
+    )
+    node = algorithms.alphabeta(
+        config=config,
+        b=mb,
+        depth=depth - 1,
+        alpha=alpha,
+        beta=beta,
+        max_depth=depth,
+    )
+    # the child is at ply 1, its line is in the pv table
+    return replace(
+        node,
+        pv=[move]
+        + pv_table.line(
+            config.context.pv_table,
+            config.context.pv_lengths,
+            1,
+        ),
+    )
+
+
+def run_task(
+    b: Board,
+    move: Move,
+    depth: int,
+    alpha: int,
+    beta: int,
+    deadline: int,
+    age: int,
+) -> Node:
+    """Search the root move in a process of the pool."""
+    # the generation of the search, for the entries stored by this process
+    CONFIG.transposition_table.age = age
+    search_context.start(
+        CONFIG.context,
+        stop=ABORT,
+        deadline=deadline,
+    )
+    return search_move(
+        CONFIG,
+        b,
+        move,
+        depth,
+        alpha,
+        beta,
+    )
+
+
+def split(
+    *,
+    config: Config,
+    pool: Pool,
+    b: Board,
+    depth: int,
+    moves: Iterable[Move],
+    alpha: int,
+    beta: int,
+    tighten: bool = True,
+) -> Generator[Node, None, None]:
+    """Search the moves in the pool and yield their nodes as they end.
+
+    With tighten, the moves that have not started yet get the bounds of the moves that ended.
+    Closing the generator abandons the searches that are still running.
+    """
+    pending = iter(moves)
+    running: set[Future] = set()
+    # with the bounds to tighten, the first move is searched alone
+    limit = 1 if tighten else config.root_split_processes
+    try:
+        while True:
+            while len(running) < limit:
+                move = next(pending, None)
+                if move is None:
+                    break
+                running.add(
+                    pool.executor.submit(
+                        run_task,
+                        b,
+                        move,
+                        depth,
+                        alpha,
+                        beta,
+                        config.context.deadline,
+                        config.transposition_table.age,
+                    )
+                )
+            if not running:
+                return
+            done, running = wait(
+                running,
+                timeout=POLL_INTERVAL,
+                return_when=FIRST_COMPLETED,
+            )
+            # raise SearchStopped if the search has to stop
+            search_context.check(config.context)
+            for future in done:
+                node = future.result()
+                if tighten:
+                    if b.turn == COLOR.WHITE:
+                        alpha = max(
+                            alpha,
+                            node.value,
+                        )
+                    else:
+                        beta = min(
+                            beta,
+                            node.value,
+                        )
+                yield node
+            limit = config.root_split_processes
+    finally:
+        abandon(
+            pool,
+            running,
+        )
+
+
+def abandon(
+    pool: Pool,
+    running: set[Future],
+) -> None:
+    """Stop the searches of the pool and wait for its processes to be free again."""
+    for future in running:
+        future.cancel()
+    pool.abort.value = 1
+    wait(running)
+    pool.abort.value = 0
+
+
+def alphabeta(
+    *,
+    config: Config,
+    pool: Pool,
+    b: Board,
+    depth: int,
+    alpha: int,
+    beta: int,
+    max_depth: int = 0,
+    children: int = 0,
+    report: algorithms.Report_fn | None = None,
+) -> Node:
+    """Search the root like algorithms.alphabeta does, with its moves split over the pool."""
+    moves = board.legal_moves(b)
+    moves = list(
+        config.move_ordering_fn(
+            b,
+            moves,
+        )
+    )
+
+    # the best move of the previous iteration is searched first
+    if config.use_transposition_table and config.use_hash_move:
+        entry = tt.probe(
+            config.transposition_table,
+            b.zobrist,
+        )
+        if entry is not None and entry[0] in moves:
+            moves.remove(entry[0])
+            moves.insert(
+                0,
+                entry[0],
+            )
+
+    best = None
+    nodes = split(
+        config=config,
+        pool=pool,
+        b=b,
+        depth=depth,
+        moves=moves,
+        alpha=alpha,
+        beta=beta,
+    )
+    for node in nodes:
+        children += node.children
+        if (
+            best is None
+            or (b.turn == COLOR.WHITE and node.value > best.value)
+            or (b.turn == COLOR.BLACK and node.value < best.value)
+        ):
+            best = Node(
+                value=node.value,
+                depth=depth,
+                pv=node.pv,
+                lower=alpha,
+                upper=beta,
+                children=children,
+            )
+            # print our intermediary result
+            if report is not None and max_depth != 0:
+                report(best)
+            # the window failed high, the other moves do not matter
+            if (b.turn == COLOR.WHITE and best.value >= beta) or (
+                b.turn == COLOR.BLACK and best.value <= alpha
+            ):
+                break
+    # abandon the moves still searched
+    nodes.close()
+
+    assert best is not None
+    if config.use_transposition_table:
+        if best.value <= alpha:
+            bound = tt.BOUND_UPPER
+        elif best.value >= beta:
+            bound = tt.BOUND_LOWER
+        else:
+            bound = tt.BOUND_EXACT
+        tt.store(
+            config.transposition_table,
+            b.zobrist,
+            best.pv[0] if config.use_hash_move else None,
+            best.value,
+            depth,
+            bound,
+        )
+
+    return Node(
+        depth=depth,
+        value=best.value,
+        pv=best.pv,
+        lower=alpha,
+        upper=beta,
+        children=children,
+    )
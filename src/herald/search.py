@@ -1,13 +1,13 @@
-import multiprocessing
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable
 
-from . import algorithms, board
+from . import algorithms, board, caches, evaluation, pv_table, root_split, search_context
+from . import transposition_table as tt
 from .board import Board
 from .configuration import Config
 from .constants import COLOR_DIRECTION, VALUE_MAX
-from .data_structures import Move, Node, to_uci
+from .data_structures import Move, Node, is_king_capture, to_uci
 
 
 @dataclass
@@ -21,6 +21,8 @@ class Search:
     pv: list[Move]
     stop_search: bool = False
     end: bool = False
+    # permill of the transposition table used
+    hashfull: int = 0
 
     def __str__(
         self,
@@ -47,6 +49,7 @@ class Search:
                 if self.time > 0
                 else ""
             )
+            + f"hashfull {self.hashfull} "
             + f"pv {to_uci(self.pv)}"
         )
 
@@ -59,43 +62,33 @@ def search(
     last_search: Search | None = None,
     silent: bool = False,
     children: int = 0,
-    transposition_table: dict | None = None,
-    hash_move_tt: dict | None = None,
-    queue: Optional[multiprocessing.Queue] = None,
-) -> tuple[Search, Config,] | None:
+    output: Callable[[str], None] = print,
+    pool: root_split.Pool | None = None,
+) -> Search | None:
+    """Search the board to the given depth, with its root moves split over the pool if any."""
     start_time = time.time_ns()
 
     def handle_search(
         search: Search | None,
-        queue: Optional[multiprocessing.Queue],
-    ):
+    ) -> Search | None:
         if search is not None:
-            print(search)
-        if queue is not None:
-            queue.put(
-                (
-                    search,
-                    config,
-                )
-            )
-        return (
-            search,
-            config,
-        )
+            output(str(search))
+        return search
 
-    if transposition_table is not None:
-        config.transposition_table = transposition_table
-    if hash_move_tt is not None:
-        config.hash_move_tt = hash_move_tt
+    caches.resize(
+        evaluation.EVAL_CACHE,
+        config.eval_cache_size,
+    )
+    caches.resize(
+        board.CHECK_CACHE,
+        config.check_cache_size,
+    )
 
     possible_moves = board.legal_moves(b)
 
     # return None if there is no possible move
     if len(possible_moves) == 0:
-        return handle_search(
-            None,
-            queue,
-        )
+        return handle_search(None)
 
     # if there's only one move possible, return it immediately
     if len(possible_moves) == 1:
@@ -109,14 +102,11 @@ def search(
             time=(time.time_ns() - start_time),
             stop_search=True,
         )
-        return handle_search(
-            ret,
-            queue,
-        )
+        return handle_search(ret)
 
     # return immediately if there is a king capture
     for move in possible_moves:
-        if move.is_king_capture:
+        if is_king_capture(move):
             ret = Search(
                 board=b,
                 move=move,
@@ -126,10 +116,7 @@ def search(
                 score=VALUE_MAX * b.turn,
                 time=(time.time_ns() - start_time),
             )
-            return handle_search(
-                ret,
-                queue,
-            )
+            return handle_search(ret)
 
     guess = last_search.score if last_search else 0
     margin: int = 50
@@ -138,54 +125,106 @@ def search(
     iteration = 0
 
     current: Node | None = None
-    while True:
-        iteration += 1
-        for node in algorithms.alphabeta(
-            config=config,
-            b=b,
-            depth=depth,
-            pv=[],
-            gen_legal_moves=True,
-            alpha=lower,
-            beta=upper,
-            max_depth=depth if not silent else 0,
-            children=children,
-            killer_moves=set(),
-        ):
-            children = node.children + 1
-            if current is None or to_uci(current.pv) != to_uci(node.pv):
-                current = node
-                search = Search(
-                    board=b,
-                    move=node.pv[0],
-                    pv=node.pv,
-                    depth=node.depth,
-                    nodes=children,
-                    score=node.value,
-                    time=(time.time_ns() - start_time),
-                    stop_search=(COLOR_DIRECTION[b.turn] * node.value) > VALUE_MAX - 100,
+    search: Search | None = None
+
+    def report(
+        node: Node,
+    ) -> None:
+        nonlocal current
+        nonlocal search
+        if current is not None and to_uci(current.pv) == to_uci(node.pv):
+            return
+        current = node
+        pv = list(node.pv)
+        # the line stops at the cutoffs of the transposition table, which has the rest
+        if config.use_transposition_table:
+            pv = pv_table.extend(
+                config.transposition_table,
+                b,
+                pv,
+                node.depth,
+            )
+        search = Search(
+            board=b,
+            move=pv[0],
+            pv=pv,
+            depth=node.depth,
+            nodes=node.children + 1,
+            score=node.value,
+            time=(time.time_ns() - start_time),
+            stop_search=(COLOR_DIRECTION[b.turn] * node.value) > VALUE_MAX - 100,
+            hashfull=tt.hashfull(config.transposition_table),
+        )
+        output(str(search))
+
+    try:
+        while True:
+            iteration += 1
+            # the root gives its intermediate results to report as it goes
+            node = (
+                root_split.alphabeta(
+                    config=config,
+                    pool=pool,
+                    b=b,
+                    depth=depth,
+                    alpha=lower,
+                    beta=upper,
+                    max_depth=depth if not silent else 0,
+                    children=children,
+                    report=report,
                 )
-                handle_search(
-                    search,
-                    queue,
+                if pool is not None
+                else algorithms.alphabeta(
+                    config=config,
+                    b=b,
+                    depth=depth,
+                    gen_legal_moves=True,
+                    alpha=lower,
+                    beta=upper,
+                    max_depth=depth if not silent else 0,
+                    children=children,
+                    report=report,
                 )
+            )
+            children = node.children + 1
+            if node.pv:
+                report(node)
+
+            # if no best move was found
+            # this could happen because of some pruning
+            if not node.pv:
+                upper += margin * 2
+                lower -= margin * 2
+                continue
+            if node.value >= upper:
+                upper += margin * 2
+                continue
+            if node.value <= lower:
+                lower -= margin * 2
+                continue
+            break
+    except search_context.SearchStopped:
+        # the partially finished iteration gives the best root move it found so far
+        if current is None:
+            if last_search is not None:
+                return handle_search(last_search)
+            search = Search(
+                board=b,
+                move=possible_moves[0],
+                pv=[possible_moves[0]],
+                depth=0,
+                nodes=children,
+                score=0,
+                time=(time.time_ns() - start_time),
+            )
+        return handle_search(search)
 
-        # if no best move was found
-        # this could happen because of some pruning
-        if not node.pv:
-            upper += margin * 2
-            lower -= margin * 2
-            continue
-        if node.value >= upper:
-            upper += margin * 2
-            continue
-        if node.value <= lower:
-            lower -= margin * 2
-            continue
-        break
-
+    assert search is not None
     search.end = True
-    return handle_search(
-        search,
-        queue,
-    )
+    if __debug__ and not silent:
+        output(f"info string eval cache {caches.stats(evaluation.EVAL_CACHE)}")
+        output(f"info string check cache {caches.stats(board.CHECK_CACHE)}")
+        if config.context.cutoffs:
+            rate = config.context.first_move_cutoffs / config.context.cutoffs
+            output(f"info string first move cutoffs {rate:.1%}")
+    return handle_search(search)
@@ -0,0 +1,87 @@
+"""State of the running search, shared by all its nodes.
+
+The nodes reach it through Config.context instead of having it passed down the recursion.
+"""
+
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any
+
+from .history import new_countermoves, new_history, new_killers
+from .pv_table import new_lengths, new_table
+
+# number of nodes between two looks at the stop flag and the clock
+CHECK_INTERVAL: int = 256
+
+
+class SearchStopped(Exception):
+    """Unwinds the search tree once the search has to stop."""
+
+
+@dataclass
+class SearchContext:
+    # shared ctypes value that another process sets to stop the search:
+    # it holds the number of the last search to stop, a flag of 0 or 1 stops search 1
+    stop: Any = None
+    # number of the search, to tell if the stop flag is meant for it
+    search: int = 1
+    # time.time_ns() after which the search stops, 0 if there is no limit
+    deadline: int = 0
+    nodes: int = 0
+    stopped: bool = False
+    # triangular table of the principal variation (see pv_table)
+    pv_table: array = field(default_factory=new_table)
+    pv_lengths: array = field(default_factory=new_lengths)
+    # killer moves of each ply, cleared at each search
+    killers: array = field(default_factory=new_killers)
+    # butterfly history and countermoves of the quiet moves, kept from one search to the next
+    history: array = field(default_factory=new_history)
+    countermoves: array = field(default_factory=new_countermoves)
+    # beta cutoffs of the search, and the ones made by the first move tried
+    cutoffs: int = 0
+    first_move_cutoffs: int = 0
+
+
+def start(
+    context: SearchContext,
+    stop: Any = None,
+    deadline: int = 0,
+    search: int = 1,
+) -> None:
+    context.stop = stop
+    context.deadline = deadline
+    context.search = search
+    context.nodes = 0
+    context.stopped = False
+    context.cutoffs = 0
+    context.first_move_cutoffs = 0
+    context.killers[:] = new_killers()
+
+
+def count_node(
+    context: SearchContext,
+) -> None:
+    """Count a node of the search and raise SearchStopped if it has to stop."""
+    context.nodes += 1
+    if context.stopped or context.nodes % CHECK_INTERVAL == 0:
+        check(context)
+
+
+def stop_asked(
+    context: SearchContext,
+) -> bool:
+    """Whether the stop flag asks this search to stop."""
+    return context.stop is not None and context.stop.value >= context.search
+
+
+def check(
+    context: SearchContext,
+) -> None:
+    """Raise SearchStopped if the stop flag is set or the clock has run out."""
+    if stop_asked(context):
+        context.stopped = True
+    if context.deadline and time.time_ns() >= context.deadline:
+        context.stopped = True
+    if context.stopped:
+        raise SearchStopped
@@ -0,0 +1,181 @@
+"""Fixed size transposition table.
+
+https://www.chessprogramming.org/Transposition_Table
+The table is preallocated in two flat arrays of 64 bits unsigned ints:
+one holds the zobrist keys (to verify that a slot belongs to the probed position),
+the other the packed data of the entries.
+The key is stored xored with the data (https://www.chessprogramming.org/Shared_Hash_Table),
+so an entry half written by another process does not match its key and is ignored:
+the shared table needs no lock.
+Slots go by buckets of two: the first slot keeps the deepest search (depth-preferred),
+the second one takes whatever the first one refused (always-replace).
+The table lives across searches: each search is a new generation
+and the entries of the older generations give way first.
+A table can also be laid out in a shared memory block,
+for the processes of a parallel search to share it (they have to be forked to inherit it).
+"""
+
+from array import array
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+from .data_structures import Move
+
+# the bound tells how the score relates to the real value of the position
+BOUND_LOWER: int = 1
+BOUND_UPPER: int = 2
+BOUND_EXACT: int = 3
+
+# The data of an entry packs, from the least significant bits:
+# best move (29 bits, 0 if there is none), score (20 bits, offset to be positive),
+# depth (7 bits), bound (2 bits) and age (6 bits).
+# A used slot always has a bound, so empty slots are the ones with a data of 0.
+SCORE_SHIFT = 29
+SCORE_OFFSET = 1 << 19
+DEPTH_SHIFT = 49
+BOUND_SHIFT = 56
+AGE_SHIFT = 58
+AGE_MASK = 0x3F
+
+# size in bytes of one slot (key and data)
+ENTRY_SIZE: int = 16
+
+# megabytes of the table when nothing else is configured
+DEFAULT_SIZE: float = 12
+
+# number of slots sampled to compute hashfull
+HASHFULL_SAMPLE: int = 1000
+
+
+@dataclass
+class TranspositionTable:
+    # arrays, or memoryviews of the shared memory block, of 64 bits unsigned ints
+    keys: array | memoryview
+    data: array | memoryview
+    # buckets are indexed by the low bits of the zobrist key
+    mask: int
+    age: int = 0
+    shared_memory: SharedMemory | None = None
+
+
+def new(
+    megabytes: float,
+    shared: bool = False,
+) -> TranspositionTable:
+    # the number of buckets is rounded down to a power of two to index with a mask
+    buckets = max(1, int(megabytes * 1024 * 1024) // (2 * ENTRY_SIZE))
+    buckets = 1 << (buckets.bit_length() - 1)
+    if not shared:
+        return TranspositionTable(
+            keys=array("Q", bytes(16 * buckets)),
+            data=array("Q", bytes(16 * buckets)),
+            mask=buckets - 1,
+        )
+    # a new shared memory block is filled with zeros
+    shared_memory = SharedMemory(
+        create=True,
+        size=32 * buckets,
+    )
+    # the buffer is only None once the block is closed
+    assert shared_memory.buf is not None
+    return TranspositionTable(
+        keys=shared_memory.buf[: 16 * buckets].cast("Q"),
+        data=shared_memory.buf[16 * buckets :].cast("Q"),
+        mask=buckets - 1,
+        shared_memory=shared_memory,
+    )
+
+
+def release(
+    tt: TranspositionTable,
+) -> None:
+    """Free the shared memory block of the table, if it has one."""
+    if tt.shared_memory is not None:
+        assert isinstance(tt.keys, memoryview) and isinstance(tt.data, memoryview)
+        tt.keys.release()
+        tt.data.release()
+        tt.shared_memory.close()
+        tt.shared_memory.unlink()
+        tt.shared_memory = None
+
+
+def probe(
+    tt: TranspositionTable,
+    key: int,
+) -> tuple[Move, int, int, int] | None:
+    """Return the (move, score, depth, bound) stored for the position, if any."""
+    index = (key & tt.mask) << 1
+    data = tt.data[index]
+    if tt.keys[index] ^ data != key:
+        data = tt.data[index + 1]
+        if tt.keys[index + 1] ^ data != key:
+            return None
+    if data == 0:
+        return None
+    return (
+        data & 0x1FFFFFFF,
+        (data >> SCORE_SHIFT & 0xFFFFF) - SCORE_OFFSET,
+        data >> DEPTH_SHIFT & 0x7F,
+        data >> BOUND_SHIFT & 0x3,
+    )
+
+
+def store(
+    tt: TranspositionTable,
+    key: int,
+    move: Move | None,
+    score: int,
+    depth: int,
+    bound: int,
+) -> None:
+    index = (key & tt.mask) << 1
+    keys = tt.keys
+    data = tt.data
+    previous = data[index]
+    # the depth-preferred slot only gives way to a search at least as deep
+    # or to any search once its entry is from an older generation
+    if (
+        keys[index] ^ previous != key
+        and previous != 0
+        and previous >> AGE_SHIFT == tt.age
+        and depth < previous >> DEPTH_SHIFT & 0x7F
+    ):
+        index += 1
+        previous = data[index]
+    # keep the best move of the position if the new search did not find one
+    if not move and keys[index] ^ previous == key:
+        move = previous & 0x1FFFFFFF
+    entry = (
+        (move or 0)
+        | (score + SCORE_OFFSET) << SCORE_SHIFT
+        | min(depth, 0x7F) << DEPTH_SHIFT
+        | bound << BOUND_SHIFT
+        | tt.age << AGE_SHIFT
+    )
+    data[index] = entry
+    keys[index] = key ^ entry
+
+
+def new_generation(
+    tt: TranspositionTable,
+) -> None:
+    tt.age = (tt.age + 1) & AGE_MASK
+
+
+def clear(
+    tt: TranspositionTable,
+) -> None:
+    # in place, the memory may be shared
+    zeros = array("Q", bytes(8 * len(tt.keys)))
+    tt.keys[:] = zeros
+    tt.data[:] = zeros
+    tt.age = 0
+
+
+def hashfull(
+    tt: TranspositionTable,
+) -> int:
+    """Permill of the sampled slots used by the current generation."""
+    sample = tt.data[:HASHFULL_SAMPLE]
+    used = sum(1 for data in sample if data != 0 and data >> AGE_SHIFT == tt.age)
+    return used * 1000 // len(sample)
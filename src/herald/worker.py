@@ -0,0 +1,255 @@
+"""Long-lived search process.
+
+The UCI loop starts the worker once and drives it over a pipe with small command tuples.
+The worker keeps the transposition table, the caches and the last search between commands,
+and sends back the lines to print.
+The stop flag lives in shared memory, the running search reads it without any message.
+It holds the number of the last search asked to stop, so that nobody has to reset it:
+a stop sent before a "go" or a "lines" cannot reach that search, and a stop sent after it is never lost.
+
+With config.threads > 1, the search is a lazy SMP one: every worker searches the same root
+and they share the transposition table, in a shared memory block.
+Each helper starts its iterations at a depth offset of its own (up to LAZY_SMP_DEPTHS - 1)
+and tries the root moves in its own order, so that no helper repeats the search
+of another one. The helpers only fill the table, the main worker reports the best move.
+
+With config.root_split_processes > 0, the main worker splits the moves of the root
+over a pool of processes of its own (see root_split).
+"""
+
+import multiprocessing
+from dataclasses import dataclass, replace
+from multiprocessing.connection import Connection
+from typing import Any, Iterable
+
+from . import board, caches, evaluation, root_split, search_context
+from . import transposition_table as tt
+from .configuration import Config
+from .constants import VALUE_MAX
+from .data_structures import Node, to_uci
+from .iterative_deepening import itdep
+from .search import Search
+
+
+@dataclass
+class Worker:
+    process: multiprocessing.context.ForkProcess
+    connection: Connection
+    # shared ctypes int, set to the number of the last search to stop
+    stop: Any
+    # number of searches sent to the worker
+    searches: int = 0
+
+
+# the workers are forked to inherit the shared memory of the transposition table
+CONTEXT = multiprocessing.get_context("fork")
+
+# number of depth offsets the lazy SMP helpers are spread over
+LAZY_SMP_DEPTHS: int = 4
+
+
+def start(
+    config: Config,
+    helper: int = 0,
+) -> Worker:
+    """Start a worker, the main one if helper is 0, a silent lazy SMP helper otherwise."""
+    connection, worker_connection = CONTEXT.Pipe()
+    stop = CONTEXT.RawValue(
+        "i",
+        0,
+    )
+    process = CONTEXT.Process(
+        target=run,
+        args=(
+            worker_connection,
+            stop,
+            config,
+            helper,
+        ),
+        # a daemonic process cannot start the processes of the root splitting pool
+        daemon=helper > 0 or config.root_split_processes == 0,
+    )
+    process.start()
+    # the worker end only lives in the worker, so that its exit closes the pipe
+    worker_connection.close()
+    return Worker(
+        process=process,
+        connection=connection,
+        stop=stop,
+    )
+
+
+def start_pool(
+    config: Config,
+) -> list[Worker]:
+    """Start the main worker followed by its config.threads - 1 helpers."""
+    return [
+        start(
+            config,
+            helper,
+        )
+        for helper in range(config.threads)
+    ]
+
+
+def send(
+    worker: Worker,
+    *command: Any,
+) -> None:
+    # the worker numbers its searches the same way
+    if command[0] in ("go", "lines"):
+        worker.searches += 1
+    worker.connection.send(command)
+
+
+def stop(
+    worker: Worker,
+) -> None:
+    worker.stop.value = worker.searches
+
+
+def shutdown(
+    worker: Worker,
+) -> None:
+    stop(worker)
+    send(
+        worker,
+        "quit",
+    )
+    worker.process.join()
+
+
+def run(
+    connection: Connection,
+    stop_flag: Any,
+    config: Config,
+    helper: int = 0,
+) -> None:
+    last_search: Search | None = None
+    pool: root_split.Pool | None = None
+    # number of the running search, the stop flag holds the last one to stop
+    searches = 0
+    config = replace(
+        config,
+        helper=helper,
+    )
+    if config.transposition_table.shared_memory is None:
+        # a table of its own, allocated after the fork (see configuration.set_hash_size)
+        config.transposition_table = tt.new(config.hash_size * 3 / 4)
+    if config.root_split_processes > 0 and not helper:
+        pool = root_split.new_pool(config)
+
+    def output(
+        line: str,
+    ) -> None:
+        # only the main worker talks
+        if not helper:
+            connection.send(line)
+
+    while True:
+        try:
+            command = connection.recv()
+        except EOFError:
+            command = ("quit",)
+
+        if command[0] == "quit":
+            if pool is not None:
+                root_split.shutdown(pool)
+            return
+
+        if command[0] == "go":
+            (
+                _,
+                b,
+                movetime,
+                max_depth,
+            ) = command
+            searches += 1
+            search = itdep(
+                b,
+                config,
+                movetime=movetime,
+                max_depth=max_depth,
+                last_search=last_search,
+                stop=stop_flag,
+                output=output,
+                depth_offset=helper % LAZY_SMP_DEPTHS,
+                pool=pool,
+                search_number=searches,
+            )
+            if search is not None and search.end:
+                last_search = search
+
+        if command[0] == "lines":
+            (
+                _,
+                b,
+                depth,
+            ) = command
+            searches += 1
+            search_context.start(
+                config.context,
+                stop=stop_flag,
+                search=searches,
+            )
+            try:
+                for node in score_moves(
+                    config,
+                    b,
+                    depth,
+                    pool,
+                ):
+                    output(str([node.value] + [to_uci(m) for m in node.pv]))
+            except search_context.SearchStopped:
+                pass
+
+        if command[0] == "ucinewgame":
+            # the transposition table is kept, its entries will age out
+            tt.new_generation(config.transposition_table)
+            last_search = None
+
+        if command[0] == "clearsearch":
+            last_search = None
+
+        if command[0] == "lastsearch":
+            if last_search is not None:
+                output(f"LAST SEARCH: {to_uci(last_search.pv)}")
+            else:
+                output("LAST SEARCH: None")
+
+        if command[0] == "caches":
+            output(f"eval cache: {caches.stats(evaluation.EVAL_CACHE)}")
+            output(f"check cache: {caches.stats(board.CHECK_CACHE)}")
+            output(f"hashfull: {tt.hashfull(config.transposition_table)}")
+
+
+def score_moves(
+    config: Config,
+    b: board.Board,
+    depth: int,
+    pool: root_split.Pool | None,
+) -> Iterable[Node]:
+    """Search every root move with the full window, to get their exact scores."""
+    moves = board.legal_moves(b)
+    if pool is not None:
+        # in the order their searches end
+        yield from root_split.split(
+            config=config,
+            pool=pool,
+            b=b,
+            depth=depth,
+            moves=moves,
+            alpha=-VALUE_MAX,
+            beta=VALUE_MAX,
+            tighten=False,
+        )
+        return
+    for move in moves:
+        yield root_split.search_move(
+            config,
+            b,
+            move,
+            depth,
+            -VALUE_MAX,
+            VALUE_MAX,
+        )
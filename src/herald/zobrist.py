@@ -0,0 +1,48 @@
+"""Zobrist keys.
+
+https://www.chessprogramming.org/Zobrist_Hashing
+The keys are drawn from a seeded generator so that every process
+(and every run) computes the same hash for the same position.
+"""
+
+from random import Random
+
+from .constants import COLOR, PIECE
+
+_generator = Random(0x6865726C64)
+
+# indexed by [piece][square] where piece is PIECE + 6 * COLOR
+PIECES: tuple[tuple[int, ...], ...] = tuple(
+    tuple(0 if piece == PIECE.EMPTY else _generator.getrandbits(64) for _ in range(120))
+    for piece in range(13)
+)
+
+# xored in when black is to move
+TURN: int = _generator.getrandbits(64)
+
+# indexed by 2 * COLOR + CASTLE, like Board.castling_rights
+CASTLING: tuple[int, ...] = tuple(_generator.getrandbits(64) for _ in range(4))
+
+# indexed by the en passant square (mailbox index)
+EN_PASSANT: tuple[int, ...] = tuple(_generator.getrandbits(64) for _ in range(120))
+
+
+def compute_hash(
+    squares: tuple[int, ...],
+    turn: COLOR,
+    castling_rights: tuple[int, ...],
+    en_passant: int,
+) -> int:
+    """Compute the zobrist key of a position from scratch."""
+    key = 0
+    for square, piece in enumerate(squares):
+        if piece != PIECE.INVALID:
+            key ^= PIECES[piece][square]
+    if turn == COLOR.BLACK:
+        key ^= TURN
+    for i, right in enumerate(castling_rights):
+        if right == 1:
+            key ^= CASTLING[i]
+    if en_passant != -1:
+        key ^= EN_PASSANT[en_passant]
+    return key
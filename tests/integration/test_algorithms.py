@@ -35,7 +35,6 @@ def test_fast_ordering(fen, depth):
         ),
         b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
@@ -49,13 +48,12 @@ def test_fast_ordering(fen, depth):
         ),
         b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
     )
-    n1 = max(r1, key=lambda x: x.value)
-    n2 = max(r2, key=lambda x: x.value)
+    n1 = r1
+    n2 = r2
     assert n1.value == n2.value
     # The fast ordering function can return different moves as long
     # as their value is the same. That means that we cannot test the pv equivalence
@@ -65,6 +63,44 @@ def test_fast_ordering(fen, depth):
     # )
 
 
+# This test equivalence between raw alphabeta
+# and alphabeta with staged move generation
+@pytest.mark.parametrize("fen", fens[:25])
+@pytest.mark.parametrize("depth", (1, 2, 3))
+def test_staged_move_generation(fen, depth):
+    r1 = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.no_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=False,
+        ),
+        b=board.from_fen(fen),
+        depth=depth,
+        gen_legal_moves=False,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    r2 = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.no_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=False,
+            use_killer_moves=True,
+            use_staged_move_generation=True,
+        ),
+        b=board.from_fen(fen),
+        depth=depth,
+        gen_legal_moves=False,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    n1 = r1
+    n2 = r2
+    assert n1.value == n2.value
+
+
 # This test equivalence between raw alphabeta and minimax
 @pytest.mark.parametrize("fen", fens[:25])
 @pytest.mark.parametrize("depth", (1, 2, 3))
@@ -78,7 +114,6 @@ def test_alphabeta(fen, depth):
         ),
         board.from_fen(fen),
         depth,
-        [],
         False,
     )
     r2 = alphabeta(
@@ -90,13 +125,50 @@ def test_alphabeta(fen, depth):
         ),
         b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
     )
     n1 = r1
-    n2 = max(r2, key=lambda x: x.value)
+    n2 = r2
+    assert n1.value == n2.value
+    assert (
+        f"{fen}: {','.join([to_uci(x) for x in n1.pv])}"
+        == f"{fen}: {','.join([to_uci(x) for x in n2.pv])}"
+    )
+
+
+# This test equivalence between principal variation search and minimax
+@pytest.mark.parametrize("fen", fens[:25])
+@pytest.mark.parametrize("depth", (1, 2, 3))
+def test_principal_variation_search(fen, depth):
+    r1 = minimax(
+        Config(
+            alg_fn=minimax,
+            move_ordering_fn=move_ordering.no_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=False,
+        ),
+        board.from_fen(fen),
+        depth,
+        False,
+    )
+    r2 = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.no_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=False,
+            use_principal_variation_search=True,
+        ),
+        b=board.from_fen(fen),
+        depth=depth,
+        gen_legal_moves=False,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    n1 = r1
+    n2 = r2
     assert n1.value == n2.value
     assert (
         f"{fen}: {','.join([to_uci(x) for x in n1.pv])}"
@@ -118,7 +190,6 @@ def test_hash_move(fen, depth):
         ),
         b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
@@ -134,15 +205,79 @@ def test_hash_move(fen, depth):
         ),
         b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
     )
-    n1 = max(r1, key=lambda x: x.value)
-    n2 = max(r2, key=lambda x: x.value)
+    n1 = r1
+    n2 = r2
     assert n1.value == n2.value
     assert (
         f"{fen}: {','.join([to_uci(x) for x in n1.pv])}"
         == f"{fen}: {','.join([to_uci(x) for x in n2.pv])}"
     )
+
+
+# The internal iterative deepening only changes the order of the moves
+@pytest.mark.parametrize("fen", fens[1:6])
+def test_internal_iterative_deepening(fen):
+    r1 = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.fast_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=True,
+            use_hash_move=True,
+        ),
+        b=board.from_fen(fen),
+        depth=5,
+        gen_legal_moves=False,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    r2 = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.fast_ordering,
+            quiescence_fn=quiescence.quiescence,
+            use_transposition_table=True,
+            use_hash_move=True,
+            use_internal_iterative_deepening=True,
+        ),
+        b=board.from_fen(fen),
+        depth=5,
+        gen_legal_moves=False,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    assert r1.value == r2.value
+
+
+# The null move pruning keeps the best moves of zugzwang positions (from tests/epd/zugzwang.epd)
+@pytest.mark.parametrize(
+    "fen, best_move",
+    [
+        ("4B3/8/p7/k2N4/7p/K6p/PP5P/2q5 w - - 0 0", "e8a4"),
+        ("4KBkr/7p/6PP/4P3/8/3P1p2/8/8 w - - 0 0", "g6g7"),
+        ("8/5p2/4b1p1/7R/5K1P/2r3B1/7N/4b1k1 w - - 0 0", "h2f3"),
+        ("8/p5pq/8/p2N3p/k2P3P/8/KP3PB1/8 w - - 0 0", "g2e4"),
+        ("8/p7/1p6/p7/kq1Q4/8/K7/8 w - - 0 0", "d4d3"),
+    ],
+)
+def test_null_move_zugzwang(fen, best_move):
+    result = alphabeta(
+        config=Config(
+            alg_fn=algorithms.alphabeta,
+            move_ordering_fn=move_ordering.fast_ordering,
+            quiescence_depth=9,
+            quiescence_fn=quiescence.quiescence,
+            quiescence_search=True,
+            use_transposition_table=True,
+            use_hash_move=True,
+            use_null_move_pruning=True,
+        ),
+        b=board.from_fen(fen),
+        depth=4,
+        gen_legal_moves=True,
+    )
+    assert to_uci(result.pv[0]) == best_move
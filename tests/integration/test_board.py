@@ -4,18 +4,17 @@ We test our move generation using the perft algorithm
 """
 
 import pytest
-from herald import board
-from herald.board import Board
+from herald import bitboard, board
 
 
-def perft(b: Board, depth: int):
+def perft(b, depth: int, backend=board):
     if depth == 1:
-        return len(list(board.legal_moves(b)))
+        return len(list(backend.legal_moves(b)))
 
     nodes = 0
-    for move in board.legal_moves(b):
-        curr_board = board.push(b, move)
-        nodes += perft(curr_board, depth - 1)
+    for move in backend.legal_moves(b):
+        curr_board = backend.push(b, move)
+        nodes += perft(curr_board, depth - 1, backend)
 
     return nodes
 
@@ -34,8 +33,9 @@ def perft(b: Board, depth: int):
         ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", 3, 89890),
     ],
 )
-def test_perft(fen, depth, expected):
-    nodes = perft(board.from_fen(fen), depth)
+@pytest.mark.parametrize("backend", (board, bitboard))
+def test_perft(fen, depth, expected, backend):
+    nodes = perft(backend.from_fen(fen), depth, backend)
     assert nodes == expected
 
 
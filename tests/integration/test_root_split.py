@@ -0,0 +1,142 @@
+"""Test the search with the root moves split over a pool of processes."""
+
+import multiprocessing
+
+import pytest
+from herald import algorithms, board, move_ordering, quiescence, root_split, search_context
+from herald import transposition_table as tt
+from herald.configuration import Config, set_hash_size
+from herald.constants import VALUE_MAX
+
+fens = []
+with open("tests/epd/wac.epd", "r") as wacfile:
+    for line in wacfile:
+        epd = line.split()
+        fens.append(" ".join(epd[:4]) + " 0 0")
+
+
+@pytest.fixture(scope="module")
+def pool_config():
+    config = Config(
+        alg_fn=algorithms.alphabeta,
+        move_ordering_fn=move_ordering.fast_ordering,
+        quiescence_fn=quiescence.quiescence,
+        quiescence_search=True,
+        quiescence_depth=9,
+        root_split_processes=2,
+    )
+    pool = root_split.new_pool(config)
+    yield config, pool
+    root_split.shutdown(pool)
+
+
+# This test equivalence between the root split search and the sequential one
+@pytest.mark.parametrize("fen", fens[:10])
+@pytest.mark.parametrize("depth", (2, 3))
+def test_root_split_equivalence(pool_config, fen, depth):
+    config, pool = pool_config
+    b = board.from_fen(fen)
+    search_context.start(config.context)
+    node = algorithms.alphabeta(
+        config=config,
+        b=b,
+        depth=depth,
+        gen_legal_moves=True,
+    )
+    split_node = root_split.alphabeta(
+        config=config,
+        pool=pool,
+        b=b,
+        depth=depth,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    assert split_node.value == node.value
+    assert split_node.children > 0
+
+
+def test_exact_scores(pool_config):
+    config, pool = pool_config
+    b = board.from_fen(fens[0])
+    search_context.start(config.context)
+    moves = board.legal_moves(b)
+    scores = {
+        node.pv[0]: node.value
+        for node in root_split.split(
+            config=config,
+            pool=pool,
+            b=b,
+            depth=2,
+            moves=moves,
+            alpha=-VALUE_MAX,
+            beta=VALUE_MAX,
+            tighten=False,
+        )
+    }
+    assert scores == {
+        move: root_split.search_move(config, b, move, 2, -VALUE_MAX, VALUE_MAX).value
+        for move in moves
+    }
+
+
+def test_stop(pool_config):
+    config, pool = pool_config
+    stop = multiprocessing.RawValue("b", 1)
+    search_context.start(config.context, stop=stop)
+    # the stop flag of the search abandons the searches of the pool
+    with pytest.raises(search_context.SearchStopped):
+        root_split.alphabeta(
+            config=config,
+            pool=pool,
+            b=board.from_fen(fens[0]),
+            depth=8,
+            alpha=-VALUE_MAX,
+            beta=VALUE_MAX,
+        )
+    assert pool.abort.value == 0
+    # and the pool is free for the next search
+    search_context.start(config.context)
+    node = root_split.alphabeta(
+        config=config,
+        pool=pool,
+        b=board.from_fen(fens[0]),
+        depth=1,
+        alpha=-VALUE_MAX,
+        beta=VALUE_MAX,
+    )
+    assert node.pv
+
+
+def test_table_age():
+    config = Config(
+        alg_fn=algorithms.alphabeta,
+        move_ordering_fn=move_ordering.fast_ordering,
+        quiescence_fn=quiescence.quiescence,
+        quiescence_search=True,
+        quiescence_depth=9,
+        use_transposition_table=True,
+        root_split_processes=2,
+    )
+    # the table is shared with the pool
+    set_hash_size(config, 1)
+    pool = root_split.new_pool(config)
+    b = board.from_fen(fens[0])
+    for search in range(2):
+        if search:
+            # a new search, once the processes of the pool are forked
+            tt.clear(config.transposition_table)
+            tt.new_generation(config.transposition_table)
+        search_context.start(config.context)
+        root_split.alphabeta(
+            config=config,
+            pool=pool,
+            b=b,
+            depth=3,
+            alpha=-VALUE_MAX,
+            beta=VALUE_MAX,
+        )
+    # the processes of the pool store their entries with the age of the search
+    ages = {data >> tt.AGE_SHIFT & tt.AGE_MASK for data in config.transposition_table.data if data}
+    assert ages == {config.transposition_table.age}
+    root_split.shutdown(pool)
+    tt.release(config.transposition_table)
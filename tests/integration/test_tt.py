@@ -1,9 +1,14 @@
 """Test transposition table."""
 
+import multiprocessing
+import random
+
 import pytest
 from herald import algorithms, board, move_ordering, quiescence
+from herald import transposition_table as tt
 from herald.configuration import Config
-from herald.constants import VALUE_MAX, COLOR
+from herald.constants import PIECE, VALUE_MAX
+from herald.evaluation import PIECE_VALUE
 
 fens = []
 with open("tests/epd/transposition_table.epd", "r") as tt_file:
@@ -12,53 +17,93 @@ with open("tests/epd/transposition_table.epd", "r") as tt_file:
         fens.append(" ".join(epd[:4]) + " 0 0")
 
 
-# This test equivalence between w/ and w/o tt
-@pytest.mark.parametrize("fen", fens)
-@pytest.mark.parametrize("depth", (3, 4, 5, 6))
-@pytest.mark.parametrize("use_qs", (True, False))
-def test_tt_equivalence(fen, depth, use_qs):
-    b = board.from_fen(fen)
-    alphabeta_result = algorithms.alphabeta(
+def search(fen, depth, use_qs, use_tt):
+    return algorithms.alphabeta(
         config=Config(
             alg_fn=algorithms.alphabeta,
             move_ordering_fn=move_ordering.fast_ordering,
             quiescence_depth=25,
             quiescence_search=use_qs,
             quiescence_fn=quiescence.quiescence,
-            use_transposition_table=False,
+            use_transposition_table=use_tt,
         ),
-        b=b,
+        b=board.from_fen(fen),
         depth=depth,
-        pv=[],
         gen_legal_moves=False,
         alpha=-VALUE_MAX,
         beta=VALUE_MAX,
     )
-    alphabeta_tt_result = algorithms.alphabeta(
-        config=Config(
-            alg_fn=algorithms.alphabeta,
-            move_ordering_fn=move_ordering.fast_ordering,
-            quiescence_depth=25,
-            quiescence_search=use_qs,
-            quiescence_fn=quiescence.quiescence,
-            use_transposition_table=True,
-        ),
-        b=b,
-        depth=depth,
-        pv=[],
-        gen_legal_moves=False,
-        alpha=-VALUE_MAX,
-        beta=VALUE_MAX,
-    )
-    if b.turn == COLOR.WHITE:
-        node1 = max(alphabeta_tt_result, key=lambda x: x.value)
-        node2 = max(alphabeta_result, key=lambda x: x.value)
-        # We cannot be sure that exactly the same line will be selected
-        # Only the it will be equivalent in value
-        assert node1.value == node2.value, f"{node1.value}, {node2.value}"
-    else:
-        node1 = min(alphabeta_tt_result, key=lambda x: x.value)
-        node2 = min(alphabeta_result, key=lambda x: x.value)
-        # We cannot be sure that exactly the same line will be selected
-        # Only the it will be equivalent in value
-        assert node1.value == node2.value, f"{node1.value}, {node2.value}"
+
+
+# This test equivalence between w/ and w/o tt
+# within 3 plies, a position cannot be met again with less depth left,
+# so every cutoff is on an entry of the same depth
+@pytest.mark.parametrize("fen", fens)
+@pytest.mark.parametrize("use_qs", (True, False))
+def test_tt_equivalence(fen, use_qs):
+    alphabeta_result = search(fen, 3, use_qs, False)
+    alphabeta_tt_result = search(fen, 3, use_qs, True)
+    # We cannot be sure that exactly the same line will be selected
+    # Only the it will be equivalent in value
+    assert (
+        alphabeta_tt_result.value == alphabeta_result.value
+    ), f"{alphabeta_tt_result.value}, {alphabeta_result.value}"
+
+
+# This test closeness between w/ and w/o tt
+# the cutoffs on deeper entries give the values of deeper searches,
+# they can move the value of the root by less than a pawn
+@pytest.mark.parametrize("fen", fens)
+@pytest.mark.parametrize("depth", (4, 5, 6))
+@pytest.mark.parametrize("use_qs", (True, False))
+def test_tt_deeper_cutoffs(fen, depth, use_qs):
+    alphabeta_result = search(fen, depth, use_qs, False)
+    alphabeta_tt_result = search(fen, depth, use_qs, True)
+    assert (
+        abs(alphabeta_tt_result.value - alphabeta_result.value) < PIECE_VALUE[PIECE.PAWN]
+    ), f"{alphabeta_tt_result.value}, {alphabeta_result.value}"
+
+
+def hammer_table(table, seed, errors):
+    generator = random.Random(seed)
+    keys = [generator.getrandbits(64) for _ in range(300)]
+    for _ in range(20000):
+        key = generator.choice(keys)
+        if generator.random() < 0.5:
+            tt.store(
+                table,
+                key,
+                key & 0x1FFFFFFF | 1,
+                key % 20001 - 10000,
+                key % 60 + 1,
+                key % 3 + 1,
+            )
+            continue
+        entry = tt.probe(table, key)
+        # a hit must be the entry stored for the key, never a mix of two writes
+        if entry is not None and entry != (
+            key & 0x1FFFFFFF | 1,
+            key % 20001 - 10000,
+            key % 60 + 1,
+            key % 3 + 1,
+        ):
+            errors.value += 1
+
+
+# This test hammers a shared table from several processes at once
+def test_shared_tt_stress():
+    # a tiny table, for the processes to fight over the same slots
+    table = tt.new(0.001, shared=True)
+    context = multiprocessing.get_context("fork")
+    errors = context.RawValue("i", 0)
+    processes = [
+        context.Process(target=hammer_table, args=(table, seed, errors)) for seed in range(8)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert errors.value == 0
+    assert any(table.data)
+    tt.release(table)
@@ -0,0 +1,136 @@
+"""Test the long-lived search process."""
+
+import time
+
+from herald import algorithms, board, move_ordering, quiescence, worker
+from herald import transposition_table as tt
+from herald.configuration import Config, set_hash_size
+
+FEN = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+
+
+def read_until_bestmove(w: worker.Worker) -> list[str]:
+    lines = []
+    while not lines or not lines[-1].startswith("bestmove"):
+        assert w.connection.poll(30)
+        lines.append(w.connection.recv())
+    return lines
+
+
+def make_config(threads: int, root_split_processes: int = 0) -> Config:
+    config = Config(
+        alg_fn=algorithms.alphabeta,
+        move_ordering_fn=move_ordering.fast_ordering,
+        quiescence_fn=quiescence.quiescence,
+        quiescence_search=True,
+        quiescence_depth=9,
+        use_transposition_table=True,
+        use_hash_move=True,
+        use_saved_search=True,
+        threads=threads,
+        root_split_processes=root_split_processes,
+    )
+    # a small table for the hashfull to show
+    set_hash_size(config, 1)
+    return config
+
+
+def test_worker():
+    config = make_config(1)
+    # a single worker allocates its table once forked
+    assert config.transposition_table.mask == 0
+    w = worker.start(config)
+    b = board.from_fen(FEN)
+    worker.send(w, "go", b, 0, 3)
+    lines = read_until_bestmove(w)
+    assert any(line.startswith("info depth 3 ") for line in lines)
+
+    # the worker remembers the last search
+    worker.send(w, "lastsearch")
+    assert w.connection.recv().startswith("LAST SEARCH: ")
+
+    # and keeps its table
+    worker.send(w, "caches")
+    assert w.connection.recv().startswith("eval cache: ")
+    assert w.connection.recv().startswith("check cache: ")
+    assert w.connection.recv() != "hashfull: 0"
+
+    # a search that was asked to stop beforehand ends after its first iteration
+    worker.send(w, "go", b, 100, 10)
+    worker.stop(w)
+    lines = read_until_bestmove(w)
+    assert not any(line.startswith("info depth 2 ") for line in lines)
+
+    # the stop flag interrupts the search right away, with the best move found so far
+    worker.send(w, "clearsearch")
+    worker.send(w, "go", b, 0, 10)
+    time.sleep(1)
+    stop_time = time.perf_counter()
+    worker.stop(w)
+    lines = read_until_bestmove(w)
+    assert time.perf_counter() - stop_time < 1
+    assert lines[-1] != "bestmove nomove"
+
+    worker.shutdown(w)
+    assert not w.process.is_alive()
+
+
+def test_stop_then_go():
+    w = worker.start(make_config(1))
+    b = board.from_fen(FEN)
+    worker.send(w, "go", b, 0, 10)
+    time.sleep(1)
+    # the stop is for the running search, the next one is sent right after it
+    worker.stop(w)
+    worker.send(w, "go", b, 0, 3)
+    read_until_bestmove(w)
+    lines = read_until_bestmove(w)
+    assert any(line.startswith("info depth 3 ") for line in lines)
+    worker.shutdown(w)
+
+
+def test_stop_then_lines():
+    w = worker.start(make_config(1))
+    b = board.from_fen(FEN)
+    worker.send(w, "go", b, 0, 3)
+    read_until_bestmove(w)
+    worker.stop(w)
+    # the stop was for the search before, every root move gets its line
+    worker.send(w, "lines", b, 2)
+    scores = [w.connection.recv() for _ in board.legal_moves(b)]
+    assert all(line.startswith("[") for line in scores)
+    worker.shutdown(w)
+
+
+def test_lazy_smp():
+    config = make_config(2)
+    assert config.transposition_table.shared_memory is not None
+    workers = worker.start_pool(config)
+    b = board.from_fen(FEN)
+    for w in workers:
+        worker.send(w, "go", b, 0, 3)
+    lines = read_until_bestmove(workers[0])
+    assert any(line.startswith("info depth 3 ") for line in lines)
+    # only the main worker talks
+    assert not workers[1].connection.poll(0)
+    for w in workers:
+        worker.shutdown(w)
+    # the workers wrote in the table of this process
+    assert any(config.transposition_table.data)
+    tt.release(config.transposition_table)
+
+
+def test_root_split():
+    w = worker.start(make_config(1, root_split_processes=2))
+    # the worker needs children of its own for the pool
+    assert not w.process.daemon
+    b = board.from_fen(FEN)
+    worker.send(w, "go", b, 0, 3)
+    lines = read_until_bestmove(w)
+    assert any(line.startswith("info depth 3 ") for line in lines)
+    # one line per legal move, with its score
+    worker.send(w, "lines", b, 2)
+    scores = [w.connection.recv() for _ in board.legal_moves(b)]
+    assert all(line.startswith("[") for line in scores)
+    worker.shutdown(w)
+    assert not w.process.is_alive()
@@ -0,0 +1,45 @@
+import pytest
+from herald import attack_tables
+from herald.constants import COLOR
+from herald.data_structures import to_square_notation
+
+
+@pytest.mark.parametrize(
+    "square, knight, king, bishop, rook",
+    [
+        ("a1", {"b3", "c2"}, {"a2", "b1", "b2"}, 7, 14),
+        ("h8", {"g6", "f7"}, {"g8", "g7", "h7"}, 7, 14),
+        (
+            "d4",
+            {"c2", "e2", "b3", "f3", "b5", "f5", "c6", "e6"},
+            {"c3", "d3", "e3", "c4", "e4", "c5", "d5", "e5"},
+            13,
+            14,
+        ),
+    ],
+)
+def test_attack_tables(square: str, knight, king, bishop: int, rook: int):
+    s = to_square_notation(square)
+    assert set(attack_tables.KNIGHT_TARGETS[s]) == {to_square_notation(x) for x in knight}
+    assert set(attack_tables.KING_TARGETS[s]) == {to_square_notation(x) for x in king}
+    assert sum(len(ray) for ray in attack_tables.BISHOP_RAYS[s]) == bishop
+    assert sum(len(ray) for ray in attack_tables.ROOK_RAYS[s]) == rook
+    assert len(attack_tables.QUEEN_RAYS[s]) == len(attack_tables.BISHOP_RAYS[s]) + len(
+        attack_tables.ROOK_RAYS[s]
+    )
+
+
+def test_pawn_tables():
+    e4 = to_square_notation("e4")
+    assert {to_square_notation(x) for x in ("d5", "f5")} == set(
+        attack_tables.PAWN_TARGETS[COLOR.WHITE][e4]
+    )
+    assert {to_square_notation(x) for x in ("d3", "f3")} == set(
+        attack_tables.PAWN_TARGETS[COLOR.BLACK][e4]
+    )
+    assert {to_square_notation(x) for x in ("d3", "f3")} == set(
+        attack_tables.PAWN_SOURCES[COLOR.WHITE][e4]
+    )
+    assert attack_tables.PAWN_TARGETS[COLOR.WHITE][to_square_notation("a2")] == (
+        to_square_notation("b3"),
+    )
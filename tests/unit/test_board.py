@@ -1,5 +1,5 @@
 import pytest
-from herald import board, data_structures
+from herald import bitboard, board, data_structures, evaluation
 
 win_at_chess = ["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0"]
 
@@ -140,13 +140,132 @@ def test_push_from_fen(
             "3r1r1k/p3bPpp/2bp4/5R2/1q1Bn3/1Bp5/PPP3PP/1K1R1Q2 w - - 0 20",
             "f5g5,f5h5,f5e5,f5d5,f5c5,f5b5,f5a5,f5f4,f5f3,f5f2,f5f6,d4e3,d4f2,d4g1,d4c5,d4b6,d4a7,d4c3,d4e5,d4f6,d4g7,b3a4,b3c4,b3d5,b3e6,a2a3,a2a4,b2c3,g2g3,g2g4,h2h3,h2h4,b1c1,b1a1,d1e1,d1c1,d1d2,d1d3,f1e2,f1d3,f1c4,f1b5,f1a6,f1g1,f1h1,f1e1,f1f2,f1f3,f1f4",
         ),
+        # en passant capture uncovering the king along the rank
+        ("8/8/8/KPp4r/8/8/8/7k w - c6 0 2", "a5a4,a5a6,a5b6,b5b6"),
+        # check by a rook and a pinned pawn, the king cannot step back on the line
+        ("4k3/8/8/8/1b6/8/3P4/r3K2R w K - 0 1", "e1e2,e1f2"),
+        # double check
+        ("4k3/4r3/8/8/8/5n2/8/R3K2R w KQ - 0 1", "e1d1,e1f1,e1f2"),
     ],
 )
+@pytest.mark.parametrize("backend", (board, bitboard))
 def test_gen_moves(
     fen: str,
     uci_moves: str,
+    backend,
 ):
-    b = board.from_fen(fen)
-    legal_moves = {data_structures.to_uci(m) for m in board.legal_moves(b)}
+    b = backend.from_fen(fen)
+    legal_moves = {data_structures.to_uci(m) for m in backend.legal_moves(b)}
     expected_moves = set(uci_moves.split(","))
     assert legal_moves == expected_moves
+
+
+@pytest.mark.parametrize(
+    "fen,uci_moves",
+    [
+        # castling and en passant square
+        ("startpos", "e2e4,d7d5,g1f3,d5d4,c2c4,d4c3,f1e2,e7e5,e1g1"),
+        # en passant capture
+        ("startpos", "e2e4,a7a6,e4e5,d7d5,e5d6"),
+        # promotion with capture
+        ("8/1P4k1/8/8/8/8/6K1/r7 w - - 0 1", "b7a8"),
+        # queen side castling for black
+        ("r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1", "e8c8,h1h8"),
+    ],
+)
+def test_zobrist(
+    fen: str,
+    uci_moves: str,
+):
+    b = board.from_fen(fen)
+    for uci_move in uci_moves.split(","):
+        b = board.push(b, board.from_uci(b, uci_move))
+        assert b.zobrist == board.from_fen(board.to_fen(b)).zobrist
+
+
+@pytest.mark.parametrize(
+    "fen,uci_moves",
+    [
+        ("startpos", "e2e4,d7d5,g1f3,d5d4,c2c4,d4c3,f1e2,e7e5,e1g1"),
+        ("startpos", "e2e4,a7a6,e4e5,d7d5,e5d6"),
+        ("8/1P4k1/8/8/8/8/6K1/r7 w - - 0 1", "b7a8"),
+        ("r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1", "e8c8,h1h8"),
+    ],
+)
+def test_make_unmake_move(
+    fen: str,
+    uci_moves: str,
+):
+    b = board.from_fen(fen)
+    mb = board.to_mutable(b)
+    boards = []
+    for uci_move in uci_moves.split(","):
+        move = board.from_uci(board.to_immutable(mb), uci_move)
+        boards.append(board.to_immutable(mb))
+        board.make_move(mb, move)
+        assert board.to_immutable(mb) == board.push(boards[-1], move)
+    while boards:
+        board.unmake_move(mb)
+        assert board.to_immutable(mb) == boards.pop()
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "startpos",
+        # the en passant square is cleared by the null move
+        "rnbqkbnr/pppp1ppp/8/8/3Pp3/8/PPP1PPPP/RNBQKBNR b KQkq d3 0 2",
+        "r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1",
+    ],
+)
+def test_null_move(
+    fen: str,
+):
+    b = board.from_fen(fen)
+    mb = board.to_mutable(b)
+    board.make_null_move(mb)
+    assert mb.turn == b.invturn
+    assert mb.en_passant == -1
+    assert mb.zobrist == board.from_fen(board.to_fen(board.to_immutable(mb))).zobrist
+    board.unmake_null_move(mb)
+    assert board.to_immutable(mb) == b
+
+
+@pytest.mark.parametrize(
+    "fen,uci_moves",
+    [
+        ("startpos", "e2e4,d7d5,g1f3,d5d4,c2c4,d4c3,f1e2,e7e5,e1g1"),
+        ("startpos", "e2e4,a7a6,e4e5,d7d5,e5d6"),
+        ("8/1P4k1/8/8/8/8/6K1/r7 w - - 0 1", "b7a8"),
+        ("r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1", "e8c8,h1h8"),
+    ],
+)
+def test_piece_lists(
+    fen: str,
+    uci_moves: str,
+):
+    b = board.from_fen(fen)
+    for uci_move in uci_moves.split(","):
+        b = board.push(b, board.from_uci(b, uci_move))
+        assert b.piece_lists == board.build_piece_lists(b.squares)
+        assert b.remaining_material == evaluation.remaining_material(b.piece_lists)
+
+
+@pytest.mark.parametrize(
+    "fen, promotions",
+    [
+        ("n3k3/P1P4P/8/8/8/8/8/4K3 w - - 0 1", {"c7c8q", "h7h8q"}),
+        ("4k3/8/8/8/8/8/p6p/1N2K2B b - - 0 1", {"a2a1q"}),
+        ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", set()),
+    ],
+)
+def test_promotion_moves(fen: str, promotions: set[str]):
+    b = board.from_fen(fen)
+    moves = list(board.promotion_moves(b))
+    assert {data_structures.to_uci(m) for m in moves} == promotions
+    # they are the promotions of the pseudo legal moves that do not capture
+    assert set(moves) == {
+        m
+        for m in board.pseudo_legal_moves(b)
+        if data_structures.is_promotion(m) and not data_structures.is_capture(m)
+    }
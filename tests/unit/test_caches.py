@@ -0,0 +1,72 @@
+import pytest
+from herald import board, caches, evaluation
+
+
+def test_cache_counters():
+    cache = caches.new(6)
+    # the capacity is rounded down to a power of two
+    assert cache.mask + 1 == 4
+    assert caches.get(cache, 1) is None
+    caches.put(cache, 1, "a")
+    caches.put(cache, 2, "b")
+    assert caches.get(cache, 1) == "a"
+    assert (cache.hits, cache.misses, cache.size, cache.evictions) == (1, 1, 2, 0)
+    # 5 lands in the slot of 1 and evicts it
+    caches.put(cache, 5, "c")
+    assert caches.get(cache, 1) is None
+    assert caches.get(cache, 5) == "c"
+    assert (cache.hits, cache.misses, cache.size, cache.evictions) == (2, 2, 2, 1)
+    caches.resize(cache, 16)
+    assert cache.mask + 1 == 16
+    assert (cache.hits, cache.misses, cache.size, cache.evictions) == (0, 0, 0, 0)
+    assert caches.get(cache, 5) is None
+
+
+@pytest.mark.parametrize(
+    "megabytes, slots",
+    [
+        (2, 1 << 14),
+        (16, 1 << 17),
+        (0, 1),
+    ],
+)
+def test_capacity(megabytes: float, slots: int):
+    assert caches.capacity(megabytes) == slots
+
+
+@pytest.mark.parametrize(
+    "fen",
+    [
+        "startpos",
+        "rnbqkbnr/pppp1ppp/8/4p3/4P3/5Q2/PPPP1PPP/RNB1KBNR b KQkq - 0 1",
+        "4k3/8/8/8/8/8/8/4K2r w - - 0 1",
+    ],
+)
+def test_cached_results(fen: str):
+    b = board.from_fen(fen)
+    for _ in range(2):
+        assert evaluation.eval_board(b) == evaluation.eval_fast(
+            b.piece_lists,
+            b.remaining_material,
+        )
+        assert board.king_is_in_check(b, b.turn) == board.is_square_attacked(
+            b.squares,
+            b.king_squares[b.turn],
+            b.invturn,
+        )
+    assert caches.get(evaluation.EVAL_CACHE, b.zobrist) is not None
+
+
+def test_eval_cache_is_bounded():
+    size = evaluation.EVAL_CACHE.mask + 1
+    caches.resize(evaluation.EVAL_CACHE, 8)
+    try:
+        b = board.from_fen("startpos")
+        # more positions than slots, the cache keeps its capacity
+        for move in board.legal_moves(b):
+            evaluation.eval_board(board.push(b, move))
+        assert len(evaluation.EVAL_CACHE.keys) == 8
+        assert evaluation.EVAL_CACHE.size <= 8
+        assert evaluation.EVAL_CACHE.evictions > 0
+    finally:
+        caches.resize(evaluation.EVAL_CACHE, size)
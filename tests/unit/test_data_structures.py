@@ -0,0 +1,34 @@
+import pytest
+from herald import board, data_structures
+from herald.constants import PIECE
+
+
+@pytest.mark.parametrize(
+    "fen, uci, moving_piece, captured_piece, is_castle, en_passant",
+    [
+        ("startpos", "e2e4", PIECE.PAWN, PIECE.EMPTY, False, 75),
+        ("startpos", "g1f3", PIECE.KNIGHT, PIECE.EMPTY, False, -1),
+        ("r3k3/8/8/8/8/8/8/4K2R w K - 0 1", "e1g1", PIECE.KING, PIECE.EMPTY, True, -1),
+        ("8/1P4k1/8/8/8/8/6K1/r7 w - - 0 1", "b7a8q", PIECE.PAWN, PIECE.EMPTY, False, -1),
+        ("r6k/1P6/8/8/8/8/6K1/8 w - - 0 1", "b7a8q", PIECE.PAWN, PIECE.ROOK, False, -1),
+        ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", PIECE.PAWN, PIECE.PAWN, False, -1),
+    ],
+)
+def test_move_encoding(
+    fen: str,
+    uci: str,
+    moving_piece: PIECE,
+    captured_piece: PIECE,
+    is_castle: bool,
+    en_passant: int,
+):
+    move = board.from_uci(board.from_fen(fen), uci)
+    assert data_structures.to_uci(move) == uci
+    assert data_structures.move_start(move) == data_structures.to_square_notation(uci[:2])
+    assert data_structures.move_end(move) == data_structures.to_square_notation(uci[2:4])
+    assert data_structures.moving_piece(move) == moving_piece
+    assert data_structures.captured_piece(move) == captured_piece
+    assert data_structures.is_capture(move) == (captured_piece != PIECE.EMPTY)
+    assert data_structures.is_castle(move) == is_castle
+    assert data_structures.move_en_passant(move) == en_passant
+    assert not data_structures.is_king_capture(move)
@@ -0,0 +1,55 @@
+from herald import board, history
+from herald.constants import COLOR, MAX_PLY
+
+
+def test_history_ordering():
+    b = board.from_fen("startpos")
+    e4, d4, nf3 = (board.from_uci(b, uci) for uci in ("e2e4", "d2d4", "g1f3"))
+    table = history.new_history()
+    countermoves = history.new_countermoves()
+    history.add_cutoff(table, countermoves, COLOR.WHITE, d4, 0, 2)
+    history.add_cutoff(table, countermoves, COLOR.WHITE, nf3, 0, 3)
+    assert history.order_quiet_moves(table, countermoves, COLOR.WHITE, 0, [e4, d4, nf3]) == [
+        nf3,
+        d4,
+        e4,
+    ]
+    # the history of one side does not order the moves of the other
+    assert table[history.history_index(COLOR.BLACK, nf3)] == 0
+    # the countermove comes first, whatever its history
+    e5 = board.from_uci(board.push(b, e4), "e7e5")
+    history.add_cutoff(table, countermoves, COLOR.WHITE, e4, e5, 1)
+    assert history.countermove(countermoves, e5) == e4
+    assert history.order_quiet_moves(table, countermoves, COLOR.WHITE, e5, [d4, nf3, e4])[0] == e4
+
+
+def test_aging():
+    b = board.from_fen("startpos")
+    e4 = board.from_uci(b, "e2e4")
+    table = history.new_history()
+    countermoves = history.new_countermoves()
+    history.add_cutoff(table, countermoves, COLOR.WHITE, e4, 0, 3)
+    history.age(table)
+    assert table[history.history_index(COLOR.WHITE, e4)] == 4
+    # an entry that grows too big halves the whole table
+    table[history.history_index(COLOR.WHITE, e4)] = history.HISTORY_MAX - 1
+    history.add_cutoff(table, countermoves, COLOR.WHITE, e4, 0, 1)
+    assert table[history.history_index(COLOR.WHITE, e4)] == history.HISTORY_MAX // 2
+
+
+def test_killers():
+    b = board.from_fen("startpos")
+    e4, d4, nf3 = (board.from_uci(b, uci) for uci in ("e2e4", "d2d4", "g1f3"))
+    killers = history.new_killers()
+    history.add_killer(killers, 3, e4)
+    history.add_killer(killers, 3, d4)
+    # a killer found again keeps the other one
+    history.add_killer(killers, 3, d4)
+    assert history.killer_moves(killers, 3) == (d4, e4)
+    # the oldest killer gives way
+    history.add_killer(killers, 3, nf3)
+    assert history.killer_moves(killers, 3) == (nf3, d4)
+    assert history.killer_moves(killers, 2) == ()
+    # beyond the table, there are no killers
+    history.add_killer(killers, MAX_PLY, e4)
+    assert history.killer_moves(killers, MAX_PLY) == ()
@@ -0,0 +1,9 @@
+from herald import move_ordering
+
+
+def test_rotate():
+    # the first move stays first, the others are rotated
+    assert move_ordering.rotate([1, 2, 3, 4], 1) == [1, 3, 4, 2]
+    assert move_ordering.rotate([1, 2, 3, 4], 4) == [1, 3, 4, 2]
+    assert move_ordering.rotate([1, 2, 3, 4], 0) == [1, 2, 3, 4]
+    assert move_ordering.rotate([1, 2], 1) == [1, 2]
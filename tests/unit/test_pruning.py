@@ -19,3 +19,55 @@ from herald.constants import COLOR_DIRECTION
 def test_see(fen: str, target: int, bad_capture: bool):
     b = board.from_fen(fen)
     assert bool(pruning.see(b, target, 0) * COLOR_DIRECTION[b.turn] <= 0) == bad_capture
+
+
+@pytest.mark.parametrize(
+    "fen, can_null_move",
+    [
+        ("startpos", True),
+        # in check
+        ("rnbqkbnr/ppp2ppp/3p4/1B2p3/4P3/8/PPPP1PPP/RNBQK1NR b KQkq - 1 3", False),
+        # only the king and pawns
+        ("4k3/pppp4/8/8/8/8/3PPPPP/RNBQK3 b - - 0 1", False),
+        # too little material left
+        ("4k3/8/8/8/8/8/3PPP2/3RK3 w - - 0 1", False),
+    ],
+)
+def test_can_null_move(fen: str, can_null_move: bool):
+    assert pruning.can_null_move(board.from_fen(fen)) == can_null_move
+
+
+@pytest.mark.parametrize(
+    "fen, static_eval, futile, reverse_futile",
+    [
+        # white is to move, the window is (0, 100)
+        ("startpos", -400, True, False),
+        ("startpos", 50, False, False),
+        ("startpos", 400, False, True),
+        # black is to move, the colors are inverted
+        ("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1", 500, True, False),
+        ("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1", -300, False, True),
+    ],
+)
+def test_futility(fen: str, static_eval: int, futile: bool, reverse_futile: bool):
+    b = board.from_fen(fen)
+    assert pruning.is_futile(b, static_eval, 2, 0, 100, 165) == futile
+    assert pruning.is_reverse_futile(b, static_eval, 2, 0, 100, 120) == reverse_futile
+
+
+def test_late_move_reduction():
+    # the reduction grows with the depth and the number of the move
+    for depth in range(1, 64):
+        for index in range(1, 63):
+            assert (
+                pruning.LATE_MOVE_REDUCTIONS[depth][index]
+                <= pruning.LATE_MOVE_REDUCTIONS[depth][index + 1]
+            )
+            assert (
+                pruning.LATE_MOVE_REDUCTIONS[depth][index]
+                <= pruning.LATE_MOVE_REDUCTIONS[min(depth + 1, 63)][index]
+            )
+    assert pruning.late_move_reduction(3, 4) == 1
+    # at least one ply is left to search
+    assert pruning.late_move_reduction(3, 200) == 1
+    assert pruning.late_move_reduction(20, 200) > 2
@@ -0,0 +1,36 @@
+from herald import board, pv_table
+from herald import transposition_table as tt
+
+
+def test_triangular_table():
+    b = board.from_fen("startpos")
+    e4 = board.from_uci(b, "e2e4")
+    e5 = board.from_uci(board.push(b, e4), "e7e5")
+    table = pv_table.new_table()
+    lengths = pv_table.new_lengths()
+    # the leaf at ply 2 has no line, its parent gets one move
+    pv_table.clear(lengths, 2)
+    pv_table.update(table, lengths, 1, e5)
+    assert pv_table.line(table, lengths, 1) == [e5]
+    # the root gets the move and the line of its child
+    pv_table.update(table, lengths, 0, e4)
+    assert pv_table.line(table, lengths, 0) == [e4, e5]
+    assert pv_table.root_line(table, lengths, 0) == [e4, e5]
+    assert pv_table.root_line(table, lengths, 1) == ()
+    # a node that starts again forgets its line
+    pv_table.clear(lengths, 1)
+    assert pv_table.line(table, lengths, 1) == []
+
+
+def test_extend():
+    b = board.from_fen("startpos")
+    e4 = board.from_uci(b, "e2e4")
+    after_e4 = board.push(b, e4)
+    e5 = board.from_uci(after_e4, "e7e5")
+    table = tt.new(1)
+    tt.store(table, after_e4.zobrist, e5, 0, 3, tt.BOUND_EXACT)
+    assert pv_table.extend(table, b, [e4], 4) == [e4, e5]
+    assert pv_table.extend(table, b, [e4], 1) == [e4]
+    # a move that is not possible ends the line
+    tt.store(table, b.zobrist, e5, 0, 4, tt.BOUND_EXACT)
+    assert pv_table.extend(table, b, [], 4) == []
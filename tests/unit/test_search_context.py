@@ -0,0 +1,34 @@
+import multiprocessing
+import time
+
+import pytest
+from herald import search_context
+
+
+def test_stop_flag():
+    stop = multiprocessing.RawValue("b", 0)
+    context = search_context.SearchContext()
+    search_context.start(context, stop=stop)
+    for _ in range(2 * search_context.CHECK_INTERVAL):
+        search_context.count_node(context)
+    stop.value = 1
+    # the flag is only read every CHECK_INTERVAL nodes
+    with pytest.raises(search_context.SearchStopped):
+        for _ in range(search_context.CHECK_INTERVAL):
+            search_context.count_node(context)
+    assert context.stopped
+    # once stopped, every node raises
+    with pytest.raises(search_context.SearchStopped):
+        search_context.count_node(context)
+
+
+def test_deadline():
+    context = search_context.SearchContext()
+    search_context.start(context, deadline=time.time_ns() - 1)
+    with pytest.raises(search_context.SearchStopped):
+        for _ in range(search_context.CHECK_INTERVAL):
+            search_context.count_node(context)
+    # a new search starts afresh
+    search_context.start(context)
+    search_context.count_node(context)
+    assert not context.stopped
@@ -0,0 +1,67 @@
+from herald import board
+from herald import transposition_table as tt
+
+
+def test_store_and_probe():
+    table = tt.new(1)
+    # 1MB holds 32768 buckets of two slots of 16 bytes
+    assert table.mask + 1 == 1 << 15
+    b = board.from_fen("startpos")
+    move = board.from_uci(b, "e2e4")
+    assert tt.probe(table, b.zobrist) is None
+    tt.store(table, b.zobrist, move, -35, 4, tt.BOUND_EXACT)
+    assert tt.probe(table, b.zobrist) == (move, -35, 4, tt.BOUND_EXACT)
+    # the best move is kept when the new search has none
+    tt.store(table, b.zobrist, None, 120, 5, tt.BOUND_LOWER)
+    assert tt.probe(table, b.zobrist) == (move, 120, 5, tt.BOUND_LOWER)
+    # another key of the same bucket
+    assert tt.probe(table, b.zobrist + (1 << 40)) is None
+
+
+def test_replacement():
+    table = tt.new(1)
+    key = 12345
+    other = key + (table.mask + 1)
+    tt.store(table, key, None, 10, 6, tt.BOUND_UPPER)
+    # a shallower search goes to the always-replace slot
+    tt.store(table, other, None, 20, 2, tt.BOUND_EXACT)
+    assert tt.probe(table, key) == (0, 10, 6, tt.BOUND_UPPER)
+    assert tt.probe(table, other) == (0, 20, 2, tt.BOUND_EXACT)
+    # and is the one replaced next
+    third = other + (table.mask + 1)
+    tt.store(table, third, None, 30, 1, tt.BOUND_EXACT)
+    assert tt.probe(table, other) is None
+    assert tt.probe(table, key) == (0, 10, 6, tt.BOUND_UPPER)
+    # a deeper search takes the depth-preferred slot
+    tt.store(table, other, None, 40, 7, tt.BOUND_LOWER)
+    assert tt.probe(table, key) is None
+    assert tt.probe(table, other) == (0, 40, 7, tt.BOUND_LOWER)
+
+
+def test_hashfull():
+    table = tt.new(1)
+    assert tt.hashfull(table) == 0
+    for key in range(500):
+        tt.store(table, key, None, 0, 1, tt.BOUND_EXACT)
+    # every key takes the depth-preferred slot of its bucket, one sampled slot out of two
+    assert tt.hashfull(table) == 500
+    tt.clear(table)
+    assert tt.hashfull(table) == 0
+
+
+def test_generations():
+    table = tt.new(1)
+    key = 12345
+    other = key + (table.mask + 1)
+    tt.store(table, key, None, 10, 6, tt.BOUND_EXACT)
+    tt.new_generation(table)
+    # the entries of the previous searches are still found
+    assert tt.probe(table, key) == (0, 10, 6, tt.BOUND_EXACT)
+    assert tt.hashfull(table) == 0
+    # but give way to the current search, however shallow
+    tt.store(table, other, None, 20, 1, tt.BOUND_EXACT)
+    assert tt.probe(table, key) is None
+    assert tt.probe(table, other) == (0, 20, 1, tt.BOUND_EXACT)
+    for _ in range(tt.AGE_MASK + 1):
+        tt.new_generation(table)
+    assert table.age == 1